@@ -11,8 +11,7 @@ from pathlib import Path
 # Add backend directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from config.config import settings
-from database.database import Base
+from database.database import Base, SQLALCHEMY_DATABASE_URL
 # Import models to ensure they are registered
 import database.models
 
@@ -37,10 +36,8 @@ target_metadata = Base.metadata
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
-    url = settings.DATABASE_URL
-    if url.startswith("postgres://"):
-        url = url.replace("postgres://", "postgresql://", 1)
-        
+    url = SQLALCHEMY_DATABASE_URL
+
     context.configure(
         url=url,
         target_metadata=target_metadata,
@@ -54,10 +51,8 @@ def run_migrations_offline() -> None:
 
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
-    url = settings.DATABASE_URL
-    if url.startswith("postgres://"):
-        url = url.replace("postgres://", "postgresql://", 1)
-        
+    url = SQLALCHEMY_DATABASE_URL
+
     # Create engine using settings URL
     from sqlalchemy import create_engine
     if "sqlite" in url.lower():
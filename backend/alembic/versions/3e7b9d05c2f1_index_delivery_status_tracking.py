@@ -0,0 +1,31 @@
+"""Composite index on delivery_status (delivery_id, timestamp DESC)
+
+Revision ID: 3e7b9d05c2f1
+Revises: 8d2f4c1a9e63
+Create Date: 2026-10-17 14:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e7b9d05c2f1'
+down_revision: Union[str, Sequence[str], None] = '8d2f4c1a9e63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_delivery_status_did_ts', 'delivery_status', ['delivery_id', sa.text('timestamp DESC')], unique=False,
+        postgresql_include=['status', 'current_location', 'speed_kmh', 'heading', 'battery_level']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_delivery_status_did_ts', table_name='delivery_status')
@@ -0,0 +1,28 @@
+"""Index safety_feedback.feedback_type
+
+Revision ID: 8d2f4c1a9e63
+Revises: 5c7abf5c1c78
+Create Date: 2026-10-17 10:12:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2f4c1a9e63'
+down_revision: Union[str, Sequence[str], None] = '5c7abf5c1c78'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_safety_feedback_feedback_type'), 'safety_feedback', ['feedback_type'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_safety_feedback_feedback_type'), table_name='safety_feedback')
@@ -119,6 +119,7 @@ async def startup_event():
     from database.models import User
     from api.services.security import get_password_hash
     from api.routes.tracking import periodic_cache_cleanup
+    from api.services.database import location_write_buffer
 
     await init_db()
 
@@ -126,6 +127,10 @@ async def startup_event():
     asyncio.create_task(periodic_cache_cleanup())
     logger.info("📦 Location cache cleanup task started (runs every 60s)")
 
+    # Start background task: batch GPS history writes
+    asyncio.create_task(location_write_buffer.run())
+    logger.info("📦 Location write buffer started")
+
     # Seed default developer users for all roles
     db = SessionLocal()
     try:
@@ -186,6 +191,14 @@ async def startup_event():
     finally:
         db.close()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write any GPS updates still waiting in the buffer and send queued SOS emails."""
+    from api.services.database import location_write_buffer
+    from api.routes.safety import safety_service
+    location_write_buffer.flush()
+    await safety_service.email_service.drain_sos_queue()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("api.main:app", host="0.0.0.0", port=8000, reload=True)
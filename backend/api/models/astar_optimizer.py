@@ -5,11 +5,24 @@ Optimizes for: Time, Distance, Safety, and Traffic
 import heapq
 import networkx as nx
 import numpy as np
-from typing import List, Dict, Tuple, Optional, Set
+from typing import Any, List, Dict, Tuple, Optional, Set
 from dataclasses import dataclass, field
 from datetime import datetime
 import math
 
+
+def _haversine_term_vec(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Haversine term a from one point to many (inputs in degrees). Distance is
+    2R*asin(sqrt(a)), monotonic in a, so nearest-point searches compare a directly.
+    """
+    phi, phis = math.radians(lat), np.radians(lats)
+    return (
+        np.sin((phis - phi) / 2) ** 2
+        + math.cos(phi) * np.cos(phis) * np.sin((np.radians(lons) - math.radians(lon)) / 2) ** 2
+    )
+
+
 @dataclass(order=True)
 class PriorityNode:
     """Priority queue node for A* algorithm"""
@@ -53,6 +66,25 @@ class AStarRouteOptimizer:
             self.w_safety /= total
             self.w_traffic /= total
     
+    @staticmethod
+    def point_index(data: Optional[Dict]) -> Optional[Tuple[List, np.ndarray, np.ndarray]]:
+        """
+        Keys and coordinate arrays of a {(lat, lng): value} map, for nearest lookups.
+        Build once per search and pass to the penalty functions, instead of
+        re-walking the map's keys for every expanded node.
+        """
+        if not data:
+            return None
+        keys = list(data)
+        points = np.asarray(keys, dtype=np.float64).reshape(-1, 2)
+        return keys, points[:, 0], points[:, 1]
+    
+    def _nearest_value(self, coord: Tuple[float, float], data: Dict,
+                       index: Optional[Tuple[List, np.ndarray, np.ndarray]] = None) -> Any:
+        """Value of the entry in a {(lat, lng): value} map nearest to coord."""
+        keys, lats, lons = index if index is not None else self.point_index(data)
+        return data[keys[int(_haversine_term_vec(coord[0], coord[1], lats, lons).argmin())]]
+    
     def haversine_distance(self, 
                           coord1: Tuple[float, float], 
                           coord2: Tuple[float, float]) -> float:
@@ -86,13 +118,15 @@ class AStarRouteOptimizer:
     
     def get_safety_penalty(self, 
                           coord: Tuple[float, float],
-                          safety_data: Optional[Dict] = None) -> float:
+                          safety_data: Optional[Dict] = None,
+                          safety_index: Optional[Tuple] = None) -> float:
         """
         Calculate safety penalty for a location (0-1, lower is safer)
         
         Args:
             coord: (latitude, longitude)
             safety_data: Dictionary of safety scores by location
+            safety_index: point_index(safety_data), if already built
             
         Returns:
             Safety penalty (0 = safest, 1 = most dangerous)
@@ -101,14 +135,7 @@ class AStarRouteOptimizer:
             return 0.2  # Default moderate safety
         
         # Find nearest safety score
-        min_dist = float('inf')
-        nearest_score = 75.0  # Default
-        
-        for loc, score in safety_data.items():
-            dist = self.haversine_distance(coord, loc)
-            if dist < min_dist:
-                min_dist = dist
-                nearest_score = score
+        nearest_score = self._nearest_value(coord, safety_data, safety_index)
         
         # Convert safety score (0-100) to penalty (0-1)
         # Higher safety score = lower penalty
@@ -118,7 +145,8 @@ class AStarRouteOptimizer:
     def get_traffic_multiplier(self,
                                coord: Tuple[float, float],
                                traffic_data: Optional[Dict] = None,
-                               time_of_day: Optional[int] = None) -> float:
+                               time_of_day: Optional[int] = None,
+                               traffic_index: Optional[Tuple] = None) -> float:
         """
         Calculate traffic multiplier (1.0 = no traffic, 2.0 = heavy traffic)
         
@@ -126,6 +154,7 @@ class AStarRouteOptimizer:
             coord: (latitude, longitude)
             traffic_data: Dictionary of traffic levels by location
             time_of_day: Hour of day (0-23)
+            traffic_index: point_index(traffic_data), if already built
             
         Returns:
             Traffic multiplier (1.0-2.5)
@@ -144,14 +173,7 @@ class AStarRouteOptimizer:
                 return 1.0  # Light traffic
         
         # Find nearest traffic data
-        min_dist = float('inf')
-        nearest_level = 'low'
-        
-        for loc, level in traffic_data.items():
-            dist = self.haversine_distance(coord, loc)
-            if dist < min_dist:
-                min_dist = dist
-                nearest_level = level
+        nearest_level = self._nearest_value(coord, traffic_data, traffic_index)
         
         traffic_multipliers = {
             'low': 1.0,
@@ -187,7 +209,9 @@ class AStarRouteOptimizer:
                  goal: Tuple[float, float],
                  safety_data: Optional[Dict] = None,
                  traffic_data: Optional[Dict] = None,
-                 time_of_day: Optional[int] = None) -> float:
+                 time_of_day: Optional[int] = None,
+                 safety_index: Optional[Tuple] = None,
+                 traffic_index: Optional[Tuple] = None) -> float:
         """
         Multi-objective heuristic function for A*
         
@@ -199,6 +223,8 @@ class AStarRouteOptimizer:
             safety_data: Safety scores by location
             traffic_data: Traffic levels by location
             time_of_day: Hour of day
+            safety_index: point_index(safety_data), if already built
+            traffic_index: point_index(traffic_data), if already built
             
         Returns:
             Heuristic cost estimate
@@ -207,11 +233,11 @@ class AStarRouteOptimizer:
         h_distance = self.haversine_distance(current, goal) / 1000  # km
         
         # Component 2: Time estimate
-        traffic_mult = self.get_traffic_multiplier(current, traffic_data, time_of_day)
+        traffic_mult = self.get_traffic_multiplier(current, traffic_data, time_of_day, traffic_index)
         h_time = self.estimate_travel_time(current, goal) * traffic_mult / 60  # minutes
         
         # Component 3: Safety penalty
-        h_safety = self.get_safety_penalty(current, safety_data) * 100  # scale to 0-100
+        h_safety = self.get_safety_penalty(current, safety_data, safety_index) * 100  # scale to 0-100
         
         # Component 4: Traffic penalty
         h_traffic = (traffic_mult - 1.0) * 50  # scale to 0-75
@@ -286,12 +312,15 @@ class AStarRouteOptimizer:
             Dictionary with path, cost, and metrics
         """
         # Initialize
+        safety_index = self.point_index(safety_data)
+        traffic_index = self.point_index(traffic_data)
         open_set = []
         closed_set: Set[Tuple[float, float]] = set()
         came_from: Dict[Tuple[float, float], Tuple[float, float]] = {}
         
         g_score: Dict[Tuple[float, float], float] = {start: 0}
-        h_score = self.heuristic(start, goal, safety_data, traffic_data)
+        h_score = self.heuristic(start, goal, safety_data, traffic_data,
+                                 safety_index=safety_index, traffic_index=traffic_index)
         f_score: Dict[Tuple[float, float], float] = {start: h_score}
         
         # Add start node to open set
@@ -338,8 +367,8 @@ class AStarRouteOptimizer:
                 # Calculate tentative g_score
                 edge_distance = self.haversine_distance(current, neighbor)
                 edge_time = self.estimate_travel_time(current, neighbor)
-                edge_safety = self.get_safety_penalty(neighbor, safety_data)
-                edge_traffic = self.get_traffic_multiplier(neighbor, traffic_data)
+                edge_safety = self.get_safety_penalty(neighbor, safety_data, safety_index)
+                edge_traffic = self.get_traffic_multiplier(neighbor, traffic_data, traffic_index=traffic_index)
                 
                 # Multi-objective edge cost
                 edge_cost = (self.w_distance * edge_distance / 1000 +
@@ -353,7 +382,8 @@ class AStarRouteOptimizer:
                     # This path is better
                     came_from[neighbor] = current
                     g_score[neighbor] = tentative_g
-                    h = self.heuristic(neighbor, goal, safety_data, traffic_data)
+                    h = self.heuristic(neighbor, goal, safety_data, traffic_data,
+                                       safety_index=safety_index, traffic_index=traffic_index)
                     f_score[neighbor] = tentative_g + h
                     
                     heapq.heappush(open_set, PriorityNode(
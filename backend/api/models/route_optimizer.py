@@ -23,7 +23,7 @@ from api.schemas.delivery import Coordinate, DeliveryStop
 from loguru import logger
 
 # Use MapsService as the primary hub
-from api.services.maps import MapsService
+from api.services.maps import MapsService, HaversineAnchor
 USE_OSRM = False # Let MapsService handle provider selection
 logger.info("Using MapsService hub for optimization")
 
@@ -194,7 +194,10 @@ class RouteOptimizer:
                     })
                 
                 # Solve VRP
-                vrp_solution = self.maps_service.graphhopper.solve_vrp(vehicles, services)
+                # Blocking HTTP (rate limiter + retries); keep it off the event loop
+                vrp_solution = await asyncio.to_thread(
+                    self.maps_service.graphhopper.solve_vrp, vehicles, services
+                )
                 if vrp_solution and vrp_solution.get('solution') and vrp_solution['solution']['routes']:
                     gh_route = vrp_solution['solution']['routes'][0]
                     # Map GH stop IDs back to our sequence indices
@@ -303,23 +306,20 @@ class RouteOptimizer:
         if hasattr(self.maps_service, 'graphhopper') and self.maps_service.graphhopper:
             try:
                 coords = [(p.latitude, p.longitude) for p in points]
-                matrix_data = self.maps_service.graphhopper.get_matrix(coords)
+                # Only distances are used; skipping times halves the response to parse
+                matrix_data = await asyncio.to_thread(
+                    self.maps_service.graphhopper.get_matrix, coords, out_arrays=["distances"]
+                )
                 if matrix_data and 'distances' in matrix_data:
                     return matrix_data['distances']
             except Exception as e:
                 logger.warning(f"GraphHopper Matrix API failed: {e}. Falling back to straight distance.")
 
-        # 2. Fallback to calculating individually
-        matrix = [[0.0] * n for _ in range(n)]
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    distance = self.maps_service.calculate_straight_distance(
-                        points[i], points[j]
-                    )
-                    matrix[i][j] = distance
-        
-        return matrix
+        # 2. Fallback to straight-line distances, all pairs in one vectorized pass
+        coords = np.array([(p.latitude, p.longitude) for p in points], dtype=np.float64).reshape(n, 2)
+        return self.maps_service.calculate_straight_distance_batch(
+            coords[:, None, :], coords[None, :, :]
+        ).tolist()
     
     async def _create_cost_matrix(
         self,
@@ -335,6 +335,23 @@ class RouteOptimizer:
         n = len(points)
         cost_matrix = [[0.0] * n for _ in range(n)]
         
+        # Crowdsourced feedback adjustment only depends on the segment start,
+        # so resolve it once per node rather than once per (i, j) pair
+        alert_adjustment = [0.0] * n
+        if active_alerts:
+            lats = np.array([p.latitude for p in points], dtype=np.float64)
+            lngs = np.array([p.longitude for p in points], dtype=np.float64)
+        for alert in active_alerts:
+            # Simple check: distance from each segment start to the alert
+            near = HaversineAnchor(alert.location['lat'], alert.location['lng']).within(lats, lngs, 500) # 500 meters
+            for i in np.flatnonzero(near).tolist():
+                if alert.has_traffic_issues:
+                    alert_adjustment[i] += 5.0 # Significant penalty for reported traffic
+                    logger.info(f"Applying traffic penalty for alert near node {i}")
+                if alert.is_faster:
+                    alert_adjustment[i] -= 2.0 # Bonus for reputed fast route
+                    logger.info(f"Applying speed bonus for alert near node {i}")
+        
         # Determine time of day and night mode
         time_of_day = "day"
         night_mode = False
@@ -436,20 +453,7 @@ class RouteOptimizer:
                             logger.warning(f"Could not get traffic data: {e}")
                     
                     # Crowdsourced feedback adjustment
-                    if active_alerts:
-                        for alert in active_alerts:
-                            # Check if alert is near this segment
-                            # Simple check: distance to start or end points
-                            dist_to_start = self.maps_service.calculate_straight_distance(
-                                points[i], Coordinate(latitude=alert.location['lat'], longitude=alert.location['lng'])
-                            )
-                            if dist_to_start < 500: # 500 meters
-                                if alert.has_traffic_issues:
-                                    cost += 5.0 # Significant penalty for reported traffic
-                                    logger.info(f"Applying traffic penalty for alert near node {i}")
-                                if alert.is_faster:
-                                    cost -= 2.0 # Bonus for reputed fast route
-                                    logger.info(f"Applying speed bonus for alert near node {i}")
+                    cost += alert_adjustment[i]
 
                     cost_matrix[i][j] = cost
         
@@ -582,6 +586,8 @@ class RouteOptimizer:
         sequence = []
         remaining_stops = list(range(len(stops)))
         current_pos = (starting_point.latitude, starting_point.longitude)
+        safety_index = self.astar_optimizer.point_index(safety_data)
+        traffic_index = self.astar_optimizer.point_index(traffic_data)
         
         while remaining_stops:
             best_idx = None
@@ -597,7 +603,9 @@ class RouteOptimizer:
                     goal,
                     safety_data,
                     traffic_data,
-                    departure_time.hour if departure_time else None
+                    departure_time.hour if departure_time else None,
+                    safety_index=safety_index,
+                    traffic_index=traffic_index
                 )
                 
                 if cost < best_cost:
@@ -792,10 +800,11 @@ class RouteOptimizer:
             # Get weather data for route points
             weather_points = [current_point, next_point]
             if route_coords:
-                # Sample weather at intermediate points
+                # Sample weather at intermediate points. Polyline points are
+                # provider floats already in range, so skip re-validation.
                 step = max(1, len(route_coords) // 5)
                 weather_points = [current_point] + [
-                    Coordinate(latitude=c['lat'], longitude=c['lng'])
+                    Coordinate.model_construct(latitude=c['lat'], longitude=c['lng'])
                     for c in route_coords[::step]
                 ] + [next_point]
             
@@ -833,7 +842,7 @@ class RouteOptimizer:
                     sampled_coords = route_coords
                     
                 segment_coords = [
-                    Coordinate(latitude=c['lat'], longitude=c['lng'])
+                    Coordinate.model_construct(latitude=c['lat'], longitude=c['lng'])
                     for c in sampled_coords
                 ]
             
@@ -1182,9 +1191,10 @@ class RouteOptimizer:
         # Weather
         weather_points = [start_point, end_point]
         if route_coords:
+            # Decoded polyline points are already valid floats; skip re-validation
             step = max(1, len(route_coords) // 5)
             weather_points = [start_point] + [
-                Coordinate(latitude=c['lat'], longitude=c['lng'])
+                Coordinate.model_construct(latitude=c['lat'], longitude=c['lng'])
                 for c in route_coords[::step]
             ] + [end_point]
             
@@ -1219,7 +1229,7 @@ class RouteOptimizer:
                 sampled_coords = route_coords
                 
             segment_coords = [
-                Coordinate(latitude=c['lat'], longitude=c['lng'])
+                Coordinate.model_construct(latitude=c['lat'], longitude=c['lng'])
                 for c in sampled_coords
             ]
             
@@ -13,9 +13,43 @@ from config.config import settings
 from api.schemas.delivery import Coordinate
 from loguru import logger
 import json
-from geopy.distance import distance
+import math
 
 
+EARTH_RADIUS_KM = 6371.0
+
+
+def _time_of_day_features(hour: int) -> Tuple[int, float, float]:
+    """Deterministic (hour, lighting_score, traffic_density) for an hour of day."""
+    # Adjust lighting based on time of day
+    if hour < 6 or hour > 20:
+        lighting_score = 35.0  # Low at night
+    elif hour < 8 or hour > 18:
+        lighting_score = 65.0  # Medium at dawn/dusk
+    else:
+        lighting_score = 90.0  # High during day
+
+    # Traffic density (Heuristic based on rush hours)
+    is_rush_hour = (7 <= hour <= 9) or (17 <= hour <= 19)
+    traffic_density = 80.0 if is_rush_hour else 40.0
+    return hour, lighting_score, traffic_density
+
+
+# Precomputed once: _get_location_features only distinguishes these buckets
+TIME_OF_DAY_FEATURES = {
+    time_of_day: _time_of_day_features(hour)
+    for time_of_day, hour in {"day": 12, "evening": 18, "night": 22}.items()
+}
+
+
+def _haversine_km_vec(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distances (km) from one point to many; all inputs in radians."""
+    a = (
+        np.sin((lats - lat) / 2) ** 2
+        + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
 
 class SafetyScorer:
     """AI-powered safety scoring for routes."""
@@ -41,8 +75,66 @@ class SafetyScorer:
             # Add other safe zones (24hr shops, etc) to a general list for scoring
             self.other_safe_zones = [z for z in db_safe_zones if z['type'] != 'police_station']
             
+        self._build_proximity_arrays()
         self._initialize_model()
 
+    @staticmethod
+    def _point_lat_lng(point: Dict) -> Tuple[Optional[float], Optional[float]]:
+        """Read a point's coordinates from JSON style, DB style or nested location keys."""
+        p_lat = point.get('latitude', point.get('lat'))
+        p_lng = point.get('longitude', point.get('lng'))
+        if p_lat is None or p_lng is None:
+            loc = point.get('location', point.get('coordinates', {})) or {}
+            p_lat = loc.get('lat', loc.get('latitude'))
+            p_lng = loc.get('lng', loc.get('longitude'))
+        return p_lat, p_lng
+
+    def _to_radian_arrays(self, points: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Pack point coordinates into parallel latitude/longitude arrays (radians)."""
+        coords = []
+        for point in points:
+            p_lat, p_lng = self._point_lat_lng(point)
+            try:
+                coords.append((float(p_lat), float(p_lng)))
+            except (TypeError, ValueError):
+                continue
+        arr = np.radians(np.array(coords, dtype=np.float64).reshape(-1, 2))
+        return arr[:, 0].copy(), arr[:, 1].copy()
+
+    def _build_proximity_arrays(self):
+        """Precompute SoA coordinate arrays for the proximity features."""
+        safe_points = list(self.police_stations) + list(getattr(self, 'other_safe_zones', []))
+        self._has_safe_points = bool(safe_points)
+        self._safe_lat, self._safe_lon = self._to_radian_arrays(safe_points)
+        self._hosp_lat, self._hosp_lon = self._to_radian_arrays(self.hospitals)
+
+    def _proximity_scores_rad(self, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Police and hospital proximity scores (0-100) for query points in radians.
+        Scores decay exponentially with distance to the nearest point (slower for
+        hospitals); 50 when there is no data, 0 when no point was usable.
+        """
+        police = np.full(lats.shape, 50.0)  # Defaults if no data
+        if self._has_safe_points:
+            police_km = self._min_distance_grid_km(lats, lons, self._safe_lat, self._safe_lon)
+            police = np.clip(100 * np.exp(-0.5 * police_km), 0.0, 100.0)
+        hospital = np.full(lats.shape, 50.0)
+        if self.hospitals:
+            hospital_km = self._min_distance_grid_km(lats, lons, self._hosp_lat, self._hosp_lon)
+            hospital = np.clip(100 * np.exp(-0.4 * hospital_km), 0.0, 100.0)
+        return police, hospital
+
+    def _infrastructure_proximity(self, coord: Coordinate) -> Tuple[float, float]:
+        """Police and hospital proximity scores for a single coordinate."""
+        police, hospital = self.infrastructure_proximity_batch([coord])
+        return float(police[0]), float(hospital[0])
+
+    def infrastructure_proximity_batch(self, coords: List[Coordinate]) -> Tuple[np.ndarray, np.ndarray]:
+        """Police and hospital proximity scores for many coordinates in one pass."""
+        lats = np.radians(np.fromiter((c.latitude for c in coords), dtype=np.float64, count=len(coords)))
+        lons = np.radians(np.fromiter((c.longitude for c in coords), dtype=np.float64, count=len(coords)))
+        return self._proximity_scores_rad(lats, lons)
+
     def _load_police_stations(self) -> List[Dict]:
         """Load police stations from JSON file."""
         try:
@@ -187,7 +279,7 @@ class SafetyScorer:
         if not points:
             return 30.0 # Default mediocre score if no data
             
-        min_dist = float('inf')
+        p_lats, p_lngs = [], []
         for p in points:
             loc = p.get('location', p.get('coordinates', {}))
             if not loc: continue
@@ -197,8 +289,17 @@ class SafetyScorer:
             
             if p_lat is None or p_lng is None: continue
             
-            dist = distance((coord.latitude, coord.longitude), (p_lat, p_lng)).km
-            min_dist = min(min_dist, dist)
+            p_lats.append(p_lat)
+            p_lngs.append(p_lng)
+        
+        # One vectorized distance pass reduced with a single min
+        min_dist = float('inf')
+        if p_lats:
+            min_dist = float(_haversine_km_vec(
+                math.radians(coord.latitude), math.radians(coord.longitude),
+                np.radians(np.asarray(p_lats, dtype=np.float64)),
+                np.radians(np.asarray(p_lngs, dtype=np.float64))
+            ).min())
             
         # Score: 100 at 0km, 0 at 10km+
         score = max(0, 100 - (min_dist * 10))
@@ -209,50 +310,25 @@ class SafetyScorer:
         coord: Coordinate,
         time_of_day: str = "day",
         weather_data: Optional[Dict] = None,
-        delivery_info: Optional[Dict] = None
+        delivery_info: Optional[Dict] = None,
+        proximity: Optional[Tuple[float, float]] = None
     ) -> np.ndarray:
         """Extract hazard-based features for a location (No Crime)."""
-        hour_map = {"day": 12, "evening": 18, "night": 22}
-        hour = hour_map.get(time_of_day, 12)
-        
-        # Adjust lighting based on time of day (Deterministic)
-        if hour < 6 or hour > 20:
-            lighting_score = 35.0  # Low at night
-        elif hour < 8 or hour > 18:
-            lighting_score = 65.0  # Medium at dawn/dusk
-        else:
-            lighting_score = 90.0  # High during day
+        # Hour, lighting and traffic depend only on the time of day
+        hour, lighting_score, traffic_density = TIME_OF_DAY_FEATURES.get(
+            time_of_day, TIME_OF_DAY_FEATURES["day"]
+        )
         
         # Patrol density (Infrastructure Proxy)
         patrol_density = 60.0  # Median patrol proxy
         
-        # Traffic density (Heuristic based on rush hours + Real data if available)
-        is_rush_hour = (7 <= hour <= 9) or (17 <= hour <= 19)
-        traffic_density = 80.0 if is_rush_hour else 40.0
-        
-        # Try real traffic data if service is available
-        try:
-            from api.services.traffic import TrafficService
-            traffic_service = TrafficService()
-            # Note: This is a synchronous call - in high performance this should be async
-            # or pre-fetched in the optimizer
-            t_level, _, _ = traffic_service.get_traffic_level(coord, coord)
-            if t_level == 'high': traffic_density = 90.0
-            elif t_level == 'medium': traffic_density = 60.0
-            elif t_level == 'low': traffic_density = 30.0
-        except Exception:
-            pass # Use heuristic fallback
-        
         # Weather hazard impact (if provided)
         weather_hazard = 0
         if weather_data:
             weather_hazard = weather_data.get("hazard_score", 0) / 10.0  # Scale to 0-10
             
-        # Police Proximity
-        police_proximity = self._calculate_police_proximity(coord)
-
-        # Hospital Proximity
-        hospital_proximity = self._calculate_hospital_proximity(coord)
+        # Police & Hospital Proximity (batch callers pass it in precomputed)
+        police_proximity, hospital_proximity = proximity or self._infrastructure_proximity(coord)
         
         # If we need 12 features for the new RF model
         if hasattr(self, 'feature_count') and self.feature_count == 12:
@@ -284,72 +360,43 @@ class SafetyScorer:
             weather_hazard    # Feature 6
         ])
 
-    def _calculate_hospital_proximity(self, coord: Coordinate) -> float:
-        """Calculate proximity score to nearest 24/7 hospital (0-100)."""
-        if not self.hospitals:
-            return 50.0 # Default if no data
-            
-        min_dist_km = float('inf')
-        
-        for hospital in self.hospitals:
-            try:
-                dist = distance(
-                    (coord.latitude, coord.longitude),
-                    (hospital['latitude'], hospital['longitude'])
-                ).km
-                if dist < min_dist_km:
-                    min_dist_km = dist
-            except Exception:
-                continue
-                
-        # Proximity score: 100 if < 500m, decays to 0 at 10km
-        if min_dist_km == float('inf'):
-            return 0.0
-            
-        score = 100 * np.exp(-0.4 * min_dist_km) # Slightly slower decay than police
-        return min(100.0, max(0.0, score))
-
-    def _calculate_police_proximity(self, coord: Coordinate) -> float:
-        """Calculate proximity score to nearest police station or safe zone (0-100)."""
-        all_safe_points = list(self.police_stations)
-        if hasattr(self, 'other_safe_zones'):
-            all_safe_points.extend(self.other_safe_zones)
-            
-        if not all_safe_points:
-            return 50.0 # Default if no data
-            
-        min_dist_km = float('inf')
-        
-        for station in all_safe_points:
-            try:
-                # Handle both JSON style and DB style coordinate keys
-                p_lat = station.get('latitude', station.get('lat'))
-                p_lng = station.get('longitude', station.get('lng'))
-                
-                if p_lat is None or p_lng is None:
-                    # Check location dict style
-                    loc = station.get('location', {})
-                    p_lat = loc.get('lat', loc.get('latitude'))
-                    p_lng = loc.get('lng', loc.get('longitude'))
-                
-                if p_lat is None or p_lng is None: continue
-
-                dist = distance(
-                    (coord.latitude, coord.longitude),
-                    (p_lat, p_lng)
-                ).km
-                if dist < min_dist_km:
-                    min_dist_km = dist
-            except Exception:
-                continue
-                
-        # Proximity score: 100 if < 500m, decays to 0 at 10km
-        if min_dist_km == float('inf'):
-            return 0.0
-            
-        score = 100 * np.exp(-0.5 * min_dist_km)
-        return min(100.0, max(0.0, score))
-    
+    def _min_distance_grid_km(self, lats: np.ndarray, lons: np.ndarray,
+                              p_lats: np.ndarray, p_lons: np.ndarray) -> np.ndarray:
+        """Nearest-point distance (km) for every (lat, lon) query; inputs in radians."""
+        if p_lats.size == 0:
+            return np.full(lats.shape, np.inf)
+        # (N, 1) queries against (D,) points -> (N, D) matrix, reduced along D
+        return _haversine_km_vec(lats[:, None], lons[:, None], p_lats, p_lons).min(axis=1)
+
+    def infrastructure_heatmap(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        resolution: int = 15
+    ) -> Dict[str, List[float]]:
+        """Grid of infrastructure proximity (police + hospitals) over a bounding box.
+
+        Every cell is scored in one vectorized pass and returned column-wise
+        (``lats``, ``lngs``, ``intensity``); ``intensity`` is the combined
+        proximity score scaled to 0-1 (1 = safest).
+        """
+        lat_grid, lng_grid = np.meshgrid(
+            np.linspace(min_lat, max_lat, resolution),
+            np.linspace(min_lng, max_lng, resolution),
+            indexing="ij"
+        )
+        lats, lngs = lat_grid.ravel(), lng_grid.ravel()
+        police, hospital = self._proximity_scores_rad(np.radians(lats), np.radians(lngs))
+
+        intensity = (police + hospital) / 200
+        return {
+            "lats": lats.tolist(),
+            "lngs": lngs.tolist(),
+            "intensity": intensity.tolist(),
+        }
+
     def score_location(
         self,
         coord: Coordinate,
@@ -362,18 +409,52 @@ class SafetyScorer:
         Returns:
             Tuple of (overall_score, factors_list)
         """
-        features = self._get_location_features(coord, time_of_day, weather_data)
+        return self.score_locations([coord], time_of_day, rider_info, weather_data)[0]
+    
+    def score_locations(
+        self,
+        coords: List[Coordinate],
+        time_of_day: str = "day",
+        rider_info: Optional[Dict] = None,
+        weather_data: Optional[Dict] = None
+    ) -> List[Tuple[float, List[Dict]]]:
+        """Score many locations with one proximity pass and one model prediction.
+        
+        Returns:
+            List of (overall_score, factors_list), one per coordinate
+        """
+        if not coords:
+            return []
+        
+        police, hospital = self.infrastructure_proximity_batch(coords)
+        features = np.array([
+            self._get_location_features(coord, time_of_day, weather_data, proximity=(p, h))
+            for coord, p, h in zip(coords, police.tolist(), hospital.tolist())
+        ])
         
         # Adjust feature set based on what model expects
         feat_count = getattr(self, 'feature_count', 7)
-        features_for_model = features[:feat_count].reshape(1, -1)
+        features_for_model = features[:, :feat_count]
         
         # Scaling
         if self.scaler:
             features_for_model = self.scaler.transform(features_for_model)
         
         # Get model prediction
-        base_score = self.model.predict(features_for_model)[0]
+        base_scores = self.model.predict(features_for_model)
+        return [
+            self._score_factors(base_score, feats, rider_info, weather_data)
+            for base_score, feats in zip(base_scores, features)
+        ]
+    
+    def _score_factors(
+        self,
+        base_score: float,
+        features: np.ndarray,
+        rider_info: Optional[Dict] = None,
+        weather_data: Optional[Dict] = None
+    ) -> Tuple[float, List[Dict]]:
+        """Apply rider/weather adjustments to a model score and explain it."""
         # Apply gender-specific adjustments if needed
         if rider_info and rider_info.get("gender") == "female":
                 # 7-feature model: index 0 is lighting, index 1 is patrol
@@ -442,8 +523,8 @@ class SafetyScorer:
         segment_scores = []
         total_score = 0
         
-        for coord in coordinates:
-            score, factors = self.score_location(coord, time_of_day, rider_info)
+        scored = self.score_locations(coordinates, time_of_day, rider_info)
+        for coord, (score, factors) in zip(coordinates, scored):
             
             # Segment risk level
             seg_risk = self._get_risk_level(score)
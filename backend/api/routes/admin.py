@@ -43,7 +43,7 @@ async def get_system_summary(
         utilization = "0%"
 
     # Real-time online count from cache
-    online_count = len(await location_cache.get_all_fleet())
+    online_count = len(location_cache.get_all_fleet())
     
     # Fallback to DB if cache is empty (likely due to simulation or separate process)
     if online_count == 0:
@@ -146,7 +146,7 @@ async def get_riders_live_status(
     for rider in riders:
         # 1. OPTIMIZATION: Check in-memory cache first (Redis-like O(1) jump)
         # This allows us to see simulated riders who haven't hit the DB yet
-        cached = await location_cache.get_by_rider(rider.id)
+        cached = location_cache.get_by_rider(rider.id)
 
         # 2. Fall back to DB for history
         latest_track = None
@@ -183,7 +183,7 @@ async def get_riders_live_status(
                 "longitude": cached["longitude"]
             } if cached else (latest_track.current_location if latest_track else None),
             
-            "last_seen": cached["timestamp"] if cached else (latest_track.timestamp.isoformat() if latest_track else None),
+            "last_seen": datetime.utcfromtimestamp(cached["cached_at"]).isoformat() if cached else (latest_track.timestamp.isoformat() if latest_track else None),
             "speed_kmh": cached["speed_kmh"] if cached else (latest_track.speed_kmh if latest_track else None),
             "heading": cached["heading"] if cached else (latest_track.heading if latest_track else None),
             "battery_level": cached["battery_level"] if cached else (latest_track.battery_level if latest_track else None),
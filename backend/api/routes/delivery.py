@@ -1,6 +1,7 @@
 """Delivery route endpoints."""
 from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Set, Optional
 from pydantic import BaseModel
@@ -77,6 +78,16 @@ async def optimize_route_simple(
         logger.error(f"Failed to get directions for {origin} to {destination}")
         raise HTTPException(status_code=400, detail="Could not calculate routes")
     
+    # Shared scorer (model and proximity arrays already loaded) and one
+    # time-of-day bucket for every alternative
+    safety_scorer = route_optimizer.safety_scorer
+    hour = datetime.now().hour
+    time_of_day = "day"
+    if hour < 6 or hour >= 22:
+        time_of_day = "night"
+    elif hour < 8 or hour >= 18:
+        time_of_day = "evening"
+    
     routes = []
     for idx, route in enumerate(directions):
         if not route.get('legs'):
@@ -84,28 +95,14 @@ async def optimize_route_simple(
             
         leg = route['legs'][0]
         
-        # Calculate safety score using the route coordinates
-        from api.models.safety_scorer import SafetyScorer
-        safety_scorer = SafetyScorer()
-        
         # Get route coordinates for safety scoring
         route_coords_list = route.get('route_coordinates', [])
         if route_coords_list:
-            # Convert to Coordinate objects
-            from api.schemas.delivery import Coordinate
+            # Convert to Coordinate objects (provider output, no re-validation needed)
             coords = [
-                Coordinate(latitude=c['lat'], longitude=c['lng'])
+                Coordinate.model_construct(latitude=c['lat'], longitude=c['lng'])
                 for c in route_coords_list[::max(1, len(route_coords_list)//10)]  # Sample every 10th point
             ]
-            # Determine time of day
-            from datetime import datetime
-            hour = datetime.now().hour
-            time_of_day = "day"
-            if hour < 6 or hour >= 22:
-                time_of_day = "night"
-            elif hour < 8 or hour >= 18:
-                time_of_day = "evening"
-                
             safety_data = safety_scorer.score_route(coords, time_of_day=time_of_day)
             safety_score = safety_data['route_safety_score']
         else:
@@ -347,19 +344,19 @@ async def update_location(
                 "latitude": request.current_location.latitude,
                 "longitude": request.current_location.longitude
             },
-            "status": request.status.value if hasattr(request.status, 'value') else request.status,
+            "status": request.status,
             "speed_kmh": request.speed_kmh,
             "heading": request.heading,
             "battery_level": request.battery_level
         }
 
         # 1. Update in-memory cache immediately (fast path — no Redis needed)
-        await _inmem_cache.set_location(
+        _inmem_cache.set_location(
             delivery_id=request.delivery_id,
             rider_id=request.rider_id or "",
             latitude=request.current_location.latitude,
             longitude=request.current_location.longitude,
-            status=request.status.value if hasattr(request.status, 'value') else request.status,
+            status=request.status,
             speed_kmh=request.speed_kmh,
             heading=request.heading,
             battery_level=request.battery_level
@@ -394,7 +391,7 @@ async def update_location(
                     "latitude": request.current_location.latitude,
                     "longitude": request.current_location.longitude
                 },
-                "status": request.status.value if hasattr(request.status, 'value') else request.status,
+                "status": request.status,
                 "speed_kmh": request.speed_kmh,
                 "heading": request.heading,
                 "battery_level": request.battery_level,
@@ -452,7 +449,7 @@ async def update_location(
         raise HTTPException(status_code=500, detail=f"Location update failed: {str(e)}")
 
 
-@router.get("/delivery/{delivery_id}/track", response_model=DeliveryTrackingResponse)
+@router.get("/delivery/{delivery_id}/track", response_model=DeliveryTrackingResponse, response_class=ORJSONResponse)
 async def track_delivery(
     delivery_id: str,
     db: Session = Depends(get_db)
@@ -466,11 +463,11 @@ async def track_delivery(
         db_service = DatabaseService(db)
         tracking_data = db_service.get_delivery_tracking(delivery_id)
         
-        return DeliveryTrackingResponse(
-            success=True,
-            message="Tracking data retrieved successfully",
-            data=tracking_data
-        )
+        return ORJSONResponse({
+            "success": True,
+            "message": "Tracking data retrieved successfully",
+            "data": tracking_data
+        })
     
     except Exception as e:
         logger.error(f"Error tracking delivery: {e}")
@@ -583,7 +580,7 @@ async def websocket_tracking(websocket: WebSocket, delivery_id: str):
     
     try:
         # 1. Try in-memory cache first (always fast)
-        cached_mem = await _inmem_cache.get_by_delivery(delivery_id)
+        cached_mem = _inmem_cache.get_by_delivery(delivery_id)
         
         if cached_mem:
             await websocket.send_json({
@@ -2,6 +2,7 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from typing import List, Dict, Set
 from loguru import logger
 import json
+import orjson
 
 router = APIRouter()
 
@@ -22,10 +23,12 @@ class NotificationManager:
         if not self.active_connections:
             return
             
+        # Encode once for every client instead of per send_json call
+        payload = orjson.dumps(message).decode()
         disconnected = set()
         for connection in self.active_connections:
             try:
-                await connection.send_json(message)
+                await connection.send_text(payload)
             except Exception as e:
                 logger.error(f"Error broadcasting notification: {e}")
                 disconnected.add(connection)
@@ -1,5 +1,6 @@
 """Safety endpoints."""
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
 from pydantic import BaseModel, Field
@@ -22,6 +23,7 @@ from api.schemas.safety import (
     CheckInRequest,
     CheckInResponse,
     SafeZonesRequest,
+    SafetyHeatmapResponse,
     RideAlongRequest,
     RideAlongResponse,
     BuddyRequest
@@ -58,29 +60,23 @@ async def calculate_safety_score(
         logger.error(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/safety/heatmap")
+@router.get("/safety/heatmap", response_model=SafetyHeatmapResponse, response_class=ORJSONResponse)
 async def get_safety_heatmap(
     min_lat: float, 
     min_lng: float, 
     max_lat: float, 
     max_lng: float,
-    grid_size: Optional[int] = 15
+    grid_size: int = Query(15, ge=2, le=50)
 ):
-    """Get safety heatmap points for a bounding box."""
+    """Get safety heatmap grid for a bounding box as parallel columns."""
     try:
-        import random
-        # Create simulated heatmap points based on the bounding box
-        points = []
-        for _ in range(grid_size * 2):
-            points.append({
-                "lat": random.uniform(min_lat, max_lat),
-                "lng": random.uniform(min_lng, max_lng),
-                "intensity": random.uniform(0.3, 0.95)
-            })
-        return {"points": points}
+        grid = safety_scorer.infrastructure_heatmap(
+            min_lat, min_lng, max_lat, max_lng, resolution=grid_size
+        )
+        return ORJSONResponse(grid)
     except Exception as e:
         logger.error(f"Error generating heatmap: {e}")
-        return {"points": [], "error": str(e)}
+        return ORJSONResponse({"lats": [], "lngs": [], "intensity": [], "error": str(e)})
 
 
 @router.post("/safety/panic-button", response_model=PanicButtonResponse)
@@ -149,7 +145,7 @@ async def get_safe_zones(
 ):
     """Get nearby safe zones."""
     try:
-        return safety_service.get_safe_zones(
+        return await safety_service.get_safe_zones(
             location=request.location,
             radius_meters=request.radius_meters,
             zone_types=request.zone_types
@@ -5,7 +5,7 @@ Architecture: Push-based, event-driven, cache-first
 
 Flow:
   Rider GPS → POST /tracking/location
-      → Save to DB (async)
+      → Queue for batched DB write (async)
       → Update in-memory cache (sync, O(1))
       → Broadcast via WebSocket to per-order channel
       → Broadcast to 'live_fleet' channel (dispatchers)
@@ -23,14 +23,14 @@ Interview keywords:
 """
 
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from sqlalchemy.orm import Session
 from database.database import get_db
 from api.deps import get_current_active_user
 from database.models import User, DeliveryStatus, Delivery
-from api.services.database import DatabaseService
+from api.services.database import DatabaseService, location_write_buffer
 from api.services.route_monitor import RouteMonitor
-from api.services.location_cache import location_cache
+from api.services.location_cache import location_cache, location_payload
 from api.services.maps import MapsService
 from loguru import logger
 from datetime import datetime
@@ -38,6 +38,7 @@ from typing import Dict, Set, Optional, Any
 from pydantic import BaseModel
 import asyncio
 import json
+import time
 
 from api.routes.notifications import manager as notification_manager
 from api.services.geospatial import geo_service
@@ -130,7 +131,7 @@ class ConnectionManager:
         When a new client connects, immediately send the last known location
         from cache — so the map loads instantly without waiting for next GPS ping.
         """
-        cached = await location_cache.get_by_delivery(delivery_id)
+        cached = location_cache.get_by_delivery(delivery_id)
         if cached:
             await websocket.send_json({
                 "type": "initial_location",
@@ -143,8 +144,8 @@ class ConnectionManager:
                 "speed_kmh": cached.get("speed_kmh"),
                 "heading": cached.get("heading"),
                 "battery_level": cached.get("battery_level"),
-                "timestamp": cached.get("timestamp"),
-                "cache_age_seconds": cached.get("cache_age_seconds", 0)
+                "timestamp": datetime.utcfromtimestamp(cached["cached_at"]).isoformat(),
+                "cache_age_seconds": time.time() - cached["cached_at"]
             })
             logger.debug(f"[WS] Sent cached initial state for delivery {delivery_id}")
 
@@ -180,7 +181,7 @@ async def update_location(
     
     Pipeline:
     1. Validate rider identity
-    2. Save to DB (for persistence/history)
+    2. Queue DB write (batched, for persistence/history)
     3. Update in-memory cache (O(1), for instant reads)
     4. Broadcast via WebSocket to per-order channel
     5. Broadcast to live_fleet (dispatchers)
@@ -189,8 +190,6 @@ async def update_location(
     
     This endpoint is on the "hot path" — must stay fast.
     """
-    db_service = DatabaseService(db)
-
     location_data = {
         "delivery_id": update.delivery_id,
         "route_id": update.route_id,
@@ -203,12 +202,8 @@ async def update_location(
         "timestamp": datetime.utcnow()
     }
 
-    # ① Persist to database (location history)
-    try:
-        db_service.save_location_update(location_data)
-    except Exception as e:
-        logger.error(f"DB write failed for location update: {e}")
-        # Don't fail the endpoint — cache + broadcast can still work
+    # ① Queue for the batched database writer (location history)
+    location_write_buffer.add(location_data)
 
     # ② Update H3 Geospatial Index
     try:
@@ -238,7 +233,7 @@ async def update_location(
             logger.warning(f"Route deviation check failed: {e}")
 
     # ④ Update in-memory cache (FAST — dictionary write)
-    await location_cache.set_location(
+    location_cache.set_location(
         delivery_id=update.delivery_id,
         rider_id=current_user.id,
         latitude=update.latitude,
@@ -297,7 +292,7 @@ async def update_location(
 #  Instant response — no DB hit
 # ─────────────────────────────────────────────────
 
-@router.get("/current/{delivery_id}")
+@router.get("/current/{delivery_id}", response_class=ORJSONResponse)
 async def get_current_location(delivery_id: str):
     """
     Get the latest location for a delivery.
@@ -308,12 +303,12 @@ async def get_current_location(delivery_id: str):
     This endpoint powers the "where is my rider?" query on the customer dashboard.
     """
     # ① Try cache first (zero DB queries)
-    cached = await location_cache.get_by_delivery(delivery_id)
+    cached = location_cache.get_by_delivery(delivery_id)
     if cached:
         return {
             "success": True,
             "source": "cache",
-            "data": cached
+            "data": location_payload(cached)
         }
 
     # ② Cache miss → fall back to DB
@@ -322,11 +317,11 @@ async def get_current_location(delivery_id: str):
     try:
         db_service = DatabaseService(db)
         tracking_data = db_service.get_delivery_tracking(delivery_id, limit=1)
-        return {
+        return ORJSONResponse({
             "success": True,
             "source": "database",
             "data": tracking_data
-        }
+        })
     finally:
         db.close()
 
@@ -338,7 +333,7 @@ async def get_fleet_locations():
     Returns cache snapshot — no DB needed.
     Used by dispatcher dashboard for real-time fleet overview.
     """
-    fleet = await location_cache.get_all_fleet()
+    fleet = location_cache.get_all_fleet()
     return {
         "success": True,
         "source": "cache",
@@ -389,7 +384,7 @@ async def websocket_tracking(websocket: WebSocket, channel: str):
         await manager.send_initial_state(websocket, channel)
     else:
         # For fleet view, send snapshot of all active riders
-        fleet = await location_cache.get_all_fleet()
+        fleet = location_cache.get_all_fleet()
         if fleet:
             await websocket.send_json({
                 "type": "fleet_snapshot",
@@ -465,9 +460,9 @@ async def sse_location_stream(delivery_id: str, request: Request):
 
     async def event_generator():
         # Send initial cached location immediately
-        cached = await location_cache.get_by_delivery(delivery_id)
+        cached = location_cache.get_by_delivery(delivery_id)
         if cached:
-            yield f"event: initial_location\ndata: {json.dumps(cached)}\n\n"
+            yield f"event: initial_location\ndata: {json.dumps(location_payload(cached))}\n\n"
 
         try:
             while True:
@@ -588,7 +583,7 @@ async def simulate_gps_movement(
                     next_lat, next_lng = final_path[i+1]
                     heading = math.degrees(math.atan2(next_lng - lng, next_lat - lat)) % 360
 
-                await location_cache.set_location(
+                location_cache.set_location(
                     delivery_id=delivery_id,
                     rider_id=current_user.id,
                     latitude=lat,
@@ -639,6 +634,6 @@ async def periodic_cache_cleanup():
     """Cleanup expired cache entries every 60 seconds."""
     while True:
         await asyncio.sleep(60)
-        cleaned = await location_cache.cleanup_expired()
+        cleaned = location_cache.cleanup_expired()
         if cleaned > 0:
             logger.debug(f"Periodic cache cleanup: removed {cleaned} stale entries")
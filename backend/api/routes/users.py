@@ -1,31 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from database.database import get_db
 from database.models import User, RiderProfile
-from api.schemas.auth import UserResponse, RiderProfileSchema
+from api.schemas.auth import UserCoreResponse, RiderProfileSchema, UserProfilePatch, UserSettingsUpdate, UserStatusPatch
 from api.deps import get_current_active_user, get_current_dispatcher, get_current_admin
+from api.services.dispatch import invalidate_available_riders
 from loguru import logger
 from typing import List
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-@router.get("/profile", response_model=UserResponse)
+@router.get("/profile", response_model=UserCoreResponse)
 def get_profile(current_user: User = Depends(get_current_active_user)):
     """Get current user profile."""
     return current_user
 
-@router.put("/profile", response_model=UserResponse)
+@router.put("/profile", response_model=UserCoreResponse)
 def update_profile(
-    full_name: str = None,
-    phone: str = None,
-    email: str = None,
+    patch: UserProfilePatch,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Update user profile basic info."""
-    if full_name: current_user.full_name = full_name
-    if phone: current_user.phone = phone
-    if email: current_user.email = email
+    values = patch.model_dump(exclude_unset=True, exclude_none=True)
+    if not values:
+        return current_user
+
+    for field, value in values.items():
+        setattr(current_user, field, value)
     
     db.commit()
     db.refresh(current_user)
@@ -46,10 +50,16 @@ def update_rider_profile(
         profile = RiderProfile(user_id=current_user.id)
         db.add(profile)
     
-    if profile_in.vehicle_type: profile.vehicle_type = profile_in.vehicle_type
-    if profile_in.license_number: profile.license_number = profile_in.license_number
-    if profile_in.gender: profile.gender = profile_in.gender
-    if profile_in.preferences: profile.preferences = profile_in.preferences
+    # Only truthy fields that differ from the stored profile are written
+    changes = {
+        field: value for field, value in profile_in.model_dump().items()
+        if value and getattr(profile, field) != value
+    }
+    if not changes and profile not in db.new:
+        return profile
+
+    for field, value in changes.items():
+        setattr(profile, field, value)
     
     db.commit()
     db.refresh(profile)
@@ -57,57 +67,45 @@ def update_rider_profile(
 
 @router.post("/settings")
 def update_settings(
-    settings_data: dict,
+    settings_in: UserSettingsUpdate,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Update user settings/preferences."""
+    settings_data = settings_in.model_dump(exclude_unset=True)
     logger.info(f"Updating settings for user {current_user.id}: {settings_data}")
 
     # 1. Update User level info if provided in 'profile' key
-    profile_data = settings_data.get('profile', {})
-    if profile_data:
-        if 'full_name' in profile_data:
-            current_user.full_name = profile_data['full_name']
-        if 'phone' in profile_data:
-            current_user.phone = profile_data['phone']
-        if 'email' in profile_data:
-            current_user.email = profile_data['email']
-        
+    profile_data = settings_data.pop('profile', None) or {}
+    vehicle_type = profile_data.pop('vehicle_type', None)
+    for field, value in profile_data.items():
+        setattr(current_user, field, value)
+
     # 2. Update Emergency Contacts
     if 'emergency_contacts' in settings_data:
-        current_user.emergency_contacts = settings_data['emergency_contacts']
+        current_user.emergency_contacts = settings_data.pop('emergency_contacts')
 
     # 3. Update Rider Profile preferences
     if current_user.role == "rider":
         # Check if RiderProfile exists
-        from database.models import RiderProfile
         profile = db.query(RiderProfile).filter(RiderProfile.user_id == current_user.id).first()
         
         if not profile:
             profile = RiderProfile(user_id=current_user.id)
             db.add(profile)
             
-        # Update preferences
-        prefs = profile.preferences or {}
-        if 'location_sharing' in settings_data:
-            prefs['location_sharing'] = settings_data['location_sharing']
-        if 'notifications' in settings_data:
-            prefs['notifications'] = settings_data['notifications']
-        if 'theme' in settings_data:
-            prefs['theme'] = settings_data['theme']
-            
-        profile.preferences = prefs
+        # Remaining keys are location_sharing / notifications / theme
+        profile.preferences = {**(profile.preferences or {}), **settings_data}
         
         # Update vehicle type if provided
-        if profile_data.get('vehicle_type'):
-            profile.vehicle_type = profile_data['vehicle_type']
+        if vehicle_type:
+            profile.vehicle_type = vehicle_type
 
     db.commit()
     return {"message": "Settings updated successfully", "status": "success"}
 
 
-@router.get("/riders", response_model=List[UserResponse])
+@router.get("/riders", response_model=List[UserCoreResponse])
 def list_riders(
     db: Session = Depends(get_db),
     admin: User = Depends(get_current_dispatcher)
@@ -117,14 +115,15 @@ def list_riders(
     return riders
 
 
-@router.get("/all")
+@router.get("/all", response_class=ORJSONResponse)
 def list_all_users(
     db: Session = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
     """List ALL users across every role (Admin only)."""
     users = db.query(User).order_by(User.role, User.created_at.desc()).all()
-    return [
+    # Returned directly so orjson encodes created_at natively (ISO 8601)
+    return ORJSONResponse([
         {
             "id": u.id,
             "username": u.username,
@@ -133,28 +132,30 @@ def list_all_users(
             "role": u.role,
             "status": u.status,
             "phone": u.phone,
-            "created_at": u.created_at.isoformat() if u.created_at else None,
+            "created_at": u.created_at,
         }
         for u in users
-    ]
+    ])
 
 
 @router.patch("/{user_id}/status")
 def toggle_user_status(
     user_id: str,
-    payload: dict,
+    payload: UserStatusPatch,
     db: Session = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
     """Activate or deactivate a user (Admin only)."""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    if user.id == admin.id:
+    if user_id == admin.id:
         raise HTTPException(status_code=400, detail="Cannot change your own status")
-    user.status = payload.get("status", user.status)
+    username = db.execute(
+        update(User).where(User.id == user_id).values(status=payload.status).returning(User.username)
+    ).scalar_one_or_none()
+    if username is None:
+        raise HTTPException(status_code=404, detail="User not found")
     db.commit()
-    return {"message": f"User {user.username} status set to {user.status}"}
+    invalidate_available_riders()
+    return {"message": f"User {username} status set to {payload.status}"}
 
 
 @router.delete("/{user_id}")
@@ -164,13 +165,14 @@ def delete_user(
     admin: User = Depends(get_current_admin)
 ):
     """Delete a user (Admin only)."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if user.id == admin.id:
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     db.delete(user)
     db.commit()
+    invalidate_available_riders()
     return {"message": f"User {user.username} deleted"}
 
 @router.get("/online")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List, Union, Literal
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -35,11 +35,17 @@ class UserLogin(BaseModel):
     password: str
     role: Optional[str] = "rider" # Added role check for login
 
-class UserResponse(UserBase):
+class UserCoreResponse(UserBase):
+    """Columns stored on the users table; used by the /users endpoints."""
     id: str
     status: str
     is_active: bool
     created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class UserResponse(UserCoreResponse):
     # Include other profile fields if needed
     license_number: Optional[str] = None
     vehicle_type: Optional[str] = None
@@ -50,9 +56,6 @@ class UserResponse(UserBase):
     emergency_contact_phone: Optional[str] = None
     emergency_contact_email: Optional[str] = None
 
-    class Config:
-        from_attributes = True
-
 class RiderProfileSchema(BaseModel):
     vehicle_type: Optional[str] = None
     license_number: Optional[str] = None
@@ -62,6 +65,25 @@ class RiderProfileSchema(BaseModel):
     class Config:
         from_attributes = True
 
+class UserProfilePatch(BaseModel):
+    full_name: Optional[str] = None
+    phone: Optional[str] = None
+    email: Optional[str] = None
+
+class SettingsProfilePatch(UserProfilePatch):
+    vehicle_type: Optional[str] = None
+
+class UserSettingsUpdate(BaseModel):
+    profile: Optional[SettingsProfilePatch] = None
+    emergency_contacts: Optional[List[dict]] = None
+    # Rider preferences
+    location_sharing: Optional[bool] = None
+    notifications: Optional[Union[bool, dict]] = None
+    theme: Optional[str] = None
+
+class UserStatusPatch(BaseModel):
+    status: Literal["active", "inactive", "suspended"]
+
 class TokenRefresh(BaseModel):
     refresh_token: str
 
@@ -1,6 +1,6 @@
 """Pydantic schemas for delivery endpoints."""
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -23,6 +23,12 @@ class DeliveryStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+# Request fields validate against these Literal types (a single set lookup in
+# pydantic-core) instead of the Enums above; values stay plain strings.
+DeliveryPriorityValue = Literal["low", "medium", "high", "urgent"]
+DeliveryStatusValue = Literal["pending", "assigned", "in_transit", "delivered", "failed", "cancelled"]
+
+
 class Coordinate(BaseModel):
     """Geographic coordinate."""
     latitude: float = Field(..., ge=-90, le=90, description="Latitude")
@@ -42,7 +48,7 @@ class DeliveryStop(BaseModel):
     stop_id: str = Field(..., description="Unique stop identifier")
     address: str = Field(..., description="Delivery address")
     coordinates: Coordinate = Field(..., description="Stop coordinates")
-    priority: DeliveryPriority = Field(DeliveryPriority.MEDIUM, description="Delivery priority")
+    priority: DeliveryPriorityValue = Field("medium", description="Delivery priority")
     time_window_start: Optional[datetime] = Field(None, description="Earliest delivery time")
     time_window_end: Optional[datetime] = Field(None, description="Latest delivery time")
     package_weight: Optional[float] = Field(1.0, ge=0, description="Package weight in kg")
@@ -161,7 +167,7 @@ class LocationUpdateRequest(BaseModel):
     route_id: Optional[str] = Field(None, description="Route identifier")
     rider_id: Optional[str] = Field(None, description="Rider identifier")
     current_location: Coordinate = Field(..., description="Current GPS coordinates")
-    status: Optional[DeliveryStatus] = Field(DeliveryStatus.IN_TRANSIT, description="Current delivery status")
+    status: Optional[DeliveryStatusValue] = Field("in_transit", description="Current delivery status")
     speed_kmh: Optional[float] = Field(None, ge=0, description="Current speed in km/h")
     heading: Optional[float] = Field(None, ge=0, le=360, description="Direction in degrees")
     battery_level: Optional[int] = Field(None, ge=0, le=100, description="Device battery level")
@@ -48,9 +48,11 @@ class HeatmapRequest(BaseModel):
 
 
 class SafetyHeatmapResponse(BaseModel):
-    """Response for safety heatmap."""
-    bounds: Dict[str, float]
-    points: List[Dict]
+    """Response for safety heatmap (one entry per grid cell in each column)."""
+    lats: List[float]
+    lngs: List[float]
+    intensity: List[float]
+    error: Optional[str] = None
 
 
 class SafetyConditionsRequest(BaseModel):
@@ -86,7 +88,7 @@ class PanicButtonResponse(BaseModel):
     success: bool = True
     alert_id: Optional[str] = None
     status: str
-    email_sent: bool
+    email_queued: bool  # Handed to the background sender; delivery is not awaited
     company_notified: bool
     emergency_contacts_notified: int
     location: Dict[str, float]
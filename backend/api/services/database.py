@@ -1,13 +1,17 @@
 """Database service for API operations."""
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable
+from sqlalchemy import insert, func
 from sqlalchemy.orm import Session
 from loguru import logger
+from datetime import datetime
+import asyncio
+import uuid
 import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from database.database import get_db, init_db as db_init
+from database.database import get_db, init_db as db_init, SessionLocal
 from database.models import Route, SafetyFeedback, SafetyScore, DeliveryStatus
 
 class DatabaseService:
@@ -16,76 +20,91 @@ class DatabaseService:
     def __init__(self, db: Session):
         self.db = db
     
-    def save_route(self, route_data: Dict[str, Any]) -> str:
-        """Save optimized route to database."""
+    def _insert_returning_ids(self, model, rows: List[Dict[str, Any]]) -> List[str]:
+        """INSERT many rows in one statement and return their IDs via RETURNING."""
+        if not rows:
+            return []
+        ids = list(self.db.scalars(insert(model).returning(model.id), rows))
+        self.db.commit()
+        return ids
+    
+    def save_routes_bulk(self, rows: List[Dict[str, Any]]) -> List[str]:
+        """Save many optimized routes in one round-trip."""
         try:
-            route = Route(**route_data)
-            self.db.add(route)
-            self.db.commit()
-            self.db.refresh(route)
-            logger.info(f"Route saved with ID: {route.id}")
-            return route.id
+            ids = self._insert_returning_ids(Route, rows)
+            logger.info(f"Routes saved with IDs: {ids}")
+            return ids
         except Exception as e:
             self.db.rollback()
             logger.error(f"Error saving route: {e}")
             raise
     
+    def save_route(self, route_data: Dict[str, Any]) -> str:
+        """Save optimized route to database."""
+        return self.save_routes_bulk([route_data])[0]
+    
     def get_route(self, route_id: str) -> Optional[Route]:
         """Get route by ID."""
         return self.db.query(Route).filter(Route.id == route_id).first()
     
-    def save_feedback(self, feedback_data: Dict[str, Any]) -> str:
-        """Save rider feedback."""
+    def save_feedback_bulk(self, rows: List[Dict[str, Any]]) -> List[str]:
+        """Save many rider feedback entries in one round-trip."""
         try:
-            feedback = SafetyFeedback(**feedback_data)
-            self.db.add(feedback)
-            self.db.commit()
-            self.db.refresh(feedback)
-            logger.info(f"Feedback saved with ID: {feedback.id}")
-            return feedback.id
+            ids = self._insert_returning_ids(SafetyFeedback, rows)
+            logger.info(f"Feedback saved with IDs: {ids}")
+            return ids
         except Exception as e:
             self.db.rollback()
             logger.error(f"Error saving feedback: {e}")
             raise
     
+    def save_feedback(self, feedback_data: Dict[str, Any]) -> str:
+        """Save rider feedback."""
+        return self.save_feedback_bulk([feedback_data])[0]
+    
     def get_feedback_stats(self) -> Dict[str, Any]:
         """Get feedback statistics."""
-        feedbacks = self.db.query(SafetyFeedback).all()
-        if not feedbacks:
+        # Aggregated in the database; only a few scalars come back
+        total, average = self.db.query(
+            func.count(SafetyFeedback.id), func.avg(SafetyFeedback.rating)
+        ).one()
+        if not total:
             return {
                 "total_feedback": 0,
                 "average_rating": 0,
                 "feedback_by_type": {}
             }
         
+        by_type = self.db.query(
+            SafetyFeedback.feedback_type, func.count(SafetyFeedback.id)
+        ).group_by(SafetyFeedback.feedback_type).all()
+        
         return {
-            "total_feedback": len(feedbacks),
-            "average_rating": sum(f.rating for f in feedbacks) / len(feedbacks),
-            "feedback_by_type": {}
+            "total_feedback": total,
+            "average_rating": float(average),
+            "feedback_by_type": dict(by_type)
         }
     
-    def save_safety_score(self, score_data: Dict[str, Any]) -> str:
-        """Save safety score."""
+    def save_safety_scores_bulk(self, rows: List[Dict[str, Any]]) -> List[str]:
+        """Save many safety scores in one round-trip."""
         try:
-            score = SafetyScore(**score_data)
-            self.db.add(score)
-            self.db.commit()
-            self.db.refresh(score)
-            return score.id
+            return self._insert_returning_ids(SafetyScore, rows)
         except Exception as e:
             self.db.rollback()
             logger.error(f"Error saving safety score: {e}")
             raise
     
+    def save_safety_score(self, score_data: Dict[str, Any]) -> str:
+        """Save safety score."""
+        return self.save_safety_scores_bulk([score_data])[0]
+    
     def save_location_update(self, location_data: Dict[str, Any]) -> str:
         """Save delivery location update."""
         try:
-            status = DeliveryStatus(**location_data)
-            self.db.add(status)
-            self.db.commit()
-            self.db.refresh(status)
+            # The id comes back from the INSERT itself; no refresh SELECT
+            status_id = self._insert_returning_ids(DeliveryStatus, [location_data])[0]
             logger.info(f"Location update saved for delivery {location_data.get('delivery_id')}")
-            return status.id
+            return status_id
         except Exception as e:
             self.db.rollback()
             logger.error(f"Error saving location update: {e}")
@@ -94,12 +113,21 @@ class DatabaseService:
     def get_delivery_tracking(self, delivery_id: str, limit: int = 100) -> Dict[str, Any]:
         """Get delivery tracking data with location history."""
         try:
-            # Get latest status
-            latest = self.db.query(DeliveryStatus).filter(
+            # Location history, newest first; its head is the latest status.
+            # Only the tracked columns are loaded and timestamps stay datetimes,
+            # leaving serialization to the route's ORJSONResponse.
+            history = self.db.query(
+                DeliveryStatus.current_location,
+                DeliveryStatus.timestamp,
+                DeliveryStatus.status,
+                DeliveryStatus.speed_kmh,
+                DeliveryStatus.heading,
+                DeliveryStatus.battery_level
+            ).filter(
                 DeliveryStatus.delivery_id == delivery_id
-            ).order_by(DeliveryStatus.timestamp.desc()).first()
+            ).order_by(DeliveryStatus.timestamp.desc()).limit(max(limit, 1)).all()
             
-            if not latest:
+            if not history:
                 return {
                     "delivery_id": delivery_id,
                     "current_location": None,
@@ -107,23 +135,20 @@ class DatabaseService:
                     "location_history": []
                 }
             
-            # Get location history
-            history = self.db.query(DeliveryStatus).filter(
-                DeliveryStatus.delivery_id == delivery_id
-            ).order_by(DeliveryStatus.timestamp.desc()).limit(limit).all()
+            latest = history[0]
             
             return {
                 "delivery_id": delivery_id,
                 "current_location": latest.current_location,
                 "status": latest.status,
-                "timestamp": latest.timestamp.isoformat(),
+                "timestamp": latest.timestamp,
                 "speed_kmh": latest.speed_kmh,
                 "heading": latest.heading,
                 "battery_level": latest.battery_level,
                 "location_history": [
                     {
                         "location": h.current_location,
-                        "timestamp": h.timestamp.isoformat(),
+                        "timestamp": h.timestamp,
                         "status": h.status,
                         "speed_kmh": h.speed_kmh,
                         "heading": h.heading
@@ -141,6 +166,92 @@ class DatabaseService:
             DeliveryStatus.delivery_id == delivery_id
         ).order_by(DeliveryStatus.timestamp.desc()).first()
 
+class LocationWriteBuffer:
+    """
+    Batches DeliveryStatus rows from the GPS hot path.
+    
+    Rows are queued in memory and written with one multi-row INSERT every
+    ``flush_interval`` seconds, or as soon as ``max_rows`` are waiting,
+    instead of one INSERT + COMMIT + SELECT per ping.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_rows: int = 500,
+        flush_interval: float = 0.25
+    ):
+        self._session_factory = session_factory
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self._rows: List[Dict[str, Any]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def add(self, location_data: Dict[str, Any]) -> str:
+        """Queue a location update; returns the ID it will be stored under."""
+        now = datetime.utcnow()
+        row = {"id": str(uuid.uuid4()), "timestamp": now, "created_at": now, **location_data}
+        self._rows.append(row)
+        if len(self._rows) >= self.max_rows and self._wakeup is not None:
+            self._wakeup.set()
+        return row["id"]
+    
+    def flush(self) -> int:
+        """
+        Write all queued rows in a single transaction.
+        If the batch fails, rows are retried one by one so only bad rows are lost.
+        Returns the number of rows written.
+        """
+        rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        db = self._session_factory()
+        try:
+            try:
+                db.execute(insert(DeliveryStatus), rows)
+                db.commit()
+                return len(rows)
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Batch insert of {len(rows)} location updates failed, retrying row by row: {e}")
+            
+            written = 0
+            for row in rows:
+                try:
+                    db.execute(insert(DeliveryStatus), [row])
+                    db.commit()
+                    written += 1
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Dropping location update {row['id']}: {e}")
+            if written < len(rows):
+                logger.error(f"Dropped {len(rows) - written} of {len(rows)} location updates")
+            return written
+        finally:
+            db.close()
+    
+    async def run(self):
+        """Flush periodically, or early when the buffer fills up."""
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                if self._rows:
+                    await asyncio.to_thread(self.flush)
+        finally:
+            self._wakeup = None
+
+
+location_write_buffer = LocationWriteBuffer()
+
+
 def init_db():
     """Initialize database."""
     return db_init()
@@ -1,23 +1,57 @@
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from database.models import Delivery, User, RiderProfile
 from api.services.maps import MapsService
 from api.schemas.delivery import Coordinate
 from loguru import logger
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, NamedTuple, Tuple
+import numpy as np
+import time
 import uuid
 
+# Riders change status rarely compared with the dispatch tick
+AVAILABLE_RIDERS_TTL = 5.0  # seconds
+
+
+class AvailableRider(NamedTuple):
+    """The rider columns dispatch actually reads."""
+    id: str
+    username: str
+    full_name: Optional[str]
+
+
+_available_riders: Optional[Tuple[float, List[AvailableRider]]] = None
+
+
+def invalidate_available_riders() -> None:
+    """Drop the cached rider list, e.g. after a user status change."""
+    global _available_riders
+    _available_riders = None
+
+
 class DispatchService:
     def __init__(self, db: Session):
         self.db = db
         self.maps_service = MapsService()
 
-    def find_available_riders(self) -> List[User]:
-        """Find active and available riders."""
-        return self.db.query(User).filter(
-            User.role == "rider",
-            User.status == "active",
-            User.is_active == True
-        ).all()
+    def find_available_riders(self) -> List[AvailableRider]:
+        """Find active and available riders, cached for AVAILABLE_RIDERS_TTL."""
+        global _available_riders
+        now = time.monotonic()
+        cached = _available_riders
+        if cached and now - cached[0] < AVAILABLE_RIDERS_TTL:
+            return cached[1]
+        
+        riders = [
+            AvailableRider(*row)
+            for row in self.db.query(User.id, User.username, User.full_name).filter(
+                User.role == "rider",
+                User.status == "active",
+                User.is_active == True
+            )
+        ]
+        _available_riders = (now, riders)
+        return riders
 
     def get_unassigned_deliveries(self) -> List[Delivery]:
         """Get deliveries waiting for assignment."""
@@ -28,7 +62,6 @@ class DispatchService:
 
     async def auto_assign_deliveries(self) -> Dict[str, Any]:
         """Automatically match unassigned deliveries to nearest riders using distance logic."""
-        import math
         unassigned = self.get_unassigned_deliveries()
         available_riders = self.find_available_riders()
         
@@ -36,58 +69,65 @@ class DispatchService:
         if not unassigned or not available_riders:
             return {"assigned_count": 0, "message": "No unassigned orders or available riders found"}
             
-        # Get latest locations for all riders from cache
+        # Get latest locations for all riders from cache in one lookup
         from api.services.location_cache import location_cache
+        rider_locs = location_cache.get_many_by_rider([rider.id for rider in available_riders])
+        
+        # Rider positions; fall back to a default if not cached (e.g. RS Puram)
+        rider_points = [rider_locs.get(rider.id) for rider in available_riders]
+        r_lat = np.radians([loc['latitude'] if loc else 11.0168 for loc in rider_points])
+        r_lng = np.radians([loc['longitude'] if loc else 76.9558 for loc in rider_points])
+        cos_r = np.cos(r_lat)
         
+        # Pickup positions for deliveries that have one
+        pickups = []
         for delivery in unassigned:
-            best_rider = None
-            min_dist = float('inf')
-            
             p_lat = delivery.pickup_location.get('latitude') or delivery.pickup_location.get('lat')
             p_lng = delivery.pickup_location.get('longitude') or delivery.pickup_location.get('lng')
-            
             if p_lat is None: continue
-
-            for rider in available_riders:
-                # Try to get rider's real position from cache
-                rider_loc = await location_cache.get_by_rider(rider.id)
-                
-                if rider_loc:
-                    r_lat, r_lng = rider_loc['latitude'], rider_loc['longitude']
-                else:
-                    # Fallback to a default if no cache (e.g. RS Puram)
-                    r_lat, r_lng = 11.0168, 76.9558
-                
-                # Simple Haversine approximation
-                dlat = math.radians(r_lat - p_lat)
-                dlng = math.radians(r_lng - p_lng)
-                a = (math.sin(dlat / 2) ** 2 + 
-                     math.cos(math.radians(p_lat)) * math.cos(math.radians(r_lat)) * 
-                     math.sin(dlng / 2) ** 2)
-                c = 2 * math.asin(math.sqrt(a))
-                dist = 6371 * c # Distance in km
-                
-                if dist < min_dist:
-                    min_dist = dist
-                    best_rider = rider
+            pickups.append((delivery, p_lat, p_lng))
+        
+        if pickups:
+            p_lat = np.radians([p[1] for p in pickups])[:, None]
+            p_lng = np.radians([p[2] for p in pickups])[:, None]
+            
+            # (D, R) matrix of the haversine term a, which orders pairs exactly as
+            # distance does; arcsin/sqrt only run for each delivery's winner
+            a = (np.sin((r_lat - p_lat) * 0.5) ** 2 +
+                 np.cos(p_lat) * cos_r * np.sin((r_lng - p_lng) * 0.5) ** 2)
+            nearest = a.argmin(axis=1)
+            min_dists = 2 * 6371 * np.arcsin(np.sqrt(a[np.arange(len(pickups)), nearest]))
+        
+        events = []
+        updates = []
+        for row, (delivery, _, _) in enumerate(pickups):
+            best_rider = available_riders[nearest[row]]
+            min_dist = float(min_dists[row])
+            
+            updates.append({"id": delivery.id, "assigned_rider_id": best_rider.id, "status": "assigned"})
+            assignments += 1
+            logger.info(f"Auto-assigned delivery {delivery.order_id} to rider {best_rider.username} (Dist: {min_dist:.2f}km)")
+            
+            events.append({
+                "delivery_id": delivery.id,
+                "order_id": delivery.order_id,
+                "rider_id": best_rider.id,
+                "rider_name": best_rider.full_name or best_rider.username
+            })
             
-            if best_rider:
-                delivery.assigned_rider_id = best_rider.id
-                delivery.status = "assigned"
-                assignments += 1
-                logger.info(f"Auto-assigned delivery {delivery.order_id} to rider {best_rider.username} (Dist: {min_dist:.2f}km)")
-                
-                # Broadcast assignment
-                from api.routes.notifications import manager as notification_manager
-                await notification_manager.broadcast({
-                    "type": "delivery_assigned",
-                    "delivery_id": delivery.id,
-                    "order_id": delivery.order_id,
-                    "rider_id": best_rider.id,
-                    "rider_name": best_rider.full_name or best_rider.username
-                })
-                
+        # One executemany UPDATE keyed by primary key instead of N dirty-row flushes
+        if updates:
+            self.db.execute(update(Delivery), updates)
         self.db.commit()
+        
+        # Broadcast all assignments as a single batch
+        if events:
+            from api.routes.notifications import manager as notification_manager
+            await notification_manager.broadcast({
+                "type": "deliveries_assigned",
+                "items": events
+            })
+        
         return {
             "assigned_count": assignments, 
             "status": "success",
@@ -2,8 +2,11 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from loguru import logger
+import asyncio
+import threading
+import time
 import sys
 from pathlib import Path
 
@@ -12,6 +15,39 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 from config.config import settings
 
 
+# Idle SMTP connections kept, and SOS emails sent in parallel
+MAX_SMTP_CONNECTIONS = 4
+
+# A queued SOS email is retried once after a short pause before it is given up
+SOS_SEND_ATTEMPTS = 2
+SOS_RETRY_DELAY_SECONDS = 2.0
+# How long shutdown waits for queued SOS emails to go out
+SOS_DRAIN_TIMEOUT_SECONDS = 30.0
+
+SOS_SUBJECT = "🚨 URGENT: SOS Alert - Help Needed"
+
+SOS_BODY_TEMPLATE = """
+URGENT SOS ALERT - HELP NEEDED
+
+A rider has triggered the emergency SOS button and needs immediate assistance.
+
+Rider Information:
+- Name: {rider_name}
+- Rider ID: {rider_id}
+
+Current Location:
+- Latitude: {lat}
+- Longitude: {lng}
+- Google Maps Link: https://www.google.com/maps?q={lat},{lng}
+
+Time: {time}
+
+Please take immediate action to assist the rider.
+
+This is an automated alert from Smart Shield Trust Route system.
+"""
+
+
 class EmailService:
     """Service for sending emails."""
     
@@ -25,6 +61,74 @@ class EmailService:
         self.from_email = settings.FROM_EMAIL
         self.use_tls = settings.SMTP_USE_TLS
         self.emergency_email = settings.EMERGENCY_EMAIL
+        
+        # Logged-in SMTP connections reused across sends (TLS + AUTH once each);
+        # concurrent sends check out separate connections
+        self._idle_conns: List[smtplib.SMTP] = []
+        self._conn_lock = threading.Lock()
+        
+        # Background SOS sender, started on the first queued alert
+        self._sos_queue: Optional[asyncio.Queue] = None
+        self._sos_worker: Optional[asyncio.Task] = None
+        self._sos_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def queue_sos_alert(
+        self,
+        rider_name: str,
+        rider_id: str,
+        location: Dict,
+        to_email: Optional[str] = None
+    ) -> bool:
+        """
+        Queue an SOS alert email and return without waiting for SMTP.
+        
+        Must be called from the event loop; a background worker sends it.
+        
+        Returns:
+            True once the alert is queued (not yet delivered)
+        """
+        loop = asyncio.get_running_loop()
+        if self._sos_worker is None or self._sos_worker.done() or self._sos_loop is not loop:
+            self._sos_queue = asyncio.Queue()
+            self._sos_loop = loop
+            self._sos_worker = loop.create_task(self._run_sos_worker(self._sos_queue))
+        self._sos_queue.put_nowait((rider_name, rider_id, location, to_email))
+        return True
+    
+    async def _run_sos_worker(self, queue: asyncio.Queue, batch_size: int = MAX_SMTP_CONNECTIONS):
+        """Drain queued SOS alerts and send each batch in parallel off the event loop."""
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                # Recipients are reached concurrently, one connection per in-flight send
+                await asyncio.gather(*(asyncio.to_thread(self._send_queued_sos, *item) for item in batch))
+            finally:
+                for _ in batch:
+                    queue.task_done()
+    
+    def _send_queued_sos(self, rider_name: str, rider_id: str, location: Dict, to_email: Optional[str]) -> bool:
+        """Send a queued SOS email, retrying after a pause if the first attempt fails."""
+        for attempt in range(1, SOS_SEND_ATTEMPTS + 1):
+            if self.send_sos_alert(rider_name, rider_id, location, to_email):
+                return True
+            if attempt < SOS_SEND_ATTEMPTS:
+                logger.warning(f"SOS email for rider {rider_id} failed (attempt {attempt}), retrying")
+                time.sleep(SOS_RETRY_DELAY_SECONDS)
+        logger.critical(f"SOS email for rider {rider_id} NOT delivered after {SOS_SEND_ATTEMPTS} attempts")
+        return False
+    
+    async def drain_sos_queue(self, timeout: float = SOS_DRAIN_TIMEOUT_SECONDS):
+        """Wait for queued SOS emails to be sent, then stop the worker. Called on shutdown."""
+        if self._sos_queue is None or self._sos_worker is None or self._sos_worker.done():
+            return
+        try:
+            await asyncio.wait_for(self._sos_queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.critical(f"Shutting down with {self._sos_queue.qsize()} SOS emails still queued")
+        finally:
+            self._sos_worker.cancel()
     
     def send_sos_alert(
         self,
@@ -52,35 +156,18 @@ class EmailService:
             lat = location.get('latitude', location.get('lat', 0))
             lng = location.get('longitude', location.get('lng', 0))
             
-            # Create email message
-            subject = "🚨 URGENT: SOS Alert - Help Needed"
-            
-            # Create message body
-            body = f"""
-URGENT SOS ALERT - HELP NEEDED
-
-A rider has triggered the emergency SOS button and needs immediate assistance.
-
-Rider Information:
-- Name: {rider_name}
-- Rider ID: {rider_id}
-
-Current Location:
-- Latitude: {lat}
-- Longitude: {lng}
-- Google Maps Link: https://www.google.com/maps?q={lat},{lng}
-
-Time: {self._get_current_time()}
-
-Please take immediate action to assist the rider.
-
-This is an automated alert from Smart Shield Trust Route system.
-"""
+            body = SOS_BODY_TEMPLATE.format(
+                rider_name=rider_name,
+                rider_id=rider_id,
+                lat=lat,
+                lng=lng,
+                time=self._get_current_time()
+            )
             
             # Send email
             return self._send_email(
                 to_email=recipient,
-                subject=subject,
+                subject=SOS_SUBJECT,
                 body=body
             )
             
@@ -135,12 +222,20 @@ This is an automated alert from Smart Shield Trust Route system.
                 html_part = MIMEText(html_body, 'html')
                 msg.attach(html_part)
             
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                if self.use_tls:
-                    server.starttls()
-                server.login(self.smtp_username, password)
-                server.send_message(msg)
+            # Send email over a pooled connection
+            conn = self._checkout_connection(password)
+            try:
+                try:
+                    conn.send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # Server dropped the idle connection; reconnect once and retry
+                    self._close_connection(conn)
+                    conn = self._open_connection(password)
+                    conn.send_message(msg)
+            except Exception:
+                self._close_connection(conn)
+                raise
+            self._checkin_connection(conn)
             
             logger.info(f"Email sent successfully to {to_email}")
             return True
@@ -149,8 +244,42 @@ This is an automated alert from Smart Shield Trust Route system.
             logger.error(f"Failed to send email to {to_email}: {e}")
             return False
     
+    def _checkout_connection(self, password: str) -> smtplib.SMTP:
+        """Take an idle SMTP connection, or open a new one if none is free."""
+        with self._conn_lock:
+            if self._idle_conns:
+                return self._idle_conns.pop()
+        return self._open_connection(password)
+    
+    def _checkin_connection(self, conn: smtplib.SMTP):
+        """Return a healthy connection to the pool, closing any beyond the cap."""
+        with self._conn_lock:
+            if len(self._idle_conns) < MAX_SMTP_CONNECTIONS:
+                self._idle_conns.append(conn)
+                return
+        self._close_connection(conn)
+    
+    def _open_connection(self, password: str) -> smtplib.SMTP:
+        """Connect and log in to the SMTP server."""
+        conn = smtplib.SMTP(self.smtp_server, self.smtp_port)
+        try:
+            if self.use_tls:
+                conn.starttls()
+            conn.login(self.smtp_username, password)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+    
+    @staticmethod
+    def _close_connection(conn: smtplib.SMTP):
+        """Close an SMTP connection, quietly if the server already dropped it."""
+        try:
+            conn.quit()
+        except (smtplib.SMTPException, OSError):
+            conn.close()
+    
     def _get_current_time(self) -> str:
         """Get current time as formatted string."""
-        from datetime import datetime
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
+        return time.strftime("%Y-%m-%d %H:%M:%S UTC")
 
@@ -4,13 +4,112 @@ Integrates Google Gemini models for enhanced feedback analysis and safety recomm
 """
 import google.generativeai as genai
 import json
+import orjson
 import asyncio
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 import os
+import time
 from loguru import logger
-from functools import lru_cache
 import hashlib
+import re
+
+# Bounds in-flight Gemini calls so bursts don't trip rate limits (429s)
+MAX_CONCURRENT_REQUESTS = 20
+_request_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+# Per-request fields, filled with str.format_map; no indentation so no
+# whitespace tokens are sent
+FEEDBACK_PROMPT = """
+Feedback: "{feedback_text}"
+
+Context:
+- Time: {time}
+- Location: {location}
+- Route ID: {route_id}
+"""
+
+BRIEFING_PROMPT = """
+Route Details:
+- Distance: {distance_km} km
+- Duration: {duration_minutes} minutes
+- Start Time: {start_time}
+- Safety Score: {safety_score}/100
+- High-risk areas: {high_risk_areas}
+
+Rider Profile:
+- Experience: {experience_months} months
+- Gender: {gender}
+- Previous incidents: {incident_count}
+"""
+
+ROUTE_PROMPT = """
+Available Routes:
+{routes_text}
+
+Constraints:
+- Safety Priority: {safety_priority} (low/medium/high)
+- Max Time: {max_time_minutes} minutes
+- Rider Experience: {rider_experience}
+- Time of Day: {time_of_day}
+"""
+
+# Keyword fallback: one compiled alternation finds every keyword in a single scan
+SAFETY_KEYWORDS = ('unsafe', 'danger', 'scary', 'attack', 'harassment', 'accident')
+POSITIVE_KEYWORDS = ('safe', 'good', 'great', 'excellent', 'fine')
+_KEYWORD_RE = re.compile("|".join(map(re.escape, SAFETY_KEYWORDS + POSITIVE_KEYWORDS)))
+
+RESPONSE_CACHE_TTL = 3600  # 1 hour
+RESPONSE_CACHE_MAX_ENTRIES = 10_000
+
+# Fixed task instructions, sent as the leading prompt part so every call for a
+# task shares an identical prefix that the provider can cache; only the
+# per-request fields follow it
+SENTIMENT_INSTRUCTIONS = """
+Analyze delivery rider feedback for safety concerns and sentiment.
+Provide a structured analysis in JSON format.
+
+Return JSON with:
+{
+    "sentiment": "positive/negative/neutral",
+    "safety_concerns": ["list", "of", "concerns"],
+    "severity_level": "low/medium/high/critical",
+    "recommendations": ["actionable", "recommendations"],
+    "categories": ["safety", "traffic", "service", "other"]
+}
+"""
+
+BRIEFING_INSTRUCTIONS = """
+Generate a personalized safety briefing for a delivery rider from the route
+details and rider profile that follow.
+
+Generate a concise safety briefing with:
+1. Key safety tips
+2. Emergency contacts
+3. Risk mitigation strategies
+4. What to do in case of emergency
+
+Keep it under 300 words, practical and reassuring.
+"""
+
+ROUTE_INSTRUCTIONS = """
+Analyze the delivery route options that follow and recommend the best one
+under the given constraints.
+
+Consider:
+1. Safety first for night routes or inexperienced riders
+2. Time efficiency during peak hours
+3. Traffic conditions
+4. Distance optimization
+
+Return JSON with:
+{
+    "recommended_route_index": 0,
+    "reasoning": "detailed explanation",
+    "trade_offs": "what's gained/lost vs other options",
+    "confidence_score": 0.85
+}
+"""
 
 class GenAIService:
     """Service for integrating Generative AI capabilities using Google Gemini"""
@@ -18,6 +117,8 @@ class GenAIService:
     def __init__(self):
         self.api_key = os.getenv("GOOGLE_API_KEY")
         self.model_name = os.getenv("GEMINI_MODEL", "gemini-pro")
+        # AI responses keyed by (method, model, inputs); insertion-ordered for eviction
+        self._response_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
 
         if not self.api_key or "placeholder" in self.api_key.lower():
             logger.warning("Google API key not found or placeholder. GenAI features will be disabled.")
@@ -39,32 +140,20 @@ class GenAIService:
         if not self.enabled:
             return self._fallback_sentiment_analysis(feedback_text, context)
 
+        cache_key = self._get_cache_key("analyze_feedback_sentiment", feedback_text, context)
+        cached = self._get_cached_response(cache_key)
+        if cached:
+            return cached
+
         try:
-            prompt = f"""
-            Analyze this delivery rider feedback for safety concerns and sentiment.
-            Provide a structured analysis in JSON format.
-
-            Feedback: "{feedback_text}"
-
-            Context:
-            - Time: {context.get('time', 'Unknown')}
-            - Location: {context.get('location', 'Unknown')}
-            - Route ID: {context.get('route_id', 'Unknown')}
-
-            Return JSON with:
-            {{
-                "sentiment": "positive/negative/neutral",
-                "safety_concerns": ["list", "of", "concerns"],
-                "severity_level": "low/medium/high/critical",
-                "recommendations": ["actionable", "recommendations"],
-                "categories": ["safety", "traffic", "service", "other"]
-            }}
-            """
-
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.model.generate_content(prompt)
-            )
+            prompt = FEEDBACK_PROMPT.format_map({
+                "feedback_text": feedback_text,
+                "time": context.get('time', 'Unknown'),
+                "location": context.get('location', 'Unknown'),
+                "route_id": context.get('route_id', 'Unknown')
+            })
+
+            response = await self._generate(SENTIMENT_INSTRUCTIONS, prompt)
 
             # Extract JSON from response text (Gemini might wrap it in markdown)
             text = response.text
@@ -73,17 +162,28 @@ class GenAIService:
             elif "```" in text:
                 text = text.split("```")[1].split("```")[0].strip()
             
-            result = json.loads(text)
+            result = orjson.loads(text)
             result["analyzed_at"] = datetime.utcnow().isoformat()
             result["ai_model"] = self.model_name
 
             logger.info(f"AI feedback analysis completed for route {context.get('route_id')}")
+            self._store_response(cache_key, result)
             return result
 
         except Exception as e:
             logger.error(f"AI feedback analysis failed: {e}")
             return self._fallback_sentiment_analysis(feedback_text, context)
 
+    async def analyze_feedback_sentiment_batch(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Analyze a burst of (feedback_text, context) pairs concurrently.
+        Gemini calls share the module-wide concurrency limit; results keep input order.
+        """
+        return list(await asyncio.gather(*(
+            self.analyze_feedback_sentiment(feedback_text, context)
+            for feedback_text, context in items
+        )))
+
     async def generate_safety_briefing(self, route_data: Dict[str, Any], rider_profile: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate personalized safety briefing for riders before route start
@@ -91,44 +191,35 @@ class GenAIService:
         if not self.enabled:
             return self._fallback_safety_briefing(route_data, rider_profile)
 
+        cache_key = self._get_cache_key("generate_safety_briefing", route_data, rider_profile)
+        cached = self._get_cached_response(cache_key)
+        if cached:
+            return cached
+
         try:
-            prompt = f"""
-            Generate a personalized safety briefing for a delivery rider.
-
-            Route Details:
-            - Distance: {route_data.get('distance_km', 0)} km
-            - Duration: {route_data.get('duration_minutes', 0)} minutes
-            - Start Time: {route_data.get('start_time', 'Unknown')}
-            - Safety Score: {route_data.get('safety_score', 50)}/100
-            - High-risk areas: {', '.join(route_data.get('high_risk_areas', []))}
-
-            Rider Profile:
-            - Experience: {rider_profile.get('experience_months', 0)} months
-            - Gender: {rider_profile.get('gender', 'Unknown')}
-            - Previous incidents: {rider_profile.get('incident_count', 0)}
-
-            Generate a concise safety briefing with:
-            1. Key safety tips
-            2. Emergency contacts
-            3. Risk mitigation strategies
-            4. What to do in case of emergency
-
-            Keep it under 300 words, practical and reassuring.
-            """
-
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.model.generate_content(prompt)
-            )
+            prompt = BRIEFING_PROMPT.format_map({
+                "distance_km": route_data.get('distance_km', 0),
+                "duration_minutes": route_data.get('duration_minutes', 0),
+                "start_time": route_data.get('start_time', 'Unknown'),
+                "safety_score": route_data.get('safety_score', 50),
+                "high_risk_areas": ', '.join(route_data.get('high_risk_areas', [])),
+                "experience_months": rider_profile.get('experience_months', 0),
+                "gender": rider_profile.get('gender', 'Unknown'),
+                "incident_count": rider_profile.get('incident_count', 0)
+            })
+
+            response = await self._generate(BRIEFING_INSTRUCTIONS, prompt)
 
             briefing_text = response.text.strip()
 
-            return {
+            result = {
                 "briefing": briefing_text,
                 "generated_at": datetime.utcnow().isoformat(),
                 "ai_model": self.model_name,
                 "personalized": True
             }
+            self._store_response(cache_key, result)
+            return result
 
         except Exception as e:
             logger.error(f"AI safety briefing generation failed: {e}")
@@ -141,6 +232,11 @@ class GenAIService:
         if not self.enabled:
             return self._fallback_route_optimization(route_options, constraints)
 
+        cache_key = self._get_cache_key("optimize_route_with_ai", route_options, constraints)
+        cached = self._get_cached_response(cache_key)
+        if cached:
+            return cached
+
         try:
             routes_text = "\n".join([
                 f"Route {i+1}: {r.get('distance_km', 0)}km, {r.get('duration_min', 0)}min, "
@@ -148,37 +244,15 @@ class GenAIService:
                 for i, r in enumerate(route_options)
             ])
 
-            prompt = f"""
-            Analyze these delivery route options and recommend the best one.
-
-            Available Routes:
-            {routes_text}
-
-            Constraints:
-            - Safety Priority: {constraints.get('safety_priority', 'medium')} (low/medium/high)
-            - Max Time: {constraints.get('max_time_minutes', 'unlimited')} minutes
-            - Rider Experience: {constraints.get('rider_experience', 'unknown')}
-            - Time of Day: {constraints.get('time_of_day', 'daytime')}
-
-            Consider:
-            1. Safety first for night routes or inexperienced riders
-            2. Time efficiency during peak hours
-            3. Traffic conditions
-            4. Distance optimization
-
-            Return JSON with:
-            {{
-                "recommended_route_index": 0,
-                "reasoning": "detailed explanation",
-                "trade_offs": "what's gained/lost vs other options",
-                "confidence_score": 0.85
-            }}
-            """
-
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.model.generate_content(prompt)
-            )
+            prompt = ROUTE_PROMPT.format_map({
+                "routes_text": routes_text,
+                "safety_priority": constraints.get('safety_priority', 'medium'),
+                "max_time_minutes": constraints.get('max_time_minutes', 'unlimited'),
+                "rider_experience": constraints.get('rider_experience', 'unknown'),
+                "time_of_day": constraints.get('time_of_day', 'daytime')
+            })
+
+            response = await self._generate(ROUTE_INSTRUCTIONS, prompt)
 
             text = response.text
             if "```json" in text:
@@ -186,29 +260,41 @@ class GenAIService:
             elif "```" in text:
                 text = text.split("```")[1].split("```")[0].strip()
 
-            result = json.loads(text)
+            result = orjson.loads(text)
             result["analyzed_at"] = datetime.utcnow().isoformat()
             result["ai_model"] = self.model_name
 
+            self._store_response(cache_key, result)
             return result
 
         except Exception as e:
             logger.error(f"AI route optimization failed: {e}")
             return self._fallback_route_optimization(route_options, constraints)
 
+    async def _generate(self, instructions: str, prompt: str):
+        """Call Gemini's native async API under the shared concurrency limit"""
+        async with _request_slots:
+            response = await self.model.generate_content_async([instructions, prompt])
+
+        # Track provider-side prefix cache hits
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            logger.debug(
+                f"Gemini usage: {getattr(usage, 'prompt_token_count', 0)} prompt tokens, "
+                f"{getattr(usage, 'cached_content_token_count', 0)} cached"
+            )
+        return response
+
     def _fallback_sentiment_analysis(self, feedback_text: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Fallback sentiment analysis when AI is unavailable"""
         # Simple keyword-based analysis
-        text_lower = feedback_text.lower()
-        safety_keywords = ['unsafe', 'danger', 'scary', 'attack', 'harassment', 'accident']
-        positive_keywords = ['safe', 'good', 'great', 'excellent', 'fine']
-
-        has_safety_concerns = any(keyword in text_lower for keyword in safety_keywords)
-        has_positive = any(keyword in text_lower for keyword in positive_keywords)
+        hits = set(_KEYWORD_RE.findall(feedback_text.lower()))
+        has_safety_concerns = not hits.isdisjoint(SAFETY_KEYWORDS)
+        has_positive = not hits.isdisjoint(POSITIVE_KEYWORDS)
 
         if has_safety_concerns:
             sentiment = "negative"
-            severity = "high" if 'attack' in text_lower or 'harassment' in text_lower else "medium"
+            severity = "high" if 'attack' in hits or 'harassment' in hits else "medium"
         elif has_positive:
             sentiment = "positive"
             severity = "low"
@@ -258,8 +344,21 @@ class GenAIService:
             "analyzed_at": datetime.utcnow().isoformat()
         }
 
-    @lru_cache(maxsize=100)
-    def _get_cache_key(self, content: str, context: str) -> str:
+    def _get_cache_key(self, method: str, *inputs: Any) -> str:
         """Generate cache key for AI responses"""
-        combined = f"{content}:{context}"
-        return hashlib.md5(combined.encode()).hexdigest()
+        payload = json.dumps([method, self.model_name, *inputs], sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def _get_cached_response(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of a fresh cached AI response, marked as cached"""
+        entry = self._response_cache.get(key)
+        if entry and time.monotonic() - entry[0] < RESPONSE_CACHE_TTL:
+            return {**entry[1], "cached": True}
+        return None
+
+    def _store_response(self, key: str, result: Dict[str, Any]):
+        """Cache an AI response, evicting the oldest entry when full"""
+        self._response_cache.pop(key, None)
+        if len(self._response_cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+            del self._response_cache[next(iter(self._response_cache))]
+        self._response_cache[key] = (time.monotonic(), result)
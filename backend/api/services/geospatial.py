@@ -1,11 +1,20 @@
 import h3
-from typing import List, Dict, Set, Optional
+import numpy as np
+from typing import List, Dict, Sequence
 import time
 from loguru import logger
 
 # Check H3 version to use correct API
 H3_VERSION = int(h3.__version__.split('.')[0])
 
+# Bind the version-specific H3 functions once so hot paths make direct calls
+if H3_VERSION >= 4:
+    _latlng_to_cell, _grid_disk = h3.latlng_to_cell, h3.grid_disk
+    _cell_to_int, _int_to_cell = h3.str_to_int, h3.int_to_str
+else:
+    _latlng_to_cell, _grid_disk = h3.geo_to_h3, h3.k_ring
+    _cell_to_int, _int_to_cell = h3.string_to_h3, h3.h3_to_string
+
 class GeospatialService:
     """
     Advanced Geospatial Service using Uber's H3 Hexagonal Indexing.
@@ -13,21 +22,26 @@ class GeospatialService:
     Compatible with H3 v3 and v4.
     """
     
-    def __init__(self, resolution: int = 9):
+    def __init__(self, resolution: int = 9, initial_capacity: int = 1024):
         # Resolution 9 is approx 0.1 sq km (hex edge ~174m) - perfect city scale
         self.resolution = resolution
-        # In-memory 'Hive' structure: {hex_id: {rider_id: last_ping_time}}
-        self._hive: Dict[str, Dict[str, float]] = {}
+        # In-memory 'Hive' as parallel arrays, one row per rider:
+        # hex cell (as H3 integer), last ping time and rider ID
+        self._hex_ids = np.zeros(initial_capacity, dtype=np.uint64)
+        self._timestamps = np.zeros(initial_capacity, dtype=np.float64)
+        self._rider_ids = np.empty(initial_capacity, dtype=object)
+        self._rider_rows: Dict[str, int] = {}
+        self._size = 0
         # TTL for online status: 5 minutes (300 seconds)
         self.online_timeout = 300
+        # Stale rows are swept lazily, at most every online_timeout / 2;
+        # reads already filter by timestamp, so unswept rows are harmless
+        self._last_sweep = time.time()
     
     def get_hex_id(self, latitude: float, longitude: float) -> str:
         """Convert GPS coordinates to H3 Hexagon ID."""
         try:
-            if H3_VERSION >= 4:
-                return h3.latlng_to_cell(latitude, longitude, self.resolution)
-            else:
-                return h3.geo_to_h3(latitude, longitude, self.resolution)
+            return _latlng_to_cell(latitude, longitude, self.resolution)
         except Exception as e:
             logger.error(f"H3 Conversion Error (v{H3_VERSION}): {e}")
             return ""
@@ -41,16 +55,41 @@ class GeospatialService:
         if not hex_id:
             return
 
-        currentTime = time.time()
+        self._maybe_sweep()
+        row = self._row_for(rider_id)
+        self._hex_ids[row] = _cell_to_int(hex_id)
+        self._timestamps[row] = time.time()
+
+    def update_rider_locations_bulk(
+        self,
+        rider_ids: Sequence[str],
+        latitudes: Sequence[float],
+        longitudes: Sequence[float]
+    ):
+        """
+        Register a tick's worth of rider pings at once.
+        Cells are written to the arrays in one assignment with a shared timestamp.
+        """
+        to_cell = _latlng_to_cell
+        resolution = self.resolution
+        rows, cells = [], []
         
-        # Add to new hex
-        if hex_id not in self._hive:
-            self._hive[hex_id] = {}
+        # Make room up front so no compaction shifts rows mid-batch
+        self._maybe_sweep()
+        self._reserve(rider_ids)
         
-        self._hive[hex_id][rider_id] = currentTime
+        for rider_id, lat, lng in zip(rider_ids, latitudes, longitudes):
+            try:
+                hex_id = to_cell(float(lat), float(lng), resolution)
+            except Exception as e:
+                logger.error(f"H3 Conversion Error (v{H3_VERSION}): {e}")
+                continue
+            rows.append(self._row_for(rider_id))
+            cells.append(_cell_to_int(hex_id))
         
-        # Clean up stale riders from this hex occasionally
-        self._cleanup_hex(hex_id)
+        if rows:
+            self._hex_ids[rows] = np.array(cells, dtype=np.uint64)
+            self._timestamps[rows] = time.time()
 
     def find_nearby_riders(self, latitude: float, longitude: float, k_rings: int = 1) -> List[str]:
         """
@@ -62,52 +101,84 @@ class GeospatialService:
 
         # Get the ring of cells around the center
         try:
-            if H3_VERSION >= 4:
-                search_cells = h3.grid_disk(center_hex, k_rings)
-            else:
-                search_cells = h3.k_ring(center_hex, k_rings)
+            search_cells = _grid_disk(center_hex, k_rings)
         except Exception as e:
             logger.error(f"H3 Neighbor Error: {e}")
             return []
         
-        nearby_riders = []
-        now = time.time()
+        # One vectorized pass: in the K-Ring and not timed out
+        cells = np.fromiter((_cell_to_int(c) for c in search_cells), dtype=np.uint64, count=len(search_cells))
+        n = self._size
+        mask = np.isin(self._hex_ids[:n], cells) & self._active_mask(n)
         
-        for cell in search_cells:
-            if cell in self._hive:
-                for rider_id, timestamp in self._hive[cell].items():
-                    # Only include if rider hasn't timed out
-                    if now - timestamp < self.online_timeout:
-                        nearby_riders.append(rider_id)
+        return self._rider_ids[:n][mask].tolist()
+
+    def _row_for(self, rider_id: str) -> int:
+        """Return the rider's row, appending one if the rider is new."""
+        row = self._rider_rows.get(rider_id)
+        if row is not None:
+            return row
         
-        return list(set(nearby_riders))
+        self._reserve((rider_id,))
+        row = self._size
+        self._size += 1
+        self._rider_rows[rider_id] = row
+        self._rider_ids[row] = rider_id
+        # A reused slot may hold a stale timestamp; a new row is live until written
+        self._timestamps[row] = time.time()
+        return row
 
-    def _cleanup_hex(self, hex_id: str):
-        """Remove stale riders from a specific hex."""
-        if hex_id not in self._hive:
+    def _reserve(self, rider_ids: Sequence[str]):
+        """Ensure room for a row per new rider in rider_ids, compacting stale rows before growing."""
+        extra = len(set(rider_ids).difference(self._rider_rows))
+        if self._size + extra <= len(self._rider_ids):
             return
-            
+        # Reclaim stale rows before paying for a bigger allocation
+        self._cleanup_stale()
+        # Compaction may have dropped riders that are in this batch
+        extra = len(set(rider_ids).difference(self._rider_rows))
+        capacity = max(len(self._rider_ids), 1)
+        while self._size + extra > capacity:
+            capacity *= 2
+        if capacity == len(self._rider_ids):
+            return
+        for name in ("_hex_ids", "_timestamps", "_rider_ids"):
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[:self._size] = old[:self._size]
+            setattr(self, name, grown)
+
+    def _active_mask(self, n: int) -> np.ndarray:
+        """Rows among the first n whose last ping is within the online timeout."""
+        return self._timestamps[:n] > time.time() - self.online_timeout
+
+    def _maybe_sweep(self):
+        """Compact away timed-out riders if the sweep interval has elapsed."""
         now = time.time()
-        stale_ids = [
-            rid for rid, ts in self._hive[hex_id].items() 
-            if now - ts > self.online_timeout
-        ]
+        if now - self._last_sweep >= self.online_timeout / 2:
+            self._last_sweep = now
+            self._cleanup_stale()
+
+    def _cleanup_stale(self):
+        """Drop timed-out riders by compacting all arrays in one pass."""
+        n = self._size
+        keep = np.flatnonzero(self._active_mask(n))
+        if len(keep) == n:
+            return
         
-        for rid in stale_ids:
-            del self._hive[hex_id][rid]
-            
-        if not self._hive[hex_id]:
-            del self._hive[hex_id]
+        m = len(keep)
+        self._hex_ids[:m] = self._hex_ids[keep]
+        self._timestamps[:m] = self._timestamps[keep]
+        self._rider_ids[:m] = self._rider_ids[keep]
+        self._rider_ids[m:n] = None
+        self._size = m
+        self._rider_rows = {rider_id: row for row, rider_id in enumerate(self._rider_ids[:m])}
 
     def get_cluster_stats(self) -> Dict[str, int]:
         """Get distribution of riders across hexagons."""
-        stats = {}
-        now = time.time()
-        for hex_id, riders in self._hive.items():
-            active_count = len([rid for rid, ts in riders.items() if now - ts < self.online_timeout])
-            if active_count > 0:
-                stats[hex_id] = active_count
-        return stats
+        n = self._size
+        hex_ids, counts = np.unique(self._hex_ids[:n][self._active_mask(n)], return_counts=True)
+        return {_int_to_cell(int(h)): int(c) for h, c in zip(hex_ids, counts)}
 
 # Global Singleton instance
 geo_service = GeospatialService()
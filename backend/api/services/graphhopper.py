@@ -2,15 +2,93 @@
 backend/api/services/graphhopper.py - GraphHopper API Integration
 """
 import requests
-import polyline
-from typing import List, Dict, Optional, Tuple
+import orjson
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Optional, Sequence, Tuple
 from loguru import logger
 from config.config import settings
+from api.utils.polyline_decoder import decode_polyline_array
+
+
+# Longest we will sleep on a server's Retry-After before retrying
+RETRY_AFTER_MAX_SECONDS = 5.0
+
+
+class _CappedRetry(Retry):
+    """Retry that honours Retry-After, but never sleeps longer than RETRY_AFTER_MAX_SECONDS."""
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, RETRY_AFTER_MAX_SECONDS)
+
+
+def _build_session() -> requests.Session:
+    """Keep-alive session with pooled connections and retry on throttling/gateway errors."""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=100,
+        # Exponential backoff with jitter; a 429/503 Retry-After header takes precedence
+        max_retries=_CappedRetry(
+            total=5,
+            backoff_factor=0.2,
+            backoff_max=5,
+            backoff_jitter=0.2,
+            status_forcelist=[429, 502, 503, 504],
+            respect_retry_after_header=True
+        )
+    ))
+    return session
+
+
+class _TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request may be sent."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Going negative reserves a future slot, so concurrent waiters queue up
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+# Shared across instances: MapsService builds a GraphHopperService per request
+_session = _build_session()
+_rate_limiter = _TokenBucket(settings.GRAPHHOPPER_QPS)
+
+# GraphHopper instruction sign codes -3..6, indexed by sign + 3
+_MANEUVER_TABLE = (
+    "sharp_left", "left", "slight_left", "straight", "slight_right",
+    "right", "sharp_right", "destination", "arrival_at_waypoint", "roundabout"
+)
+
 
 class GraphHopperService:
     def __init__(self, api_key: str = None):
         self.api_key = api_key or settings.GRAPHHOPPER_API_KEY
         self.base_url = "https://graphhopper.com/api/1"
+        self.session = _session
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request once the shared rate limiter allows it."""
+        _rate_limiter.acquire()
+        return self.session.request(method, url, **kwargs)
 
     def get_directions(
         self, 
@@ -48,8 +126,8 @@ class GraphHopperService:
         }
 
         try:
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
+            response = self._request("GET", url, params=params, timeout=10)
+            data = orjson.loads(response.content)
 
             if response.status_code != 200:
                 logger.error(f"GraphHopper API error: {data.get('message', 'Unknown error')}")
@@ -78,8 +156,8 @@ class GraphHopperService:
         polyline_str = path.get('points', '')
         if polyline_str:
             try:
-                decoded_points = polyline.decode(polyline_str)
-                route_coordinates = [{'lat': p[0], 'lng': p[1]} for p in decoded_points]
+                decoded_points = decode_polyline_array(polyline_str).tolist()
+                route_coordinates = [{'lat': lat, 'lng': lng} for lat, lng in decoded_points]
             except Exception as e:
                 logger.warning(f"Failed to decode GraphHopper polyline: {e}")
         
@@ -111,9 +189,9 @@ class GraphHopperService:
         return route
 
     def _normalize_instructions(self, gh_instructions: List[Dict]) -> List[Dict]:
-        steps = []
-        for instr in gh_instructions:
-            steps.append({
+        map_maneuver = self._map_maneuver
+        return [
+            {
                 'html_instructions': instr.get('text', ''),
                 'distance': {
                     'text': f"{instr['distance']:.0f} m",
@@ -123,29 +201,18 @@ class GraphHopperService:
                     'text': f"{int(instr['time'] / 1000)} s",
                     'value': int(instr['time'] / 1000)
                 },
-                'maneuver': self._map_maneuver(instr.get('sign', 0)),
+                'maneuver': map_maneuver(instr.get('sign', 0)),
                 'start_location': {'lat': 0, 'lng': 0}, # GH doesn't provide these per instruction directly easily
                 'end_location': {'lat': 0, 'lng': 0}
-            })
-        return steps
-
-    def _map_maneuver(self, sign: int) -> str:
-        # GraphHopper sign codes
-        mapping = {
-            -3: "sharp_left",
-            -2: "left",
-            -1: "slight_left",
-            0: "straight",
-            1: "slight_right",
-            2: "right",
-            3: "sharp_right",
-            4: "destination",
-            5: "arrival_at_waypoint",
-            6: "roundabout"
-        }
-        return mapping.get(sign, "straight")
+            }
+            for instr in gh_instructions
+        ]
+
+    @staticmethod
+    def _map_maneuver(sign: int) -> str:
+        return _MANEUVER_TABLE[sign + 3] if -3 <= sign <= 6 else "straight"
 
-    def get_matrix(self, points: List[Tuple[float, float]], out_arrays: List[str] = ["times", "distances"]) -> Optional[Dict]:
+    def get_matrix(self, points: List[Tuple[float, float]], out_arrays: Sequence[str] = ("times", "distances")) -> Optional[Dict]:
         """
         Get distance/time matrix using GraphHopper Matrix API
         """
@@ -156,14 +223,14 @@ class GraphHopperService:
         
         params = {
             "point": point_strings,
-            "out_array": out_arrays,
+            "out_array": list(out_arrays),
             "key": self.api_key,
             "vehicle": "car"
         }
         
         try:
-            response = requests.get(url, params=params, timeout=15)
-            return response.json()
+            response = self._request("GET", url, params=params, timeout=15)
+            return orjson.loads(response.content)
         except Exception as e:
             logger.error(f"GraphHopper Matrix API failed: {e}")
             return None
@@ -183,8 +250,8 @@ class GraphHopperService:
         
         try:
             # VRP is a POST request
-            response = requests.post(f"{url}?key={self.api_key}", json=body, timeout=20)
-            data = response.json()
+            response = self._request("POST", f"{url}?key={self.api_key}", json=body, timeout=20)
+            data = orjson.loads(response.content)
             
             if response.status_code == 200:
                 return data
@@ -210,8 +277,8 @@ class GraphHopperService:
         }
 
         try:
-            response = requests.get(url, params=params, timeout=5)
-            data = response.json()
+            response = self._request("GET", url, params=params, timeout=5)
+            data = orjson.loads(response.content)
             
             if data.get('hits'):
                 hit = data['hits'][0]
@@ -239,8 +306,8 @@ class GraphHopperService:
         }
 
         try:
-            response = requests.get(url, params=params, timeout=5)
-            data = response.json()
+            response = self._request("GET", url, params=params, timeout=5)
+            data = orjson.loads(response.content)
             
             if data.get('hits'):
                 return data['hits'][0].get('name', "Unknown Address")
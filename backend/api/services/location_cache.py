@@ -3,30 +3,57 @@ In-Memory Location Cache Service
 Simulates Redis-like behavior for ultra-fast location lookups.
 - No database hit on every GPS update
 - O(1) read for latest rider position
-- Thread-safe with asyncio locks
-- TTL (Time To Live) support for stale data cleanup
+- All operations are plain synchronous calls: no I/O and no await points, so
+  each one runs atomically on the event loop and no lock is needed
+- TTL (Time To Live) support for stale data cleanup, driven by an expiry
+  min-heap so sweeps only touch entries that are actually due
 """
-import asyncio
+import heapq
+import itertools
 import time
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from loguru import logger
 from datetime import datetime
 
 
 class LocationCacheEntry:
-    """A single cached location entry with TTL."""
-    def __init__(self, data: Dict[str, Any], ttl_seconds: int = 300):
+    """
+    A single cached location entry with TTL.
+    created_at is a time.monotonic() reading, so expiry is immune to wall-clock
+    jumps; the wall-clock time for reporting lives in data["cached_at"].
+    """
+    __slots__ = ("data", "created_at", "ttl")
+
+    def __init__(self, data: Dict[str, Any], ttl_seconds: int = 300, created_at: Optional[float] = None):
         self.data = data
-        self.created_at = time.time()
+        self.created_at = time.monotonic() if created_at is None else created_at
         self.ttl = ttl_seconds
 
     @property
     def is_expired(self) -> bool:
-        return (time.time() - self.created_at) > self.ttl
+        return self.expired_at(time.monotonic())
 
     @property
     def age_seconds(self) -> float:
-        return time.time() - self.created_at
+        return time.monotonic() - self.created_at
+
+    def expired_at(self, now: float) -> bool:
+        """Expiry check against a time.monotonic() reading the caller already took."""
+        return self.created_at + self.ttl < now
+
+
+def location_payload(data: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Copy of a cached location for API responses, adding the ISO timestamp and
+    cache age. Cache reads hand out the stored dict itself; only response
+    edges that expose these fields pay for the copy.
+    """
+    cached_at = data["cached_at"]
+    return {
+        **data,
+        "timestamp": datetime.utcfromtimestamp(cached_at).isoformat(),
+        "cache_age_seconds": (time.time() if now is None else now) - cached_at
+    }
 
 
 class LocationCache:
@@ -56,8 +83,13 @@ class LocationCache:
         # Fleet-wide cache: rider_id -> latest location
         self._fleet_cache: Dict[str, LocationCacheEntry] = {}
         
+        # Expiry min-heap: (expires_at, seq, entry), one item per entry. In-place
+        # refreshes don't push; a popped item whose entry was refreshed is
+        # re-pushed at its new expiry instead.
+        self._expiry_heap: List[Tuple[float, int, LocationCacheEntry]] = []
+        self._expiry_seq = itertools.count()
+        
         self._default_ttl = default_ttl
-        self._lock = asyncio.Lock()
         
         # Statistics
         self._hits = 0
@@ -65,7 +97,7 @@ class LocationCache:
         
         logger.info("📦 LocationCache initialized (in-memory, Redis-like)")
 
-    async def set_location(
+    def set_location(
         self,
         delivery_id: str,
         rider_id: str,
@@ -81,7 +113,26 @@ class LocationCache:
         Store the latest rider location in cache.
         This is called on EVERY GPS update — must be ultra-fast.
         """
-        entry_data = {
+        now = time.time()
+        mono = time.monotonic()
+        existing = self._fleet_cache.get(rider_id)
+        if existing is not None and existing.data["delivery_id"] == delivery_id:
+            # Same rider, same delivery: rewrite the cached entry in place
+            data = existing.data
+            data["latitude"] = latitude
+            data["longitude"] = longitude
+            data["status"] = status
+            data["speed_kmh"] = speed_kmh
+            data["heading"] = heading
+            data["battery_level"] = battery_level
+            data["reoptimization_needed"] = reoptimization_needed
+            data["cached_at"] = now
+            existing.created_at = mono
+            # Re-index in case the delivery entry was invalidated meanwhile
+            self._delivery_cache[delivery_id] = existing
+            return
+
+        entry = LocationCacheEntry({
             "delivery_id": delivery_id,
             "rider_id": rider_id,
             "latitude": latitude,
@@ -91,85 +142,76 @@ class LocationCache:
             "heading": heading,
             "battery_level": battery_level,
             "reoptimization_needed": reoptimization_needed,
-            "timestamp": datetime.utcnow().isoformat(),
-            "cached_at": time.time()
-        }
-
-        async with self._lock:
-            # Update delivery-specific cache
-            self._delivery_cache[delivery_id] = LocationCacheEntry(
-                entry_data, self._default_ttl
-            )
+            "cached_at": now
+        }, self._default_ttl, created_at=mono)
 
-            # Update fleet cache
-            self._fleet_cache[rider_id] = LocationCacheEntry(
-                entry_data, self._default_ttl
-            )
+        # One entry shared by the delivery and fleet indexes
+        self._delivery_cache[delivery_id] = entry
+        self._fleet_cache[rider_id] = entry
+        heapq.heappush(self._expiry_heap, (mono + self._default_ttl, next(self._expiry_seq), entry))
 
-            # Update rider → delivery index
-            self._rider_to_delivery[rider_id] = delivery_id
+        # Update rider → delivery index
+        self._rider_to_delivery[rider_id] = delivery_id
 
-    async def get_by_delivery(self, delivery_id: str) -> Optional[Dict[str, Any]]:
+    def get_by_delivery(self, delivery_id: str) -> Optional[Dict[str, Any]]:
         """
         Get cached location for a specific delivery.
-        O(1) lookup — no database hit.
+        O(1) lookup — no database hit. Returns the cached dict itself (no copy);
+        treat it as read-only and use location_payload() to expose it.
         """
-        async with self._lock:
-            entry = self._delivery_cache.get(delivery_id)
-            if entry and not entry.is_expired:
+        entry = self._delivery_cache.get(delivery_id)
+        if entry:
+            if not entry.expired_at(time.monotonic()):
                 self._hits += 1
-                return {**entry.data, "cache_age_seconds": entry.age_seconds}
-            elif entry and entry.is_expired:
-                # Cleanup stale entry
-                del self._delivery_cache[delivery_id]
-            
-            self._misses += 1
-            return None
+                return entry.data
+            # Cleanup stale entry
+            del self._delivery_cache[delivery_id]
+        
+        self._misses += 1
+        return None
 
-    async def get_by_rider(self, rider_id: str) -> Optional[Dict[str, Any]]:
+    def get_by_rider(self, rider_id: str) -> Optional[Dict[str, Any]]:
         """
         Get cached location for a specific rider (fleet monitor use case).
-        O(1) lookup.
+        O(1) lookup. Returns the cached dict itself, read-only.
+        """
+        entry = self._fleet_cache.get(rider_id)
+        if entry and not entry.expired_at(time.monotonic()):
+            self._hits += 1
+            return entry.data
+        
+        self._misses += 1
+        return None
+
+    def get_many_by_rider(self, rider_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get cached locations for many riders in one call (the MGET of this
+        cache). Riders without a fresh entry are omitted.
         """
-        async with self._lock:
+        now = time.monotonic()
+        result = {}
+        for rider_id in rider_ids:
             entry = self._fleet_cache.get(rider_id)
-            if entry and not entry.is_expired:
+            if entry and not entry.expired_at(now):
                 self._hits += 1
-                return {**entry.data, "cache_age_seconds": entry.age_seconds}
-            
-            self._misses += 1
-            return None
+                result[rider_id] = entry.data
+            else:
+                self._misses += 1
+        return result
 
-    async def get_all_fleet(self) -> Dict[str, Dict[str, Any]]:
+    def get_all_fleet(self) -> Dict[str, Dict[str, Any]]:
         """
         Get all active rider locations (for dispatcher fleet view).
-        Returns only non-expired entries.
+        Returns only non-expired entries, as the cached dicts themselves (read-only);
+        age is derivable from each entry's cached_at.
         """
-        async with self._lock:
-            result = {}
-            expired_keys = []
-            
-            for rider_id, entry in self._fleet_cache.items():
-                if not entry.is_expired:
-                    result[rider_id] = {**entry.data, "cache_age_seconds": entry.age_seconds}
-                else:
-                    expired_keys.append(rider_id)
-            
-            # Cleanup expired entries
-            for key in expired_keys:
-                del self._fleet_cache[key]
-                if key in self._rider_to_delivery:
-                    delivery_id = self._rider_to_delivery.pop(key)
-                    self._delivery_cache.pop(delivery_id, None)
-            
-            return result
-
-    async def invalidate(self, delivery_id: str) -> None:
+        self._expire_due(time.monotonic())
+        return {rider_id: entry.data for rider_id, entry in self._fleet_cache.items()}
+
+    def invalidate(self, delivery_id: str) -> None:
         """Remove a delivery from cache (e.g., delivery completed)."""
-        async with self._lock:
-            if delivery_id in self._delivery_cache:
-                del self._delivery_cache[delivery_id]
-                logger.debug(f"Cache invalidated for delivery {delivery_id}")
+        if self._delivery_cache.pop(delivery_id, None) is not None:
+            logger.debug(f"Cache invalidated for delivery {delivery_id}")
 
     def get_stats(self) -> Dict[str, Any]:
         """Cache statistics for monitoring."""
@@ -184,23 +226,41 @@ class LocationCache:
             "total_requests": total
         }
 
-    async def cleanup_expired(self) -> int:
+    def _expire_due(self, now: float) -> int:
+        """
+        Pop heap items that are due and drop their entries from both indexes.
+        Cost is proportional to the due items, not the fleet size.
+        Returns the number of index slots removed.
+        """
+        heap = self._expiry_heap
+        removed = 0
+        while heap and heap[0][0] < now:
+            _, seq, entry = heapq.heappop(heap)
+            expires_at = entry.created_at + entry.ttl
+            if expires_at >= now:
+                # Refreshed in place since it was scheduled
+                heapq.heappush(heap, (expires_at, seq, entry))
+                continue
+
+            # Only unlink index slots that still point at this entry
+            rider_id = entry.data["rider_id"]
+            delivery_id = entry.data["delivery_id"]
+            if self._fleet_cache.get(rider_id) is entry:
+                del self._fleet_cache[rider_id]
+                if self._rider_to_delivery.get(rider_id) == delivery_id:
+                    del self._rider_to_delivery[rider_id]
+                removed += 1
+            if self._delivery_cache.get(delivery_id) is entry:
+                del self._delivery_cache[delivery_id]
+                removed += 1
+        return removed
+
+    def cleanup_expired(self) -> int:
         """Cleanup all expired entries. Call this periodically."""
-        async with self._lock:
-            before = len(self._delivery_cache) + len(self._fleet_cache)
-            
-            self._delivery_cache = {
-                k: v for k, v in self._delivery_cache.items() if not v.is_expired
-            }
-            self._fleet_cache = {
-                k: v for k, v in self._fleet_cache.items() if not v.is_expired
-            }
-            
-            after = len(self._delivery_cache) + len(self._fleet_cache)
-            cleaned = before - after
-            if cleaned > 0:
-                logger.debug(f"Cache cleanup: removed {cleaned} expired entries")
-            return cleaned
+        cleaned = self._expire_due(time.monotonic())
+        if cleaned > 0:
+            logger.debug(f"Cache cleanup: removed {cleaned} expired entries")
+        return cleaned
 
 
 # Singleton instance — shared across all requests (like a Redis connection pool)
@@ -6,8 +6,11 @@ import googlemaps
 import polyline
 import httpx
 import asyncio
-import concurrent.futures
-from typing import List, Dict, Optional, Tuple
+import math
+import time
+import weakref
+import numpy as np
+from typing import Any, List, Dict, Optional, Tuple
 from datetime import datetime
 from loguru import logger
 from config.config import settings
@@ -17,6 +20,115 @@ from api.schemas.delivery import Coordinate
 from api.services.graphhopper import GraphHopperService
 from api.services.osrm_service import OSRMService
 from api.services.positionstack import PositionStackService
+from api.utils.polyline_decoder import decode_polyline_array
+
+# Provider directions cache; keys round coordinates to ~1m
+DIRECTIONS_CACHE_TTL = 300  # 5 minutes
+DIRECTIONS_CACHE_MAX_ENTRIES = 10_000
+DIRECTIONS_KEY_PRECISION = 5
+
+# Provider circuit breaker: skip a provider for a cooldown after consecutive failures
+PROVIDER_FAILURE_THRESHOLD = 3
+PROVIDER_COOLDOWN_SECONDS = 60.0
+
+
+def _lat_lng_from_seq(point) -> Tuple[float, float]:
+    if len(point) >= 2:
+        return (float(point[0]), float(point[1]))
+    return (0.0, 0.0)
+
+
+def _lat_lng_from_dict(point) -> Tuple[float, float]:
+    if 'lat' in point:
+        return (float(point['lat']), float(point['lng']))
+    if 'latitude' in point:
+        return (float(point['latitude']), float(point['longitude']))
+    return (0.0, 0.0)
+
+
+def _lat_lng_generic(point) -> Tuple[float, float]:
+    """Full format check, for types outside the lookup table (subclasses, other models)."""
+    if hasattr(point, 'latitude'):
+        return (point.latitude, point.longitude)
+    if isinstance(point, (list, tuple)):
+        return _lat_lng_from_seq(point)
+    if isinstance(point, dict):
+        return _lat_lng_from_dict(point)
+    return (0.0, 0.0)
+
+
+# Exact-type dispatch for the point formats callers actually pass
+_LAT_LNG_EXTRACTORS = {
+    Coordinate: lambda point: (point.latitude, point.longitude),
+    tuple: _lat_lng_from_seq,
+    list: _lat_lng_from_seq,
+    dict: _lat_lng_from_dict,
+}
+
+
+class _CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and skips the provider for
+    `cooldown` seconds. Once the cooldown ends, calls are allowed again; the
+    failure count is only reset by a success, so the next failure reopens it
+    straight away.
+    """
+    __slots__ = ("threshold", "cooldown", "failures", "open_until")
+
+    def __init__(self, threshold: int = PROVIDER_FAILURE_THRESHOLD, cooldown: float = PROVIDER_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+
+    def allow(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True when this opens the breaker."""
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.open_until = time.monotonic() + self.cooldown
+            return True
+        return False
+
+
+class HaversineAnchor:
+    """
+    Haversine distances (meters) from one fixed point, with its radians and
+    cosine computed once for many-to-one queries.
+    """
+    __slots__ = ("phi", "lam", "cos_phi")
+
+    def __init__(self, lat: float, lng: float):
+        self.phi = math.radians(lat)
+        self.lam = math.radians(lng)
+        self.cos_phi = math.cos(self.phi)
+
+    def distance_to(self, lat: float, lng: float) -> float:
+        phi2 = math.radians(lat)
+        a = math.sin((phi2 - self.phi) / 2) ** 2 + self.cos_phi * math.cos(phi2) * math.sin((math.radians(lng) - self.lam) / 2) ** 2
+        return 6371000 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    def _terms(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Haversine term a (0..1) to each target; distance is monotonic in it."""
+        phi2 = np.radians(lats)
+        return np.sin((phi2 - self.phi) * 0.5) ** 2 + self.cos_phi * np.cos(phi2) * np.sin((np.radians(lngs) - self.lam) * 0.5) ** 2
+
+    def distances_to(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Vectorized distance_to over arrays of degrees."""
+        a = self._terms(lats, lngs)
+        return 6371000 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    def within(self, lats: np.ndarray, lngs: np.ndarray, radius_meters: float) -> np.ndarray:
+        """
+        Mask of targets within radius_meters. Compares the haversine term against
+        the radius mapped into the same space, skipping sqrt/atan2 per target.
+        """
+        return self._terms(lats, lngs) <= math.sin(min(radius_meters / 6371000, math.pi) / 2) ** 2
 
 class MapsService:
     """Unified maps service with intelligent fallbacks."""
@@ -24,8 +136,6 @@ class MapsService:
     def __init__(self):
         # Initialize Google Maps
         self.gmaps_key = settings.GOOGLE_MAPS_API_KEY
-        self.gmaps_working = True
-        self.gmaps_failures = 0
         if self.gmaps_key and not self.gmaps_key.startswith('YOUR_'):
             try:
                 self.gmaps = googlemaps.Client(key=self.gmaps_key)
@@ -33,10 +143,8 @@ class MapsService:
             except Exception as e:
                 logger.error(f"Failed to initialize Google Maps: {e}")
                 self.gmaps = None
-                self.gmaps_working = False
         else:
             self.gmaps = None
-            self.gmaps_working = False
             logger.warning("Google Maps API key missing or invalid")
 
         # Initialize PositionStack (High Accuracy Geocoding)
@@ -65,6 +173,19 @@ class MapsService:
             logger.error(f"Failed to initialize OSRM: {e}")
             self.osrm = None
 
+        # Per-provider circuit breakers, so an outage costs a few timeouts
+        # instead of one per request
+        self._breakers = {
+            "google": _CircuitBreaker(),
+            "graphhopper": _CircuitBreaker(),
+            "osrm": _CircuitBreaker(),
+        }
+
+        # Cached provider routes and per-key fill locks (so concurrent identical
+        # requests wait for one provider call instead of all missing at once)
+        self._directions_cache: Dict[Tuple, Tuple[float, List[Dict]]] = {}
+        self._directions_locks: "weakref.WeakValueDictionary[Tuple, asyncio.Lock]" = weakref.WeakValueDictionary()
+
     def geocode(self, query: str) -> Optional[Coordinate]:
         """
         Geocode an address string to coordinates.
@@ -166,23 +287,11 @@ class MapsService:
 
     def _get_lat_lng(self, point: any) -> Tuple[float, float]:
         """Convert various point formats to (lat, lng) tuple."""
-        if hasattr(point, 'latitude'):
-            return (point.latitude, point.longitude)
-        if isinstance(point, (list, tuple)) and len(point) >= 2:
-            return (float(point[0]), float(point[1]))
-        if isinstance(point, dict):
-            if 'lat' in point:
-                return (float(point['lat']), float(point['lng']))
-            if 'latitude' in point:
-                return (float(point['latitude']), float(point['longitude']))
-        return (0.0, 0.0)
-
-    def decode_polyline(self, points: str) -> List[Tuple[float, float]]:
-        """Decode a polyline string into coordinates."""
-        try:
-            return polyline.decode(points)
-        except Exception:
-            return []
+        return _LAT_LNG_EXTRACTORS.get(type(point), _lat_lng_generic)(point)
+
+    def decode_polyline(self, points: str) -> List[List[float]]:
+        """Decode a polyline string into [lat, lng] pairs (malformed input raises)."""
+        return decode_polyline_array(points).tolist() if isinstance(points, str) and points else []
 
     async def get_all_directions(self, origin: any, destination: any, **kwargs) -> List[Dict]:
         """Get all route variations (for RouteOptimizer compatibility)"""
@@ -199,114 +308,168 @@ class MapsService:
         """
         Get driving directions with multiple alternatives and traffic data.
         Falls back through providers: Google -> GraphHopper -> OSRM -> Mock.
+        Provider results are cached for DIRECTIONS_CACHE_TTL seconds.
         """
         orig = self._get_lat_lng(origin)
         dest = self._get_lat_lng(destination)
         waypoint_list = None
         if waypoints:
             waypoint_list = [self._get_lat_lng(wp) for wp in waypoints]
+        gh_kwargs = {k: v for k, v in kwargs.items() if k in ('vehicle', 'locale')}
+
+        key = self._directions_cache_key(orig, dest, waypoint_list, alternatives, gh_kwargs)
+        cached = self._get_cached_directions(key)
+        if cached is not None:
+            return cached
+
+        lock = self._directions_locks.get(key)
+        if lock is None:
+            lock = self._directions_locks[key] = asyncio.Lock()
+        async with lock:
+            # Another request may have filled the entry while we waited
+            cached = self._get_cached_directions(key)
+            if cached is not None:
+                return cached
+
+            routes = await self._fetch_directions(orig, dest, waypoint_list, alternatives, gh_kwargs)
+            # Mock routes stand in for an outage; don't pin them in the cache
+            if routes and routes[0].get('provider') != 'mock':
+                self._store_directions(key, routes)
+            return routes
+
+    @staticmethod
+    def _directions_cache_key(orig, dest, waypoint_list, alternatives: bool, gh_kwargs: Dict[str, Any]) -> Tuple:
+        """Cache key for a directions request, rounded to ~1m."""
+        def r(p):
+            return (round(p[0], DIRECTIONS_KEY_PRECISION), round(p[1], DIRECTIONS_KEY_PRECISION))
+        return (
+            r(orig), r(dest),
+            tuple(r(wp) for wp in waypoint_list) if waypoint_list else (),
+            alternatives,
+            tuple(sorted(gh_kwargs.items()))
+        )
+
+    def _get_cached_directions(self, key: Tuple) -> Optional[List[Dict]]:
+        """Return fresh cached routes (a new list, so callers can append to it)."""
+        entry = self._directions_cache.pop(key, None)
+        if entry and time.monotonic() - entry[0] < DIRECTIONS_CACHE_TTL:
+            # Re-insert so eviction drops the least recently used entry
+            self._directions_cache[key] = entry
+            logger.debug(f"Directions cache hit for {key[0]} -> {key[1]}")
+            return list(entry[1])
+        return None
+
+    def _store_directions(self, key: Tuple, routes: List[Dict]):
+        """Cache provider routes, evicting the least recently used entry when full."""
+        self._directions_cache.pop(key, None)
+        if len(self._directions_cache) >= DIRECTIONS_CACHE_MAX_ENTRIES:
+            del self._directions_cache[next(iter(self._directions_cache))]
+        self._directions_cache[key] = (time.monotonic(), list(routes))
+
+    async def _fetch_directions(
+        self,
+        orig: Tuple[float, float],
+        dest: Tuple[float, float],
+        waypoint_list: Optional[List[Tuple[float, float]]],
+        alternatives: bool,
+        gh_kwargs: Dict[str, Any]
+    ) -> Optional[List[Dict]]:
+        """Query providers in priority order, ending with mock data."""
 
         # 1. Try Google Maps First (with circuit breaker)
-        if self.gmaps and self.gmaps_working:
+        if self.gmaps and self._breakers["google"].allow():
             try:
                 logger.info(f"Routing request: {orig} to {dest} via Google")
                 g_waypoints = [f"{wp[0]},{wp[1]}" for wp in waypoint_list] if waypoint_list else None
                 
-                # Google Maps client is sync, run in executor to avoid blocking
-                loop = asyncio.get_event_loop()
-                directions = await loop.run_in_executor(
-                    None,
-                    lambda: self.gmaps.directions(
-                        origin=orig,
-                        destination=dest,
-                        waypoints=g_waypoints,
-                        mode="driving",
-                        alternatives=alternatives,
-                        departure_time=datetime.now(),
-                        traffic_model="best_guess",
-                        optimize_waypoints=True if waypoints else False
-                    )
+                # Google Maps client is sync, run it in a worker thread to avoid blocking
+                directions = await asyncio.to_thread(
+                    self.gmaps.directions,
+                    origin=orig,
+                    destination=dest,
+                    waypoints=g_waypoints,
+                    mode="driving",
+                    alternatives=alternatives,
+                    departure_time=datetime.now(),
+                    traffic_model="best_guess",
+                    optimize_waypoints=True if waypoint_list else False
                 )
                 
+                self._breakers["google"].record_success()
                 if directions:
                     logger.info(f"Google Maps returned {len(directions)} route(s)")
-                    # Reset failure count on success
-                    self.gmaps_failures = 0
                     for route in directions:
                         route_coords = []
                         # HIGH-RES: Use polyline if possible
-                        if route.get('overview_polyline', {}).get('points'):
-                            try:
-                                decoded = self.decode_polyline(route['overview_polyline']['points'])
-                                route_coords = [{'lat': p[0], 'lng': p[1]} for p in decoded]
-                            except Exception: pass
+                        try:
+                            decoded = self.decode_polyline(route.get('overview_polyline', {}).get('points'))
+                            route_coords = [{'lat': lat, 'lng': lng} for lat, lng in decoded]
+                        except Exception as e:
+                            logger.debug(f"Google polyline decode failed: {e}")
                         
-                        # Fallback to steps
+                        # Fallback to step endpoints (only when the polyline is missing or bad)
                         if not route_coords:
-                            for leg in route.get('legs', []):
-                                for step in leg.get('steps', []):
-                                    start = step.get('start_location', {})
-                                    route_coords.append({'lat': start.get('lat'), 'lng': start.get('lng')})
-                                    end = step.get('end_location', {})
-                                    route_coords.append({'lat': end.get('lat'), 'lng': end.get('lng')})
+                            route_coords = [
+                                {'lat': loc['lat'], 'lng': loc['lng']}
+                                for leg in route.get('legs', ())
+                                for step in leg.get('steps', ())
+                                for loc in (step.get('start_location'), step.get('end_location'))
+                                if loc
+                            ]
                         
                         route['route_coordinates'] = route_coords
                         route['provider'] = 'google'
                     return directions
             except Exception as e:
-                self.gmaps_failures += 1
-                if self.gmaps_failures >= 3:
-                    self.gmaps_working = False
-                    logger.error(f"Google Maps API disabled after {self.gmaps_failures} failures. Error: {e}")
-                else:
-                    logger.warning(f"Google Maps API error: {e}. Failure count: {self.gmaps_failures}. Trying GraphHopper...")
+                self._provider_failed("google", f"Google Maps API error: {e}")
 
         # 2. Try GraphHopper
-        if self.graphhopper:
+        if self.graphhopper and self._breakers["graphhopper"].allow():
             try:
                 logger.info("Routing request: via GraphHopper")
-                gh_kwargs = {k: v for k, v in kwargs.items() if k in ('vehicle', 'locale')}
                 
-                if asyncio.iscoroutinefunction(self.graphhopper.get_directions):
-                    gh_route = await self.graphhopper.get_directions(orig, dest, waypoint_list, **gh_kwargs)
-                else:
-                    loop = asyncio.get_event_loop()
-                    gh_route = await loop.run_in_executor(
-                        None, 
-                        lambda: self.graphhopper.get_directions(orig, dest, waypoint_list, **gh_kwargs)
-                    )
+                # GraphHopper uses a pooled requests session (sync)
+                gh_route = await asyncio.to_thread(
+                    self.graphhopper.get_directions, orig, dest, waypoint_list, **gh_kwargs
+                )
                     
                 if gh_route:
+                    self._breakers["graphhopper"].record_success()
                     gh_route['provider'] = 'graphhopper'
                     return [gh_route]
+                # GraphHopperService logs and swallows its errors, returning None
+                self._provider_failed("graphhopper", "GraphHopper returned no route")
             except Exception as e:
-                logger.warning(f"GraphHopper API error: {e}. Trying OSRM...")
+                self._provider_failed("graphhopper", f"GraphHopper API error: {e}")
 
         # 3. Try OSRM (Free Fallback)
-        if self.osrm:
+        if self.osrm and self._breakers["osrm"].allow():
             try:
                 logger.info("Routing request: via OSRM (FREE)")
+                osrm_routes = await self.osrm.get_directions(orig, dest, waypoint_list, alternatives=alternatives)
                 
-                osrm_routes = None
-                if asyncio.iscoroutinefunction(self.osrm.get_directions):
-                    osrm_routes = await self.osrm.get_directions(orig, dest, waypoint_list, alternatives=alternatives)
-                else:
-                    loop = asyncio.get_event_loop()
-                    osrm_routes = await loop.run_in_executor(
-                        None,
-                        lambda: self.osrm.get_directions(orig, dest, waypoint_list, alternatives=alternatives)
-                    )
-                
-                if osrm_routes:
+                # OSRMService answers outages with its own straight-line mock
+                # instead of raising; count that as a failure and fall through
+                if osrm_routes and osrm_routes[0].get('provider') != 'mock':
+                    self._breakers["osrm"].record_success()
                     for r in osrm_routes:
                         r['provider'] = 'osrm'
                     return osrm_routes
+                self._provider_failed("osrm", "OSRM unavailable")
             except Exception as e:
-                logger.warning(f"OSRM API error: {e}. Final fallback to Mock.")
+                self._provider_failed("osrm", f"OSRM API error: {e}")
 
         # 4. Final Fallback: Mock Data (Enriched with jitter to avoid straight lines)
         logger.info("Routing request: FALLBACK TO MOCK DATA")
-        return self._get_mock_directions(origin, destination, waypoints)
+        return self._get_mock_directions(orig, dest, waypoint_list)
+
+    def _provider_failed(self, provider: str, message: str):
+        """Log a provider failure and count it against its circuit breaker."""
+        breaker = self._breakers[provider]
+        if breaker.record_failure():
+            logger.error(f"{message}. Skipping {provider} for {breaker.cooldown:.0f}s after {breaker.failures} consecutive failures")
+        else:
+            logger.warning(f"{message}. Failure count: {breaker.failures}. Trying next provider...")
 
     def _get_mock_directions(self, origin, destination, waypoints=None) -> List[Dict]:
         """Generate mock directions with non-straight paths."""
@@ -348,7 +511,6 @@ class MapsService:
 
     def calculate_straight_distance(self, p1: any, p2: any) -> float:
         """Calculate Haversine distance in meters."""
-        import math
         lat1, lon1 = self._get_lat_lng(p1)
         lat2, lon2 = self._get_lat_lng(p2)
         
@@ -361,6 +523,21 @@ class MapsService:
         c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
         return R * c
 
+    @staticmethod
+    def calculate_straight_distance_batch(origins: any, destinations: any) -> np.ndarray:
+        """
+        Vectorized Haversine distances in meters.
+        Takes (..., 2) arrays of (lat, lng) degrees; the leading dimensions
+        broadcast, so (N, 1, 2) against (1, M, 2) yields an N x M matrix.
+        """
+        origins = np.radians(np.asarray(origins, dtype=np.float64))
+        destinations = np.radians(np.asarray(destinations, dtype=np.float64))
+        phi1, lam1 = origins[..., 0], origins[..., 1]
+        phi2, lam2 = destinations[..., 0], destinations[..., 1]
+
+        a = np.sin((phi2 - phi1) * 0.5) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin((lam2 - lam1) * 0.5) ** 2
+        return 2 * 6371000 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
     def find_nearby_places(
         self,
         location: Coordinate,
@@ -372,9 +549,10 @@ class MapsService:
         Uses Google Places API if available.
         """
         lat, lng = self._get_lat_lng(location)
+        anchor = HaversineAnchor(lat, lng)
         
         # 1. Try Google Maps Places API
-        if self.gmaps and self.gmaps_working:
+        if self.gmaps and self._breakers["google"].allow():
             try:
                 logger.info(f"Searching for {place_type} near {lat}, {lng} via Google")
                 res = self.gmaps.places_nearby(
@@ -382,6 +560,7 @@ class MapsService:
                     radius=radius_meters,
                     type=place_type
                 )
+                self._breakers["google"].record_success()
                 
                 places = []
                 if res.get('results'):
@@ -395,20 +574,28 @@ class MapsService:
                             },
                             "address": r.get('vicinity'),
                             "rating": r.get('rating', 0),
-                            "distance_meters": self.calculate_straight_distance(
-                                location, 
-                                Coordinate(latitude=r['geometry']['location']['lat'], longitude=r['geometry']['location']['lng'])
+                            "distance_meters": anchor.distance_to(
+                                r['geometry']['location']['lat'], r['geometry']['location']['lng']
                             ),
                             "is_open": r.get('opening_hours', {}).get('open_now', True)
                         })
                     return places
             except Exception as e:
-                logger.warning(f"Google Places search failed: {e}")
+                self._provider_failed("google", f"Google Places search failed: {e}")
 
         # 2. Fallback: Mock data if Google fails or is missing
         logger.info(f"Using mock places for {place_type} search")
         return self._get_mock_places(location, radius_meters, place_type)
 
+    async def find_nearby_places_async(
+        self,
+        location: Coordinate,
+        radius_meters: int = 2000,
+        place_type: str = "police"
+    ) -> List[Dict]:
+        """find_nearby_places off the event loop (the Google client is sync), so several searches can be gathered."""
+        return await asyncio.to_thread(self.find_nearby_places, location, radius_meters, place_type)
+
     def _get_mock_places(self, location: Coordinate, radius: int, place_type: str) -> List[Dict]:
         """Generate mock places for demo purposes."""
         import random
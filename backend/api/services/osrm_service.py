@@ -13,6 +13,7 @@ import asyncio
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from api.schemas.delivery import Coordinate
+from api.utils.polyline_decoder import decode_polyline_array
 from loguru import logger
 
 
@@ -102,7 +103,7 @@ class OSRMService:
         for idx, route in enumerate(data.get('routes', [])):
             # Extract route geometry
             geometry = route.get('geometry', '')
-            route_coords = polyline.decode(geometry)
+            route_coords = decode_polyline_array(geometry).tolist()
             
             # Get legs
             legs_data = route.get('legs', [])
@@ -114,7 +115,7 @@ class OSRMService:
                 for step in leg.get('steps', []):
                     # Decode step geometry
                     step_geom = step.get('geometry', '')
-                    step_coords = polyline.decode(step_geom) if step_geom else []
+                    step_coords = decode_polyline_array(step_geom).tolist() if step_geom else []
                     
                     start_loc = step_coords[0] if step_coords else orig
                     end_loc = step_coords[-1] if step_coords else dest
@@ -213,7 +214,8 @@ class OSRMService:
             'route_coordinates': [
                 {'lat': coord[0], 'lng': coord[1]} for coord in route_coords
             ],
-            'warnings': ['Using mock data - OSRM unavailable']
+            'warnings': ['Using mock data - OSRM unavailable'],
+            'provider': 'mock'
         }
         
         return [route]
@@ -240,7 +240,7 @@ class RouteMonitor:
                 return None
             
             # Convert stops to DeliveryStop format
-            from api.schemas.delivery import DeliveryStop, DeliveryPriority
+            from api.schemas.delivery import DeliveryStop
             delivery_stops = []
             for stop in remaining_stops:
                 coords = stop.get("coordinates", {})
@@ -251,7 +251,7 @@ class RouteMonitor:
                         latitude=coords.get("latitude", 0),
                         longitude=coords.get("longitude", 0)
                     ),
-                    priority=DeliveryPriority(stop.get("priority", "medium")),
+                    priority=stop.get("priority", "medium"),
                     package_weight=stop.get("package_weight", 1.0)
                 ))
             
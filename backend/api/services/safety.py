@@ -1,5 +1,5 @@
 """Safety features service for women riders."""
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from loguru import logger
@@ -10,7 +10,7 @@ import uuid
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from api.schemas.delivery import Coordinate
-from api.services.maps import MapsService
+from api.services.maps import MapsService, HaversineAnchor
 from api.services.email import EmailService
 from api.services.sms import SMSService
 from database.models import (
@@ -20,6 +20,20 @@ from database.models import (
 
 from api.services.database import DatabaseService
 
+import asyncio
+import math
+import threading
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def _unit_xyz(lat: float, lng: float) -> np.ndarray:
+    """Project latitude/longitude (degrees) onto the unit sphere."""
+    phi, lam = np.radians(lat), np.radians(lng)
+    return np.stack([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)], axis=-1)
+
 
 class SafetyService:
     """Safety features for women riders."""
@@ -30,7 +44,54 @@ class SafetyService:
         self.maps_service = MapsService()
         self.email_service = EmailService()
         self.sms_service = SMSService()
-        self.hospitals = self._load_hospitals()
+        # Hospital data is loaded on first use, not when the module is imported
+        self._hospitals: Optional[List[Dict]] = None
+        self._hospital_tree: Optional[cKDTree] = None
+        self._hospitals_lock = threading.Lock()
+    
+    @property
+    def hospitals(self) -> List[Dict]:
+        self._ensure_hospitals()
+        return self._hospitals
+    
+    def _ensure_hospitals(self):
+        """Load hospitals and build their KD-tree exactly once, thread-safely."""
+        if self._hospitals is not None:
+            return
+        with self._hospitals_lock:
+            if self._hospitals is None:
+                hospitals = self._load_hospitals()
+                self._hospital_tree = self._build_hospital_tree(hospitals)
+                self._hospitals = hospitals
+    
+    @staticmethod
+    def _build_hospital_tree(hospitals: List[Dict]) -> Optional[cKDTree]:
+        """KD-tree over hospital positions on the unit sphere (chord distances)."""
+        if not hospitals:
+            return None
+        lats = np.array([h['latitude'] for h in hospitals], dtype=float)
+        lngs = np.array([h['longitude'] for h in hospitals], dtype=float)
+        return cKDTree(_unit_xyz(lats, lngs))
+
+    def _hospitals_within(self, location: Coordinate, radius_meters: float) -> List[Tuple[Dict, float]]:
+        """Hospitals within radius_meters of location, each paired with its distance."""
+        self._ensure_hospitals()
+        if self._hospital_tree is None:
+            return []
+        # Great-circle radius -> chord length on the unit sphere
+        # (padded slightly; the exact haversine check below decides the edge)
+        chord = 2 * math.sin(min(radius_meters / EARTH_RADIUS_M, math.pi) / 2) * (1 + 1e-9)
+        indices = self._hospital_tree.query_ball_point(
+            _unit_xyz(location.latitude, location.longitude), chord
+        )
+        anchor = HaversineAnchor(location.latitude, location.longitude)
+        hits = []
+        for idx in indices:
+            hospital = self._hospitals[idx]
+            dist = anchor.distance_to(hospital['latitude'], hospital['longitude'])
+            if dist <= radius_meters:
+                hits.append((hospital, dist))
+        return hits
     
     def _load_hospitals(self) -> List[Dict]:
         """Load hospitals from JSON file."""
@@ -114,9 +175,9 @@ class SafetyService:
                 except Exception as contact_err:
                     logger.error(f"Error notifying contact {contact}: {contact_err}")
             
-            # Critical Backup Email (Run in thread to avoid blocking loop)
+            # Critical Backup Email (queued; sent by the background email worker)
             default_email = emergency_email or "dharunika0708@gmail.com"
-            system_email_task = asyncio.to_thread(self._send_sos_email, rider, alert, default_email)
+            system_email_queued = self._send_sos_email(rider, alert, default_email)
             
             # System SMS (Already async)
             loc_str = f"{location.latitude}, {location.longitude}"
@@ -127,15 +188,10 @@ class SafetyService:
             
             # We don't necessarily need to wait for all of these before returning success to the rider app
             # but for consistency we await them here or wrap in a background task
-            system_email_sent, system_sms_sent = await asyncio.gather(
-                system_email_task, 
-                system_sms_task,
-                return_exceptions=True
-            )
-            
-            # Convert exceptions to False
-            if isinstance(system_email_sent, Exception): system_email_sent = False
-            if isinstance(system_sms_sent, Exception): system_sms_sent = False
+            try:
+                system_sms_sent = await system_sms_task
+            except Exception:
+                system_sms_sent = False
 
             company_notified = False
             if company_notified_task:
@@ -149,7 +205,7 @@ class SafetyService:
             return {
                 "alert_id": alert.id,
                 "status": "active",
-                "email_sent": system_email_sent,
+                "email_queued": system_email_queued,
                 "sms_sent": system_sms_sent,
                 "company_notified": company_notified,
                 "emergency_contacts_notified": len(alerted_contacts),
@@ -214,7 +270,7 @@ class SafetyService:
             raise
     
     def _send_sos_email(self, rider: Optional[User] = None, alert: Optional[PanicAlert] = None, to_email: Optional[str] = None) -> bool:
-        """Send SOS alert email to emergency contact."""
+        """Queue SOS alert email to emergency contact."""
         try:
             # Get location from alert
             location = alert.location if alert else {}
@@ -227,23 +283,21 @@ class SafetyService:
                 rider_name = getattr(rider, 'full_name', getattr(rider, 'name', rider.username if hasattr(rider, 'username') else "Unknown Rider"))
                 rider_id = getattr(rider, 'id', "Unknown")
 
-            # Send email using email service
-            email_sent = self.email_service.send_sos_alert(
+            # Hand off to the email service's background sender
+            email_queued = self.email_service.queue_sos_alert(
                 rider_name=rider_name,
                 rider_id=rider_id,
                 location=location,
                 to_email=to_email
             )
             
-            if email_sent:
-                logger.info(f"SOS email sent successfully for rider {rider_id}")
-            else:
-                logger.warning(f"Failed to send SOS email for rider {rider_id}")
+            if email_queued:
+                logger.info(f"SOS email queued for rider {rider_id}")
             
-            return email_sent
+            return email_queued
             
         except Exception as e:
-            logger.error(f"Error sending SOS email: {e}")
+            logger.error(f"Error queuing SOS email: {e}")
             return False
     
     async def _notify_company(self, db: Session, rider: Rider, alert: PanicAlert) -> bool:
@@ -414,7 +468,7 @@ class SafetyService:
         except Exception as e:
             logger.error(f"Error handling missed check-in: {e}")
     
-    def get_safe_zones(
+    async def get_safe_zones(
         self,
         location: Coordinate,
         radius_meters: int = 2000,
@@ -452,33 +506,30 @@ class SafetyService:
 
             # Add local hospitals as safe zones if "hospital" is requested or by default
             if not zone_types or "hospital" in zone_types:
-                for hospital in self.hospitals:
-                    dist = self.maps_service.calculate_straight_distance(
-                        location, 
-                        Coordinate(latitude=hospital['latitude'], longitude=hospital['longitude'])
-                    )
-                    if dist <= radius_meters:
-                        safe_zones.append({
-                            "id": f"hosp_{hospital['name'].lower().replace(' ', '_')}",
-                            "name": hospital['name'],
-                            "zone_type": "hospital",
-                            "location": {"lat": hospital['latitude'], "lng": hospital['longitude']},
-                            "address": hospital.get('address', ''),
-                            "rating": 5.0,
-                            "distance_meters": dist,
-                            "is_open": True,
-                            "phone": hospital.get('phone', ''),
-                            "services": hospital.get('services', '')
-                        })
+                for hospital, dist in self._hospitals_within(location, radius_meters):
+                    safe_zones.append({
+                        "id": f"hosp_{hospital['name'].lower().replace(' ', '_')}",
+                        "name": hospital['name'],
+                        "zone_type": "hospital",
+                        "location": {"lat": hospital['latitude'], "lng": hospital['longitude']},
+                        "address": hospital.get('address', ''),
+                        "rating": 5.0,
+                        "distance_meters": dist,
+                        "is_open": True,
+                        "phone": hospital.get('phone', ''),
+                        "services": hospital.get('services', '')
+                    })
             
-            # Search for each type
-            for place_type in types_to_search:
-                places = self.maps_service.find_nearby_places(
+            # Search all types concurrently: one Places round trip instead of one per type
+            results = await asyncio.gather(*[
+                self.maps_service.find_nearby_places_async(
                     location=location,
                     radius_meters=radius_meters,
                     place_type=place_type
                 )
-                
+                for place_type in types_to_search
+            ])
+            for place_type, places in zip(types_to_search, results):
                 # Transform to SafeZone format
                 for place in places:
                     zone_type = "safe_zone"
@@ -1,10 +1,5 @@
 """Traffic service for fetching and processing traffic data."""
 from typing import List, Dict, Optional, Tuple, Any
-try:
-    from geopy.distance import distance as geopy_distance
-except ImportError:
-    geopy_distance = None
-
 import random
 import sys
 import math
@@ -222,10 +217,7 @@ class TrafficService:
         logger.info("TrafficService initialized with real-time providers")
 
     def _calculate_distance(self, start: Coordinate, end: Coordinate) -> float:
-        """Calculate distance in meters (using geopy or fallback)."""
-        if geopy_distance:
-            return geopy_distance((start.latitude, start.longitude), (end.latitude, end.longitude)).meters
-        # Haversine fallback
+        """Calculate Haversine distance in meters."""
         R = 6371000
         p1 = start.latitude * math.pi / 180
         p2 = end.latitude * math.pi / 180
@@ -2,8 +2,8 @@
 import httpx
 import os
 import asyncio
-from typing import Dict, Optional, List
-from datetime import datetime
+import time
+from typing import Dict, Optional, List, Tuple
 import sys
 from pathlib import Path
 
@@ -13,6 +13,9 @@ from config.config import settings
 from api.schemas.delivery import Coordinate
 from loguru import logger
 
+WEATHER_CACHE_TTL = 600  # 10 minutes
+WEATHER_CACHE_MAX_ENTRIES = 2048
+
 
 class WeatherService:
     """Service for fetching weather data."""
@@ -22,21 +25,24 @@ class WeatherService:
         # Use OpenWeatherMap as primary, fallback to WorldWeatherOnline
         self.base_url = "https://api.openweathermap.org/data/2.5"
         self.worldweather_url = "https://api.worldweatheronline.com/premium/v1"
-        self.cache: Dict[str, Dict] = {}
-        self.cache_ttl = 1800  # 30 minutes
+        # Keyed by coordinates scaled to integer hundredths (~1.1 km cells)
+        # Insertion order doubles as LRU order: hits are moved to the end
+        self.cache: Dict[Tuple[int, int], Dict] = {}
+        self.cache_ttl = WEATHER_CACHE_TTL
     
     async def get_weather(self, coord: Coordinate) -> Dict:
         """
         Get current weather conditions for a location.
         Returns weather data with hazard factors.
         """
-        cache_key = f"{coord.latitude:.2f},{coord.longitude:.2f}"
+        cache_key = (round(coord.latitude * 100), round(coord.longitude * 100))
         
         # Check cache
-        if cache_key in self.cache:
-            cached_data = self.cache[cache_key]
-            if (datetime.now().timestamp() - cached_data.get("timestamp", 0)) < self.cache_ttl:
-                return cached_data.get("data", {})
+        cached_data = self.cache.pop(cache_key, None)
+        if cached_data and time.monotonic() - cached_data["timestamp"] < self.cache_ttl:
+            self.cache[cache_key] = cached_data
+            logger.debug(f"Weather cache hit for {cache_key}")
+            return cached_data["data"]
         
         try:
             # Try OpenWeatherMap first
@@ -53,9 +59,11 @@ class WeatherService:
                     if response.status_code == 200:
                         data = response.json()
                         weather_data = self._parse_openweather(data)
+                        if len(self.cache) >= WEATHER_CACHE_MAX_ENTRIES:
+                            del self.cache[next(iter(self.cache))]
                         self.cache[cache_key] = {
                             "data": weather_data,
-                            "timestamp": datetime.now().timestamp()
+                            "timestamp": time.monotonic()
                         }
                         return weather_data
         except Exception as e:
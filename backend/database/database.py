@@ -15,9 +15,12 @@ from loguru import logger
 # Database URL
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-# Handle Render's 'postgres://' format which SQLAlchemy needs as 'postgresql://'
-if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
-    SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+# Run PostgreSQL on the psycopg 3 driver, including Render's 'postgres://' format
+# and URLs that still name psycopg2
+for _prefix in ("postgres://", "postgresql://", "postgresql+psycopg2://"):
+    if SQLALCHEMY_DATABASE_URL.startswith(_prefix):
+        SQLALCHEMY_DATABASE_URL = "postgresql+psycopg://" + SQLALCHEMY_DATABASE_URL[len(_prefix):]
+        break
 
 # Create engine
 # Use static pool for SQLite, connection pooling for PostgreSQL
@@ -32,7 +35,9 @@ else:
         SQLALCHEMY_DATABASE_URL,
         pool_pre_ping=True,
         pool_size=10,
-        max_overflow=20
+        max_overflow=20,
+        # Server-side prepare statements after a few executions
+        connect_args={"prepare_threshold": 5}
     )
 
 # Session factory
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Integer, DateTime, Text, Boolean, JSON, ForeignKey
+from sqlalchemy import Column, String, Float, Integer, DateTime, Text, Boolean, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from geoalchemy2 import Geometry
@@ -36,7 +36,7 @@ class SafetyFeedback(Base):
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     route_id = Column(String, nullable=False, index=True)
     rider_id = Column(String, nullable=True)
-    feedback_type = Column(String, nullable=False)
+    feedback_type = Column(String, nullable=False, index=True)
     rating = Column(Integer, nullable=False)
     location = Column(JSON, nullable=True)
     comments = Column(Text, nullable=True)
@@ -106,6 +106,14 @@ class DeliveryStatus(Base):
     battery_level = Column(Integer, nullable=True)  # For mobile devices
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Newest-first tracking reads per delivery; covering on PostgreSQL
+    __table_args__ = (
+        Index(
+            "ix_delivery_status_did_ts", delivery_id, timestamp.desc(),
+            postgresql_include=["status", "current_location", "speed_kmh", "heading", "battery_level"]
+        ),
+    )
+
 
 class RouteMonitoring(Base):
     """Route monitoring for deviation detection."""
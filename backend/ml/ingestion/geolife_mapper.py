@@ -7,6 +7,7 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import math
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 def haversine(lat1, lon1, lat2, lon2):
@@ -92,10 +93,12 @@ def create_trip_summary(points, user_id):
         'success': 1
     }
 
-def map_geolife_data(raw_data_dir, output_path, max_users=10):
-    """Crawl GeoLife directory and process files."""
+def map_geolife_data(raw_data_dir, output_path, max_users=10, workers=None):
+    """Crawl GeoLife directory and process files across worker processes."""
     print(f"Starting GeoLife mapping from {raw_data_dir}...")
     all_trips = []
+    plt_files = []
+    plt_users = []
     
     data_dir = Path(raw_data_dir) / "Data"
     if not data_dir.exists():
@@ -115,11 +118,19 @@ def map_geolife_data(raw_data_dir, output_path, max_users=10):
             continue
             
         for plt_file in traj_dir.glob("*.plt"):
-            trips = process_plt_file(plt_file, user_id)
-            all_trips.extend(trips)
+            plt_files.append(plt_file)
+            plt_users.append(user_id)
             
         processed_users += 1
     
+    # Each .plt file is parsed independently, so fan them out per CPU
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(plt_files) // (workers * 4))
+    print(f"Parsing {len(plt_files)} trajectory files with {workers} workers...")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for trips in pool.map(process_plt_file, plt_files, plt_users, chunksize=chunksize):
+            all_trips.extend(trips)
+    
     if not all_trips:
         print("No trips found!")
         return
@@ -73,7 +73,9 @@ class EnhancedSafetyClassifier:
         # Temporal features
         if 'timestamp' in df.columns:
             df['hour'] = pd.to_datetime(df['timestamp']).dt.hour
-            df['time_of_day'] = df['hour'].apply(self._categorize_time)
+            # Classify each distinct hour once rather than once per row
+            periods = {hour: self._categorize_time(hour) for hour in df['hour'].unique()}
+            df['time_of_day'] = df['hour'].map(periods)
             df['day_of_week'] = pd.to_datetime(df['timestamp']).dt.dayofweek
             df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
         
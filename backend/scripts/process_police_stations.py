@@ -15,6 +15,11 @@ from database.database import SessionLocal
 from database.models import SafeZone
 from config.config import settings
 
+# We mainly care about Coimbatore district or the cities mentioned by user
+TARGET_CITIES_RE = re.compile(r'Coimbatore|Tiruppur|Pollachi|Udumalpet|Dharapuram')
+# Common station prefixes like "B1  ", "B2  " etc.
+STATION_PREFIX_RE = re.compile(r'^[A-Z][0-9]+\s+')
+
 def process_police_stations():
     csv_path = 'backend/data/police_stations_coimbatore.csv.csv'
     if not os.path.exists(csv_path):
@@ -42,9 +47,7 @@ def process_police_stations():
                 
                 id_val, details, district = row[0], row[1], row[2]
                 
-                # We mainly care about Coimbatore district or the cities mentioned by user
-                target_cities = ['Coimbatore', 'Tiruppur', 'Pollachi', 'Udumalpet', 'Dharapuram']
-                is_target = district.strip() == 'Coimbatore' or any(city in details for city in target_cities)
+                is_target = district.strip() == 'Coimbatore' or TARGET_CITIES_RE.search(details) is not None
                 
                 if not is_target:
                     continue
@@ -56,8 +59,7 @@ def process_police_stations():
                 
                 # Clean name for better geocoding (e.g., remove "B1" prefix or PS details)
                 clean_name = name_part.split(',')[0].strip()
-                # Remove common prefixes like "B1  ", "B2  " etc.
-                clean_name = re.sub(r'^[A-Z][0-9]+\s+', '', clean_name)
+                clean_name = STATION_PREFIX_RE.sub('', clean_name)
                 
                 query_address = f"{clean_name}, {district}, Tamil Nadu, India"
                 print(f"Geocoding: {query_address}...")
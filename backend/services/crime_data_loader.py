@@ -5,6 +5,13 @@ from pathlib import Path
 from sqlalchemy.orm import Session
 from geoalchemy2.elements import WKTElement
 
+# Optional: pyarrow parses CSVs into typed columns in C, multithreaded
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
 # Add project root to path
 sys.path.append(str(Path(__file__).parent.parent))
 
@@ -80,15 +87,18 @@ class CrimeDataLoader:
             file_path = os.path.join(self.crime_data_path, file)
             if os.path.exists(file_path):
                 try:
-                    df = pd.read_csv(file_path)
+                    df = pd.read_csv(file_path, usecols=['District', 'Count'], engine=CSV_ENGINE)
                     crime_type = file.split('_')[0]
                     
-                    for district in df['District'].unique():
-                        if district not in crime_data_dict:
-                            crime_data_dict[district] = {}
-                        
-                        crime_count = df[df['District'] == district]['Count'].sum()
-                        crime_data_dict[district][crime_type] = crime_count
+                    # Counts may be published as "1,234"; coerce the whole column at once
+                    df['Count'] = pd.to_numeric(
+                        df['Count'].astype(str).str.replace(',', '', regex=False), errors='coerce'
+                    ).fillna(0).astype('int64')
+                    
+                    # One grouped pass instead of re-filtering the frame per district
+                    totals = df.groupby('District', sort=False)['Count'].sum()
+                    for district, crime_count in totals.items():
+                        crime_data_dict.setdefault(district, {})[crime_type] = int(crime_count)
                 except Exception as e:
                     print(f"❌ Error reading {file}: {e}")
             else:
@@ -1,4 +1,5 @@
 import pytest
+from datetime import datetime
 from api.schemas.delivery import Coordinate
 
 def test_delivery_flow(client):
@@ -80,6 +81,79 @@ def test_user_profile(client):
     response = client.get("/api/v1/users/profile", cookies=login.cookies)
     assert response.status_code == 200
     assert response.json()["username"] == "profileuser"
+    assert "license_number" not in response.json()
+
+    response = client.put("/api/v1/users/profile", json={"full_name": "Renamed"}, cookies=login.cookies)
+    assert response.status_code == 200
+    assert response.json()["full_name"] == "Renamed"
+    assert response.json()["phone"] == "123"
+
+    # Empty patches are a no-op
+    response = client.put("/api/v1/users/profile", json={}, cookies=login.cookies)
+    assert response.status_code == 200
+    assert response.json()["full_name"] == "Renamed"
+
+    response = client.put("/api/v1/users/rider-profile", json={"vehicle_type": "bike"}, cookies=login.cookies)
+    assert response.status_code == 200
+    assert response.json()["vehicle_type"] == "bike"
+    response = client.put("/api/v1/users/rider-profile", json={"vehicle_type": "bike"}, cookies=login.cookies)
+    assert response.status_code == 200
+    assert response.json()["vehicle_type"] == "bike"
+
+def test_update_settings(client, db_session):
+    from database.models import User, RiderProfile
+    client.post("/api/v1/auth/register", json={
+        "username": "settingsuser", "password": "password", "role": "rider",
+        "full_name": "Settings User", "phone": "123", "email": "s@s.com"
+    })
+    login = client.post("/api/v1/auth/login", json={
+        "username": "settingsuser", "password": "password", "role": "rider"
+    })
+
+    response = client.post("/api/v1/users/settings", json={
+        "notifications": True,
+        "location_sharing": False,
+        "theme": "dark",
+        "emergency_contacts": [{"name": "Mum", "phone": "999"}],
+        "profile": {"full_name": "Renamed User", "vehicle_type": "scooter"}
+    }, cookies=login.cookies)
+    assert response.status_code == 200
+
+    user = db_session.query(User).filter(User.username == "settingsuser").first()
+    profile = db_session.query(RiderProfile).filter(RiderProfile.user_id == user.id).first()
+    assert user.full_name == "Renamed User"
+    assert user.phone == "123"
+    assert profile.vehicle_type == "scooter"
+    assert profile.preferences == {"notifications": True, "location_sharing": False, "theme": "dark"}
+
+    response = client.post("/api/v1/users/settings", json={"theme": 42}, cookies=login.cookies)
+    assert response.status_code == 422
+
+def test_list_all_users(client):
+    client.post("/api/v1/auth/register", json={
+        "username": "admintest", "password": "password", "role": "admin",
+        "full_name": "Admin Test", "phone": "123", "email": "a@a.com",
+        "admin_code": "SECRET_TEST"
+    })
+    login = client.post("/api/v1/auth/login", json={"username": "admintest", "password": "password", "role": "admin"})
+
+    response = client.get("/api/v1/users/all", cookies=login.cookies)
+    assert response.status_code == 200
+    admin = next(u for u in response.json() if u["username"] == "admintest")
+    assert datetime.fromisoformat(admin["created_at"])
+
+    rider = client.post("/api/v1/auth/register", json={
+        "username": "statusrider", "password": "password", "role": "rider"
+    }).json()
+    response = client.patch(f"/api/v1/users/{rider['id']}/status", json={"status": "suspended"}, cookies=login.cookies)
+    assert response.status_code == 200
+    assert response.json()["message"] == "User statusrider status set to suspended"
+    response = client.patch(f"/api/v1/users/{rider['id']}/status", json={"status": "banana"}, cookies=login.cookies)
+    assert response.status_code == 422
+    response = client.patch("/api/v1/users/missing/status", json={"status": "active"}, cookies=login.cookies)
+    assert response.status_code == 404
+    response = client.patch(f"/api/v1/users/{admin['id']}/status", json={"status": "inactive"}, cookies=login.cookies)
+    assert response.status_code == 400
 
 def test_feedback_submission(client):
     # Login
@@ -51,4 +51,18 @@ def test_safety_heatmap(client):
         }
     )
     assert response.status_code == 200
-    assert "points" in response.json()
+    data = response.json()
+    assert len(data["lats"]) == len(data["lngs"]) == len(data["intensity"]) == 4
+
+def test_safety_heatmap_rejects_oversized_grid(client):
+    response = client.get(
+        "/api/v1/safety/heatmap",
+        params={
+            "min_lat": 12.9,
+            "min_lng": 79.9,
+            "max_lat": 13.1,
+            "max_lng": 80.1,
+            "grid_size": 2000
+        }
+    )
+    assert response.status_code == 422
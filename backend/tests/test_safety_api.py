@@ -29,9 +29,7 @@ def test_get_safety_heatmap(client, db_session):
     )
     assert response.status_code == 200
     data = response.json()
-    assert "points" in data
-    # CrimeDataService uses hardcoded TN districts if filters don't match or DB is empty
-    assert len(data["points"]) > 0
+    assert len(data["lats"]) == len(data["lngs"]) == len(data["intensity"]) == 25
 
 def test_panic_button(client):
     # 1. Register and Login to get auth
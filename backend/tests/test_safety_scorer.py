@@ -0,0 +1,104 @@
+import math
+import pytest
+import numpy as np
+from api.models.safety_scorer import SafetyScorer
+from api.schemas.delivery import Coordinate
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    return SafetyScorer()
+
+
+def _great_circle_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+def _reference_min_km(coord, points):
+    return min(
+        _great_circle_km(coord.latitude, coord.longitude, p['latitude'], p['longitude'])
+        for p in points
+    )
+
+
+@pytest.mark.parametrize("lat,lng", [(11.0168, 76.9558), (11.1, 77.05), (13.0827, 80.2707)])
+def test_proximity_matches_great_circle(scorer, lat, lng):
+    coord = Coordinate(latitude=lat, longitude=lng)
+    police, hospital = scorer._infrastructure_proximity(coord)
+
+    police_km = _reference_min_km(coord, scorer.police_stations)
+    expected_police = min(100.0, 100 * np.exp(-0.5 * police_km))
+    assert police == pytest.approx(expected_police, rel=0.01, abs=1e-6)
+
+    hospital_km = _reference_min_km(coord, scorer.hospitals)
+    expected_hospital = min(100.0, 100 * np.exp(-0.4 * hospital_km))
+    assert hospital == pytest.approx(expected_hospital, rel=0.01, abs=1e-6)
+
+
+def test_proximity_defaults_without_data(scorer, monkeypatch):
+    coord = Coordinate(latitude=11.0, longitude=77.0)
+    monkeypatch.setattr(scorer, "hospitals", [])
+    monkeypatch.setattr(scorer, "_has_safe_points", False)
+    assert scorer._infrastructure_proximity(coord) == (50.0, 50.0)
+
+
+def test_infrastructure_heatmap_matches_point_scores(scorer):
+    grid = scorer.infrastructure_heatmap(10.9, 76.9, 11.1, 77.1, resolution=4)
+    assert [len(grid[k]) for k in ("lats", "lngs", "intensity")] == [16, 16, 16]
+    for idx in range(0, 16, 5):
+        coord = Coordinate(latitude=grid["lats"][idx], longitude=grid["lngs"][idx])
+        expected = sum(scorer._infrastructure_proximity(coord)) / 200
+        assert grid["intensity"][idx] == pytest.approx(expected)
+
+
+def test_calculate_proximity_uses_nested_locations(scorer):
+    coord = Coordinate(latitude=11.0, longitude=77.0)
+    points = [{"location": {"lat": 11.0, "lng": 77.0}}, {"coordinates": {"latitude": 12.0, "longitude": 78.0}}]
+    assert scorer._calculate_proximity(coord, points) == pytest.approx(100.0)
+    assert scorer._calculate_proximity(coord, []) == 30.0
+
+
+def test_location_features_by_time_of_day(scorer):
+    coord = Coordinate(latitude=11.0168, longitude=76.9558)
+    day = scorer._get_location_features(coord, "day")
+    night = scorer._get_location_features(coord, "night")
+    evening = scorer._get_location_features(coord, "evening")
+    assert (day[0], day[2], day[3]) == (90.0, 40.0, 12)
+    assert (night[0], night[2], night[3]) == (35.0, 40.0, 22)
+    assert (evening[0], evening[2], evening[3]) == (90.0, 80.0, 18)
+    # Unknown buckets fall back to daytime features
+    assert (scorer._get_location_features(coord, 7) == day).all()
+
+
+def test_calculate_proximity_picks_nearest_point(scorer):
+    coord = Coordinate(latitude=11.0, longitude=77.0)
+    points = [
+        {"location": {"lat": 11.2, "lng": 77.0}},
+        {"location": {"lat": 11.05, "lng": 77.0}},
+        {"coordinates": {"latitude": 11.1, "longitude": 77.0}},
+        {"location": {}},
+    ]
+    expected = max(0, 100 - _great_circle_km(11.0, 77.0, 11.05, 77.0) * 10)
+    assert scorer._calculate_proximity(coord, points) == pytest.approx(expected)
+    assert scorer._calculate_proximity(coord, [{"location": {}}]) == 0
+
+
+def test_batch_scoring_matches_single_locations(scorer):
+    coords = [
+        Coordinate(latitude=11.0168, longitude=76.9558),
+        Coordinate(latitude=11.1, longitude=77.05),
+        Coordinate(latitude=13.0827, longitude=80.2707),
+    ]
+    police, hospital = scorer.infrastructure_proximity_batch(coords)
+    for coord, p, h in zip(coords, police, hospital):
+        assert (p, h) == pytest.approx(scorer._infrastructure_proximity(coord))
+
+    batch = scorer.score_locations(coords, "night", {"gender": "female"})
+    for coord, (score, factors) in zip(coords, batch):
+        single_score, single_factors = scorer.score_location(coord, "night", {"gender": "female"})
+        assert score == pytest.approx(single_score)
+        assert [f["score"] for f in factors] == pytest.approx([f["score"] for f in single_factors])
+    assert scorer.score_locations([]) == []
@@ -72,3 +72,947 @@ async def test_traffic_service_levels():
         traffic_level, _, duration = await service.get_traffic_level(coord1, coord2)
         assert traffic_level == "high" 
         assert duration > 0
+
+@pytest.mark.asyncio
+async def test_weather_service_cache_key_rounding():
+    service = WeatherService()
+    service.api_key = "fake_weather_key"
+
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"weather": [{"main": "Clear"}], "main": {"temp": 25}}
+
+    with patch('httpx.AsyncClient.get', return_value=mock_response) as mock_get:
+        first = await service.get_weather(Coordinate(latitude=13.08271, longitude=80.27071))
+        second = await service.get_weather(Coordinate(latitude=13.08274, longitude=80.27074))
+
+    assert first == second
+    assert mock_get.call_count == 1
+    assert list(service.cache) == [(1308, 8027)]
+
+@pytest.mark.asyncio
+async def test_weather_service_cache_evicts_least_recently_used():
+    import api.services.weather as weather_module
+    service = WeatherService()
+    service.api_key = "fake_weather_key"
+
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"weather": [{"main": "Clear"}], "main": {"temp": 25}}
+
+    with patch.object(weather_module, 'WEATHER_CACHE_MAX_ENTRIES', 2), \
+         patch('httpx.AsyncClient.get', return_value=mock_response) as mock_get:
+        await service.get_weather(Coordinate(latitude=13.0, longitude=80.0))
+        await service.get_weather(Coordinate(latitude=13.1, longitude=80.0))
+        await service.get_weather(Coordinate(latitude=13.0, longitude=80.0))  # hit, now most recent
+        await service.get_weather(Coordinate(latitude=13.2, longitude=80.0))
+
+    assert mock_get.call_count == 3
+    assert list(service.cache) == [(1300, 8000), (1320, 8000)]
+
+def test_safety_service_hospitals_within_matches_linear_scan():
+    from api.services.safety import SafetyService
+    service = SafetyService()
+    location = Coordinate(latitude=11.0168, longitude=76.9558)
+
+    for radius in (500, 3000, 8000):
+        expected = sorted(
+            h['name'] for h in service.hospitals
+            if service.maps_service.calculate_straight_distance(
+                location, Coordinate(latitude=h['latitude'], longitude=h['longitude'])
+            ) <= radius
+        )
+        found = sorted(h['name'] for h, _ in service._hospitals_within(location, radius))
+        assert found == expected
+
+@pytest.mark.asyncio
+async def test_cost_matrix_applies_alerts_by_segment_start():
+    from types import SimpleNamespace
+    from api.models.route_optimizer import RouteOptimizer
+    optimizer = RouteOptimizer()
+    points = [
+        Coordinate(latitude=11.0168, longitude=76.9558),
+        Coordinate(latitude=11.0500, longitude=76.9900),
+        Coordinate(latitude=11.1000, longitude=77.0300),
+    ]
+    distance_matrix = [[0.0, 1000.0, 2000.0], [1000.0, 0.0, 1000.0], [2000.0, 1000.0, 0.0]]
+    alerts = [
+        SimpleNamespace(location={"lat": 11.0169, "lng": 76.9559}, has_traffic_issues=True, is_faster=False),
+        SimpleNamespace(location={"lat": 11.1001, "lng": 77.0301}, has_traffic_issues=False, is_faster=True),
+    ]
+
+    base = await optimizer._create_cost_matrix(points, distance_matrix, ["distance"], None, [])
+    adjusted = await optimizer._create_cost_matrix(
+        points, distance_matrix, ["distance"], None, [], active_alerts=alerts
+    )
+
+    offsets = [5.0, 0.0, -2.0]
+    for i in range(3):
+        for j in range(3):
+            expected = 0 if i == j else base[i][j] + offsets[i]
+            assert adjusted[i][j] == pytest.approx(expected)
+
+def test_safety_service_loads_hospitals_on_first_use():
+    from api.services.safety import SafetyService
+    with patch.object(SafetyService, '_load_hospitals', return_value=[
+        {"name": "Test Hospital", "latitude": 11.0168, "longitude": 76.9558}
+    ]) as mock_load:
+        service = SafetyService()
+        assert mock_load.call_count == 0
+
+        location = Coordinate(latitude=11.0168, longitude=76.9558)
+        assert [h['name'] for h, _ in service._hospitals_within(location, 100)] == ["Test Hospital"]
+        assert len(service.hospitals) == 1
+        assert mock_load.call_count == 1
+
+@pytest.mark.asyncio
+async def test_location_write_buffer_batches_inserts(TestingSessionLocal):
+    from api.services.database import LocationWriteBuffer
+    from database.models import DeliveryStatus
+    buffer = LocationWriteBuffer(session_factory=TestingSessionLocal, max_rows=2, flush_interval=60)
+
+    def stored():
+        db = TestingSessionLocal()
+        try:
+            return db.query(DeliveryStatus).filter(DeliveryStatus.delivery_id == "BUF-1").count()
+        finally:
+            db.close()
+
+    runner = asyncio.create_task(buffer.run())
+    try:
+        await asyncio.sleep(0)
+        ids = [
+            buffer.add({
+                "delivery_id": "BUF-1",
+                "current_location": {"latitude": 13.0, "longitude": 80.0 + i / 100},
+                "status": "in_transit"
+            })
+            for i in range(3)
+        ]
+        assert len(set(ids)) == 3
+        # Reaching max_rows wakes the flusher without waiting for the interval
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if not len(buffer):
+                break
+        assert stored() == 3
+        assert buffer.flush() == 0
+    finally:
+        runner.cancel()
+        db = TestingSessionLocal()
+        db.query(DeliveryStatus).filter(DeliveryStatus.delivery_id == "BUF-1").delete()
+        db.commit()
+        db.close()
+
+def test_location_write_buffer_keeps_good_rows_when_batch_fails(TestingSessionLocal):
+    from api.services.database import LocationWriteBuffer
+    from database.models import DeliveryStatus
+    buffer = LocationWriteBuffer(session_factory=TestingSessionLocal, max_rows=500, flush_interval=60)
+
+    location = {"latitude": 13.0, "longitude": 80.0}
+    buffer.add({"delivery_id": "BUF-2", "current_location": location, "status": "in_transit"})
+    buffer.add({"delivery_id": None, "current_location": location, "status": "in_transit"})  # NOT NULL violation
+    buffer.add({"delivery_id": "BUF-2", "current_location": location, "status": "in_transit"})
+
+    try:
+        assert buffer.flush() == 2
+        assert len(buffer) == 0
+        db = TestingSessionLocal()
+        try:
+            assert db.query(DeliveryStatus).filter(DeliveryStatus.delivery_id == "BUF-2").count() == 2
+        finally:
+            db.close()
+    finally:
+        db = TestingSessionLocal()
+        db.query(DeliveryStatus).filter(DeliveryStatus.delivery_id == "BUF-2").delete()
+        db.commit()
+        db.close()
+
+def test_feedback_stats_aggregates_in_sql(db_session):
+    from api.services.database import DatabaseService
+    from database.models import SafetyFeedback
+    service = DatabaseService(db_session)
+    assert service.get_feedback_stats() == {"total_feedback": 0, "average_rating": 0, "feedback_by_type": {}}
+
+    for feedback_type, rating in [("route_safety", 4), ("route_safety", 2), ("lighting", 3)]:
+        db_session.add(SafetyFeedback(route_id="R1", feedback_type=feedback_type, rating=rating))
+    db_session.flush()
+
+    stats = service.get_feedback_stats()
+    assert stats["total_feedback"] == 3
+    assert stats["average_rating"] == pytest.approx(3.0)
+    assert stats["feedback_by_type"] == {"route_safety": 2, "lighting": 1}
+
+def test_delivery_tracking_reads_latest_from_history(db_session):
+    from datetime import datetime, timedelta
+    from api.services.database import DatabaseService
+    from database.models import DeliveryStatus
+    service = DatabaseService(db_session)
+    assert service.get_delivery_tracking("TRK-1")["status"] == "pending"
+
+    start = datetime(2026, 1, 1, 12, 0)
+    for i, status in enumerate(["picked_up", "in_transit", "delivered"]):
+        db_session.add(DeliveryStatus(
+            delivery_id="TRK-1",
+            current_location={"latitude": 13.0 + i, "longitude": 80.0},
+            status=status,
+            timestamp=start + timedelta(minutes=i)
+        ))
+    db_session.flush()
+
+    tracking = service.get_delivery_tracking("TRK-1", limit=2)
+    assert tracking["status"] == "delivered"
+    assert tracking["current_location"] == {"latitude": 15.0, "longitude": 80.0}
+    assert [h["status"] for h in tracking["location_history"]] == ["delivered", "in_transit"]
+
+def test_location_cache_get_many_by_rider():
+    from api.services.location_cache import LocationCache
+    cache = LocationCache()
+    cache.set_location("D1", "R1", 13.0, 80.0)
+    cache.set_location("D2", "R2", 11.0, 77.0)
+
+    locs = cache.get_many_by_rider(["R1", "R2", "R3"])
+    assert set(locs) == {"R1", "R2"}
+    assert (locs["R1"]["latitude"], locs["R1"]["longitude"]) == (13.0, 80.0)
+    assert cache.get_stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_auto_assign_deliveries_picks_nearest_rider(db_session, monkeypatch):
+    import api.services.location_cache as location_cache_module
+    from api.services.location_cache import LocationCache
+    from api.services.dispatch import DispatchService, invalidate_available_riders
+    from database.models import Delivery, User
+
+    cache = LocationCache()
+    monkeypatch.setattr(location_cache_module, "location_cache", cache)
+    invalidate_available_riders()
+
+    chennai_rider = User(username="dispatch_chennai", hashed_password="x", role="rider")
+    uncached_rider = User(username="dispatch_uncached", hashed_password="x", role="rider")
+    db_session.add_all([chennai_rider, uncached_rider])
+    chennai_order = Delivery(
+        order_id="DISPATCH-1",
+        pickup_location={"latitude": 13.08, "longitude": 80.27},
+        dropoff_location={"latitude": 13.1, "longitude": 80.3}
+    )
+    # Riders without a cached position default to RS Puram, Coimbatore
+    coimbatore_order = Delivery(
+        order_id="DISPATCH-2",
+        pickup_location={"lat": 11.02, "lng": 76.96},
+        dropoff_location={"lat": 11.05, "lng": 76.99}
+    )
+    db_session.add_all([chennai_order, coimbatore_order])
+    db_session.flush()
+    cache.set_location("D-CHN", chennai_rider.id, 13.09, 80.27)
+
+    from api.routes.notifications import manager as notification_manager
+    sent = []
+    async def capture(message):
+        sent.append(message)
+    monkeypatch.setattr(notification_manager, "broadcast", capture)
+
+    result = await DispatchService(db_session).auto_assign_deliveries()
+
+    assert result["assigned_count"] == 2
+    assert chennai_order.assigned_rider_id == chennai_rider.id
+    assert coimbatore_order.assigned_rider_id == uncached_rider.id
+    assert chennai_order.status == coimbatore_order.status == "assigned"
+    assert [m["type"] for m in sent] == ["deliveries_assigned"]
+    assert {e["order_id"] for e in sent[0]["items"]} >= {"DISPATCH-1", "DISPATCH-2"}
+    invalidate_available_riders()
+
+def test_find_available_riders_is_cached_until_invalidated(db_session):
+    from api.services.dispatch import DispatchService, invalidate_available_riders
+    from database.models import User
+    service = DispatchService(db_session)
+    invalidate_available_riders()
+    before = {r.id for r in service.find_available_riders()}
+
+    rider = User(username="dispatch_cached", hashed_password="x", role="rider")
+    db_session.add(rider)
+    db_session.flush()
+    assert rider.id not in {r.id for r in service.find_available_riders()}
+
+    invalidate_available_riders()
+    assert {r.id for r in service.find_available_riders()} == before | {rider.id}
+    invalidate_available_riders()
+
+def test_bulk_saves_return_ids_in_order(db_session):
+    from api.services.database import DatabaseService
+    from database.models import SafetyScore, SafetyFeedback
+    service = DatabaseService(db_session)
+
+    rows = [
+        {"coordinates": {"latitude": 13.0 + i, "longitude": 80.0}, "overall_score": 50.0 + i, "risk_level": "low"}
+        for i in range(3)
+    ]
+    ids = service.save_safety_scores_bulk(rows)
+    assert len(set(ids)) == 3
+    assert [db_session.get(SafetyScore, i).overall_score for i in ids] == [50.0, 51.0, 52.0]
+    assert service.save_safety_scores_bulk([]) == []
+
+    feedback_id = service.save_feedback({"route_id": "R1", "feedback_type": "lighting", "rating": 5})
+    assert db_session.get(SafetyFeedback, feedback_id).rating == 5
+
+def test_email_service_reuses_smtp_connection():
+    import smtplib
+    from api.services.email import EmailService
+    service = EmailService()
+    service.smtp_username = "alerts@example.com"
+    service.smtp_password = "app-password"
+
+    with patch('smtplib.SMTP') as mock_smtp:
+        conn = mock_smtp.return_value
+        assert service._send_email("a@example.com", "First", "body")
+        assert service._send_email("b@example.com", "Second", "body")
+        assert mock_smtp.call_count == 1
+        assert conn.login.call_count == 1
+        assert conn.send_message.call_count == 2
+
+        # A dropped connection is re-established and the send retried
+        conn.send_message.side_effect = [smtplib.SMTPServerDisconnected(), None]
+        assert service._send_email("c@example.com", "Third", "body")
+        assert mock_smtp.call_count == 2
+
+@pytest.mark.asyncio
+async def test_email_service_queues_sos_alerts():
+    from api.services.email import EmailService
+    service = EmailService()
+
+    with patch.object(EmailService, 'send_sos_alert', return_value=True) as mock_send:
+        assert service.queue_sos_alert("Asha", "R1", {"latitude": 13.0, "longitude": 80.0}, "a@example.com")
+        assert service.queue_sos_alert("Asha", "R1", {"latitude": 13.0, "longitude": 80.0}, "b@example.com")
+        # Queuing returns before anything is sent
+        assert mock_send.call_count == 0
+        await asyncio.wait_for(service._sos_queue.join(), timeout=5)
+
+    assert sorted(c.args[3] for c in mock_send.call_args_list) == ["a@example.com", "b@example.com"]
+    service._sos_worker.cancel()
+
+@pytest.mark.asyncio
+async def test_email_service_retries_failed_sos_and_drains_on_shutdown():
+    from api.services.email import EmailService, SOS_SEND_ATTEMPTS
+    service = EmailService()
+
+    with patch.object(EmailService, 'send_sos_alert', side_effect=[False, True]) as mock_send, \
+         patch('api.services.email.time.sleep'):
+        assert service._send_queued_sos("Asha", "R1", {"latitude": 13.0, "longitude": 80.0}, "a@example.com")
+    assert mock_send.call_count == 2
+
+    with patch.object(EmailService, 'send_sos_alert', return_value=False) as mock_send, \
+         patch('api.services.email.time.sleep'):
+        assert not service._send_queued_sos("Asha", "R1", {"latitude": 13.0, "longitude": 80.0}, "a@example.com")
+    assert mock_send.call_count == SOS_SEND_ATTEMPTS
+
+    with patch.object(EmailService, 'send_sos_alert', return_value=True) as mock_send:
+        service.queue_sos_alert("Asha", "R1", {"latitude": 13.0, "longitude": 80.0}, "a@example.com")
+        await service.drain_sos_queue(timeout=5)
+        await asyncio.sleep(0)
+    assert mock_send.call_count == 1
+    assert service._sos_worker.done()
+
+def test_email_service_parallel_sends_use_separate_connections():
+    from api.services.email import EmailService
+    service = EmailService()
+
+    with patch('smtplib.SMTP') as mock_smtp:
+        mock_smtp.side_effect = lambda *args: MagicMock()
+        first = service._checkout_connection("app-password")
+        second = service._checkout_connection("app-password")
+        assert first is not second
+        service._checkin_connection(first)
+        service._checkin_connection(second)
+        assert service._checkout_connection("app-password") in (first, second)
+        assert mock_smtp.call_count == 2
+
+def test_sos_alert_renders_template():
+    from api.services.email import EmailService, SOS_SUBJECT
+    service = EmailService()
+    with patch.object(EmailService, '_send_email', return_value=True) as mock_send:
+        assert service.send_sos_alert("Asha", "R1", {"lat": 13.05, "lng": 80.25}, "a@example.com")
+
+    kwargs = mock_send.call_args.kwargs
+    assert kwargs["subject"] == SOS_SUBJECT
+    assert "- Name: Asha" in kwargs["body"]
+    assert "https://www.google.com/maps?q=13.05,80.25" in kwargs["body"]
+
+def test_delivery_tracking_serializes_with_orjson(db_session):
+    from datetime import datetime
+    from fastapi.responses import ORJSONResponse
+    from api.services.database import DatabaseService
+    from database.models import DeliveryStatus
+    db_session.add(DeliveryStatus(
+        delivery_id="TRK-2",
+        current_location={"latitude": 13.0, "longitude": 80.0},
+        status="in_transit",
+        battery_level=80.0,
+        timestamp=datetime(2026, 1, 1, 12, 0)
+    ))
+    db_session.flush()
+
+    tracking = DatabaseService(db_session).get_delivery_tracking("TRK-2")
+    assert tracking["battery_level"] == 80.0
+    assert b'"timestamp":"2026-01-01T12:00:00"' in ORJSONResponse(tracking).body
+
+def test_save_location_update_returns_inserted_id(db_session):
+    from api.services.database import DatabaseService
+    from database.models import DeliveryStatus
+    status_id = DatabaseService(db_session).save_location_update({
+        "delivery_id": "TRK-3",
+        "current_location": {"latitude": 13.0, "longitude": 80.0},
+        "status": "in_transit"
+    })
+    row = db_session.get(DeliveryStatus, status_id)
+    assert row.delivery_id == "TRK-3"
+    assert row.timestamp is not None
+
+@pytest.mark.asyncio
+async def test_genai_service_uses_async_client():
+    from unittest.mock import AsyncMock
+    from api.services.genai_service import GenAIService
+    service = GenAIService()
+    service.enabled = True
+    service.model = MagicMock()
+    service.model.generate_content_async = AsyncMock(return_value=MagicMock(
+        text='```json\n{"sentiment": "negative", "severity_level": "high"}\n```'
+    ))
+
+    result = await service.analyze_feedback_sentiment("Unsafe underpass", {"route_id": "R1"})
+
+    assert result["sentiment"] == "negative"
+    service.model.generate_content_async.assert_awaited_once()
+    service.model.generate_content.assert_not_called()
+
+    # Fixed instructions lead every request; only the feedback varies
+    from api.services.genai_service import SENTIMENT_INSTRUCTIONS
+    instructions, prompt = service.model.generate_content_async.call_args.args[0]
+    assert instructions == SENTIMENT_INSTRUCTIONS
+    assert "Unsafe underpass" in prompt and "Return JSON" not in prompt
+
+@pytest.mark.asyncio
+async def test_genai_service_caches_identical_requests():
+    from unittest.mock import AsyncMock
+    from api.services.genai_service import GenAIService
+    service = GenAIService()
+    service.enabled = True
+    service.model = MagicMock()
+    service.model.generate_content_async = AsyncMock(return_value=MagicMock(text="Stay on lit roads."))
+    route, rider = {"distance_km": 4.2, "safety_score": 70}, {"experience_months": 3}
+
+    first = await service.generate_safety_briefing(route, rider)
+    second = await service.generate_safety_briefing(dict(route), dict(rider))
+    await service.generate_safety_briefing({**route, "safety_score": 40}, rider)
+
+    assert "cached" not in first and second["cached"] is True
+    assert second["briefing"] == first["briefing"]
+    assert service.model.generate_content_async.await_count == 2
+
+@pytest.mark.asyncio
+async def test_genai_feedback_batch_keeps_input_order():
+    from api.services.genai_service import GenAIService
+    service = GenAIService()
+    service.enabled = False  # keyword fallback keeps the test offline
+
+    results = await service.analyze_feedback_sentiment_batch([
+        ("Felt unsafe near the flyover", {}),
+        ("Great, well lit route", {}),
+        ("Harassment at the signal", {}),
+    ])
+
+    assert [r["sentiment"] for r in results] == ["negative", "positive", "negative"]
+    assert results[2]["severity_level"] == "high"
+
+@pytest.mark.asyncio
+async def test_genai_feedback_batch_calls_gemini_concurrently():
+    from unittest.mock import AsyncMock
+    from api.services.genai_service import GenAIService
+    service = GenAIService()
+    service.enabled = True
+    service.model = MagicMock()
+    in_flight, peak = 0, 0
+
+    async def generate(parts):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if "garbled" in parts[1]:
+            return MagicMock(text="not json")
+        sentiment = "negative" if "unsafe" in parts[1] else "positive"
+        return MagicMock(text=f'{{"sentiment": "{sentiment}", "severity_level": "low"}}')
+    service.model.generate_content_async = AsyncMock(side_effect=generate)
+
+    results = await service.analyze_feedback_sentiment_batch([
+        ("unsafe underpass", {"route_id": "R1"}),
+        ("pleasant ride", {"route_id": "R2"}),
+        ("garbled reply, harassment reported", {"route_id": "R3"}),
+    ])
+
+    assert service.model.generate_content_async.await_count == 3
+    assert peak == 3
+    assert [r["sentiment"] for r in results] == ["negative", "positive", "negative"]
+    assert results[0]["ai_model"] == service.model_name
+    # A malformed reply falls back for its own item only
+    assert "ai_model" not in results[2]
+
+def test_graphhopper_reuses_shared_session():
+    from api.services.graphhopper import GraphHopperService
+    first, second = GraphHopperService(api_key="k"), GraphHopperService(api_key="k")
+    assert first.session is second.session
+
+    response = MagicMock(status_code=200)
+    response.content = b'{"hits": [{"point": {"lat": 13.05, "lng": 80.25}, "name": "T Nagar"}]}'
+    with patch.object(first.session, 'request', return_value=response) as mock_request:
+        assert first.geocode("T Nagar") == {'lat': 13.05, 'lng': 80.25, 'display_name': "T Nagar"}
+        assert second.reverse_geocode(13.05, 80.25) == "T Nagar"
+    assert mock_request.call_count == 2
+
+def test_graphhopper_token_bucket_paces_bursts():
+    from api.services.graphhopper import _TokenBucket
+    bucket = _TokenBucket(rate=2, capacity=2)
+    with patch('api.services.graphhopper.time.sleep') as mock_sleep:
+        for _ in range(4):
+            bucket.acquire()
+    # Two requests fit the burst; the next two wait ~0.5s and ~1s
+    waits = [c.args[0] for c in mock_sleep.call_args_list]
+    assert len(waits) == 2
+    assert waits[0] == pytest.approx(0.5, abs=0.05) and waits[1] == pytest.approx(1.0, abs=0.05)
+
+def test_graphhopper_retry_after_is_capped():
+    from api.services.graphhopper import _session, RETRY_AFTER_MAX_SECONDS
+    retry = _session.get_adapter("https://graphhopper.com").max_retries
+    assert retry.get_retry_after(MagicMock(headers={"Retry-After": "3600"})) == RETRY_AFTER_MAX_SECONDS
+    assert retry.get_retry_after(MagicMock(headers={"Retry-After": "1"})) == 1
+    # The cap survives the copies urllib3 makes on each retry
+    assert retry.increment(method="GET", url="/route").get_retry_after(
+        MagicMock(headers={"Retry-After": "3600"})
+    ) == RETRY_AFTER_MAX_SECONDS
+
+def test_geospatial_bulk_update_matches_single_updates():
+    import numpy as np
+    from api.services.geospatial import GeospatialService
+    single, bulk = GeospatialService(), GeospatialService()
+    riders = ["R1", "R2", "R3"]
+    lats = np.array([13.0827, 13.0830, 11.0168])
+    lngs = np.array([80.2707, 80.2710, 76.9558])
+
+    for rider_id, lat, lng in zip(riders, lats, lngs):
+        single.update_rider_location(rider_id, float(lat), float(lng))
+    bulk.update_rider_locations_bulk(riders, lats, lngs)
+
+    assert bulk.get_cluster_stats() == single.get_cluster_stats()
+    assert sorted(bulk.find_nearby_riders(13.0827, 80.2707)) == ["R1", "R2"]
+
+def test_geospatial_hive_moves_riders_and_compacts_stale_rows():
+    from api.services.geospatial import GeospatialService
+    service = GeospatialService(initial_capacity=2)
+    service.update_rider_location("R1", 13.0827, 80.2707)
+    service.update_rider_location("R2", 13.0830, 80.2710)
+
+    # A rider who moves leaves the old neighbourhood
+    service.update_rider_location("R1", 11.0168, 76.9558)
+    assert service.find_nearby_riders(13.0827, 80.2707) == ["R2"]
+
+    # A full Hive reclaims timed-out rows before growing
+    service._timestamps[service._rider_rows["R2"]] -= service.online_timeout + 1
+    service.update_rider_location("R3", 11.0170, 76.9560)
+    assert len(service._rider_ids) == 2
+    assert sorted(service.find_nearby_riders(11.0168, 76.9558)) == ["R1", "R3"]
+    assert sum(service.get_cluster_stats().values()) == 2
+
+def test_geospatial_bulk_update_keeps_new_riders_when_stale_rider_returns():
+    from api.services.geospatial import GeospatialService
+    service = GeospatialService(initial_capacity=2)
+    service.update_rider_location("R1", 13.0827, 80.2707)
+    service.update_rider_location("R2", 13.0830, 80.2710)
+    service._timestamps[service._rider_rows["R2"]] -= service.online_timeout + 1
+
+    # R2 is compacted away and re-appended in the same batch as new rider R3
+    service.update_rider_locations_bulk(["R3", "R2"], [13.0828, 13.0829], [80.2708, 80.2709])
+
+    assert sorted(service._rider_rows) == ["R1", "R2", "R3"]
+    assert sorted(service.find_nearby_riders(13.0827, 80.2707)) == ["R1", "R2", "R3"]
+    assert sorted(service._rider_ids[:service._size].tolist()) == ["R1", "R2", "R3"]
+
+def test_graphhopper_normalizes_instruction_maneuvers():
+    from api.services.graphhopper import GraphHopperService
+    steps = GraphHopperService(api_key="k")._normalize_instructions([
+        {"text": "Turn sharp left", "distance": 120.4, "time": 15500, "sign": -3},
+        {"text": "Enter roundabout", "distance": 80, "time": 9000, "sign": 6},
+        {"text": "Keep left", "distance": 10, "time": 1000, "sign": -7},
+    ])
+    assert [s["maneuver"] for s in steps] == ["sharp_left", "roundabout", "straight"]
+    assert steps[0]["distance"] == {"text": "120 m", "value": 120}
+    assert steps[0]["duration"] == {"text": "15 s", "value": 15}
+
+def test_geospatial_sweeps_stale_riders_periodically():
+    from api.services.geospatial import GeospatialService
+    service = GeospatialService()
+    service.update_rider_location("R1", 13.0827, 80.2707)
+    service.update_rider_location("R2", 13.0830, 80.2710)
+    service._timestamps[service._rider_rows["R1"]] -= service.online_timeout + 1
+
+    # Within the sweep interval the stale row stays, but is filtered out of reads
+    service.update_rider_location("R2", 13.0830, 80.2710)
+    assert "R1" in service._rider_rows
+    assert service.find_nearby_riders(13.0827, 80.2707) == ["R2"]
+
+    service._last_sweep -= service.online_timeout / 2
+    service.update_rider_location("R2", 13.0830, 80.2710)
+    assert list(service._rider_rows) == ["R2"]
+
+@pytest.mark.asyncio
+async def test_distance_matrix_requests_only_distances():
+    from api.models.route_optimizer import RouteOptimizer
+    from api.schemas.delivery import Coordinate
+    optimizer = RouteOptimizer()
+    optimizer.maps_service.graphhopper = MagicMock()
+    optimizer.maps_service.graphhopper.get_matrix.return_value = {"distances": [[0, 1200], [1150, 0]]}
+
+    points = [Coordinate(latitude=13.05, longitude=80.25), Coordinate(latitude=13.06, longitude=80.26)]
+    assert await optimizer._create_distance_matrix(points) == [[0, 1200], [1150, 0]]
+    assert optimizer.maps_service.graphhopper.get_matrix.call_args.kwargs["out_arrays"] == ["distances"]
+
+@pytest.mark.asyncio
+async def test_genai_route_prompt_fills_template():
+    from unittest.mock import AsyncMock
+    from api.services.genai_service import GenAIService, ROUTE_INSTRUCTIONS
+    service = GenAIService()
+    service.enabled = True
+    service.model = MagicMock()
+    service.model.generate_content_async = AsyncMock(return_value=MagicMock(
+        text='{"recommended_route_index": 1, "reasoning": "safer", "confidence_score": 0.9}'
+    ))
+
+    result = await service.optimize_route_with_ai(
+        [{"distance_km": 5, "safety_score": 60}, {"distance_km": 6, "safety_score": 85}],
+        {"safety_priority": "high", "time_of_day": "night"}
+    )
+
+    assert result["recommended_route_index"] == 1
+    instructions, prompt = service.model.generate_content_async.call_args.args[0]
+    assert instructions == ROUTE_INSTRUCTIONS
+    assert "Route 2: 6km" in prompt and "- Safety Priority: high" in prompt
+    assert "- Max Time: unlimited minutes" in prompt
+
+def test_location_cache_updates_rider_entry_in_place():
+    from datetime import datetime
+    from api.services.location_cache import LocationCache, location_payload
+    cache = LocationCache()
+    cache.set_location("D1", "R1", 13.0, 80.0)
+    entry = cache._fleet_cache["R1"]
+    assert cache._delivery_cache["D1"] is entry
+
+    cache.set_location("D1", "R1", 13.1, 80.1, speed_kmh=22.0)
+    assert cache._fleet_cache["R1"] is entry
+    assert "timestamp" not in entry.data
+    # Reads hand out the cached dict itself; the API payload adds the timestamp
+    assert cache.get_by_rider("R1") is entry.data
+    assert cache.get_all_fleet()["R1"] is entry.data
+    payload = location_payload(cache.get_by_rider("R1"))
+    assert payload["timestamp"].startswith(str(datetime.utcnow().year))
+    assert 0 <= payload["cache_age_seconds"] < 5
+    assert "timestamp" not in entry.data
+    assert cache.get_by_delivery("D1")["latitude"] == 13.1
+    assert cache.get_by_rider("R1")["speed_kmh"] == 22.0
+
+    # A new delivery for the rider gets a fresh entry
+    cache.set_location("D2", "R1", 13.2, 80.2)
+    assert cache._fleet_cache["R1"] is not entry
+    assert cache.get_by_delivery("D1")["latitude"] == 13.1
+
+def test_straight_distance_batch_matches_scalar():
+    from api.services.maps import MapsService
+    service = MapsService()
+    origins = [(11.0168, 76.9558), (13.05, 80.25), (12.97, 77.59)]
+    dests = [(11.0500, 76.9900), (13.06, 80.26), (12.97, 77.59)]
+
+    batch = service.calculate_straight_distance_batch(origins, dests)
+    for i, (o, d) in enumerate(zip(origins, dests)):
+        assert batch[i] == pytest.approx(service.calculate_straight_distance(o, d))
+
+    matrix = service.calculate_straight_distance_batch(
+        [[o] for o in origins], [dests]
+    )
+    assert matrix.shape == (3, 3)
+    assert matrix[0][2] == pytest.approx(service.calculate_straight_distance(origins[0], dests[2]))
+
+@pytest.mark.asyncio
+async def test_get_directions_awaits_osrm_directly():
+    from unittest.mock import AsyncMock
+    from api.services.maps import MapsService
+    service = MapsService()
+    service.gmaps = None
+    service.graphhopper = None
+    service.osrm = MagicMock()
+    service.osrm.get_directions = AsyncMock(return_value=[{"summary": "osrm"}])
+
+    routes = await service.get_directions((13.05, 80.25), {"lat": 13.06, "lng": 80.26})
+
+    assert routes == [{"summary": "osrm", "provider": "osrm"}]
+    service.osrm.get_directions.assert_awaited_once_with(
+        (13.05, 80.25), (13.06, 80.26), None, alternatives=True
+    )
+
+@pytest.mark.asyncio
+async def test_get_directions_does_not_cache_osrm_outage_fallback():
+    import httpx
+    import polyline
+    from api.services.maps import MapsService
+    from api.services.osrm_service import OSRMService
+    service = MapsService()
+    service.gmaps = None
+    service.graphhopper = None
+    service.osrm = OSRMService()
+
+    with patch('httpx.AsyncClient.get', side_effect=httpx.ConnectError("down")):
+        routes = await service.get_directions((13.05, 80.25), (13.06, 80.26))
+    assert routes[0]["provider"] == "mock"
+    assert not service._directions_cache
+
+    # Once OSRM is back, the next request gets a real route
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"code": "Ok", "routes": [{
+        "geometry": polyline.encode([(13.05, 80.25), (13.06, 80.26)]),
+        "legs": [{"distance": 1500, "duration": 300, "steps": []}],
+    }]}
+    with patch('httpx.AsyncClient.get', return_value=response):
+        routes = await service.get_directions((13.05, 80.25), (13.06, 80.26))
+    assert routes[0]["provider"] == "osrm"
+    assert routes[0]["summary"] == "Route 1 via OSRM"
+    assert len(service._directions_cache) == 1
+
+@pytest.mark.asyncio
+async def test_get_directions_caches_and_coalesces_identical_requests():
+    from unittest.mock import AsyncMock
+    from api.services.maps import MapsService
+    service = MapsService()
+    service.gmaps = None
+    service.graphhopper = None
+    service.osrm = MagicMock()
+
+    async def slow_directions(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return [{"summary": "osrm"}]
+    service.osrm.get_directions = AsyncMock(side_effect=slow_directions)
+
+    results = await asyncio.gather(*[
+        service.get_directions((13.05, 80.25), (13.06, 80.26)) for _ in range(5)
+    ])
+    assert all(r == [{"summary": "osrm", "provider": "osrm"}] for r in results)
+    assert service.osrm.get_directions.await_count == 1
+
+    # Within the ~1m key rounding -> served from cache
+    await service.get_directions((13.050001, 80.25), (13.06, 80.26))
+    assert service.osrm.get_directions.await_count == 1
+
+    await service.get_directions((13.05, 80.25), (13.07, 80.26))
+    assert service.osrm.get_directions.await_count == 2
+
+@pytest.mark.asyncio
+async def test_get_directions_falls_back_to_step_endpoints():
+    from api.services.maps import MapsService
+    service = MapsService()
+    service.gmaps = MagicMock()
+    service.gmaps.directions.return_value = [{
+        "overview_polyline": {},
+        "legs": [{"steps": [
+            {"start_location": {"lat": 13.05, "lng": 80.25}, "end_location": {"lat": 13.055, "lng": 80.255}},
+            {"start_location": {"lat": 13.055, "lng": 80.255}, "end_location": {"lat": 13.06, "lng": 80.26}},
+        ]}],
+    }]
+
+    routes = await service.get_directions((13.05, 80.25), (13.06, 80.26))
+
+    assert routes[0]["provider"] == "google"
+    assert routes[0]["route_coordinates"] == [
+        {"lat": 13.05, "lng": 80.25}, {"lat": 13.055, "lng": 80.255},
+        {"lat": 13.055, "lng": 80.255}, {"lat": 13.06, "lng": 80.26},
+    ]
+
+def test_get_lat_lng_accepts_point_formats():
+    from types import SimpleNamespace
+    from api.services.maps import MapsService
+    service = MapsService()
+    expected = (13.05, 80.25)
+
+    for point in (
+        Coordinate(latitude=13.05, longitude=80.25),
+        (13.05, 80.25), [13.05, 80.25], ["13.05", "80.25"],
+        {"lat": 13.05, "lng": 80.25}, {"latitude": 13.05, "longitude": 80.25},
+        SimpleNamespace(latitude=13.05, longitude=80.25),
+    ):
+        assert service._get_lat_lng(point) == expected
+    assert service._get_lat_lng([13.05]) == (0.0, 0.0)
+    assert service._get_lat_lng(None) == (0.0, 0.0)
+
+def test_location_cache_ttl_ignores_wall_clock_jumps():
+    import time
+    from api.services.location_cache import LocationCache
+    cache = LocationCache(default_ttl=60)
+    cache.set_location("D1", "R1", 13.0, 80.0)
+
+    # An NTP step of an hour must not expire a fresh entry
+    with patch("api.services.location_cache.time.time", return_value=time.time() + 3600):
+        assert cache.get_by_rider("R1") is not None
+        assert cache.get_by_delivery("D1") is not None
+
+def test_location_cache_cleanup_pops_only_due_entries():
+    from api.services.location_cache import LocationCache
+    cache = LocationCache(default_ttl=60)
+    clock = [1000.0]
+    with patch("api.services.location_cache.time.monotonic", side_effect=lambda: clock[0]):
+        cache.set_location("D1", "R1", 13.0, 80.0)
+        cache.set_location("D2", "R2", 13.1, 80.1)
+        clock[0] = 1050.0
+        cache.set_location("D2", "R2", 13.2, 80.2)  # refreshed in place
+        cache.set_location("D3", "R1", 13.3, 80.3)  # R1 moves on; D1 keeps the old entry
+
+        clock[0] = 1070.0
+        assert cache.cleanup_expired() == 1  # only D1's stale delivery slot
+        assert cache.get_by_delivery("D1") is None
+        assert set(cache.get_all_fleet()) == {"R1", "R2"}
+        assert len(cache._expiry_heap) == 2  # R2 was re-pushed at its refreshed expiry
+
+        clock[0] = 1111.0
+        assert cache.get_all_fleet() == {}
+        assert cache._delivery_cache == {} and cache._rider_to_delivery == {}
+        assert cache._expiry_heap == []
+
+def test_decode_polyline_guards_empty_input():
+    from api.services.maps import MapsService
+    service = MapsService()
+    assert service.decode_polyline(None) == []
+    assert service.decode_polyline("") == []
+    assert service.decode_polyline("_p~iF~ps|U_ulLnnqC") == [[38.5, -120.2], [40.7, -120.95]]
+
+def test_haversine_anchor_matches_straight_distance():
+    import numpy as np
+    from api.services.maps import MapsService, HaversineAnchor
+    service = MapsService()
+    anchor = HaversineAnchor(11.0168, 76.9558)
+    targets = [(11.0500, 76.9900), (13.05, 80.25), (11.0168, 76.9558)]
+
+    for lat, lng in targets:
+        expected = service.calculate_straight_distance((11.0168, 76.9558), (lat, lng))
+        assert anchor.distance_to(lat, lng) == pytest.approx(expected)
+    lats, lngs = np.array(targets).T
+    assert anchor.distances_to(lats, lngs) == pytest.approx(
+        [service.calculate_straight_distance((11.0168, 76.9558), t) for t in targets]
+    )
+
+@pytest.mark.asyncio
+async def test_get_directions_skips_provider_with_open_breaker():
+    from unittest.mock import AsyncMock
+    from api.services.maps import MapsService, PROVIDER_FAILURE_THRESHOLD
+    service = MapsService()
+    service.gmaps = MagicMock()
+    service.gmaps.directions.side_effect = TimeoutError("google down")
+    service.graphhopper = None
+    service.osrm = MagicMock()
+    service.osrm.get_directions = AsyncMock(return_value=[{"summary": "osrm"}])
+
+    # Distinct destinations so the directions cache doesn't short-circuit
+    for i in range(PROVIDER_FAILURE_THRESHOLD + 2):
+        routes = await service.get_directions((13.05, 80.25), (13.06 + i * 0.01, 80.26))
+        assert routes[0]["provider"] == "osrm"
+
+    assert service.gmaps.directions.call_count == PROVIDER_FAILURE_THRESHOLD
+    assert not service._breakers["google"].allow()
+
+    # After the cooldown calls go through again
+    service._breakers["google"].open_until = 0.0
+    await service.get_directions((13.05, 80.25), (13.5, 80.26))
+    assert service.gmaps.directions.call_count == PROVIDER_FAILURE_THRESHOLD + 1
+
+@pytest.mark.asyncio
+async def test_osrm_outage_fallback_trips_osrm_breaker():
+    import httpx
+    from api.services.maps import MapsService, PROVIDER_FAILURE_THRESHOLD
+    from api.services.osrm_service import OSRMService
+    service = MapsService()
+    service.gmaps = None
+    service.graphhopper = None
+    service.osrm = OSRMService()
+
+    with patch('httpx.AsyncClient.get', side_effect=httpx.ConnectError("down")) as mock_get:
+        for i in range(PROVIDER_FAILURE_THRESHOLD + 2):
+            routes = await service.get_directions((13.05, 80.25), (13.06 + i * 0.01, 80.26))
+            assert routes[0]["provider"] == "mock"
+
+    assert mock_get.call_count == PROVIDER_FAILURE_THRESHOLD
+    assert not service._breakers["osrm"].allow()
+
+@pytest.mark.asyncio
+async def test_safe_zones_searches_place_types_concurrently():
+    import threading
+    from api.services.safety import SafetyService
+    service = SafetyService()
+    barrier = threading.Barrier(2, timeout=5)
+
+    def find_nearby_places(location, radius_meters, place_type):
+        # Both default searches must be in flight at once to pass the barrier
+        barrier.wait()
+        return [{"place_id": place_type, "name": place_type, "distance_meters": 100.0 if place_type == "police" else 50.0}]
+
+    with patch.object(service.maps_service, "find_nearby_places", side_effect=find_nearby_places):
+        zones = await service.get_safe_zones(Coordinate(latitude=11.0168, longitude=76.9558), radius_meters=10)
+
+    assert [(z["id"], z["zone_type"]) for z in zones] == [
+        ("convenience_store", "shop_24hr"), ("police", "police_station")
+    ]
+
+def test_astar_nearest_lookups_match_linear_scan():
+    import random
+    from api.models.astar_optimizer import AStarRouteOptimizer
+    optimizer = AStarRouteOptimizer()
+    rng = random.Random(7)
+    safety_data = {(11 + rng.random(), 76.5 + rng.random()): rng.uniform(0, 100) for _ in range(200)}
+    traffic_data = {(11 + rng.random(), 76.5 + rng.random()): rng.choice(['low', 'medium', 'high', 'severe']) for _ in range(50)}
+
+    for _ in range(20):
+        coord = (11 + rng.random(), 76.5 + rng.random())
+        nearest = min(safety_data, key=lambda loc: optimizer.haversine_distance(coord, loc))
+        assert optimizer.get_safety_penalty(coord, safety_data) == pytest.approx((100 - safety_data[nearest]) / 100)
+        level = traffic_data[min(traffic_data, key=lambda loc: optimizer.haversine_distance(coord, loc))]
+        assert optimizer.get_traffic_multiplier(coord, traffic_data) == {'low': 1.0, 'medium': 1.4, 'high': 2.0, 'severe': 2.5}[level]
+        index = optimizer.point_index(safety_data)
+        assert optimizer.get_safety_penalty(coord, safety_data, index) == optimizer.get_safety_penalty(coord, safety_data)
+
+def test_astar_nearest_lookups_see_in_place_map_changes():
+    from api.models.astar_optimizer import AStarRouteOptimizer
+    optimizer = AStarRouteOptimizer()
+    safety_data = {(11.0, 76.9): 80, (11.5, 77.0): 20}
+    assert optimizer.get_safety_penalty((11.01, 76.9), safety_data) == pytest.approx(0.2)
+
+    # Same size, different key: no lookup state survives between calls
+    del safety_data[(11.0, 76.9)]
+    safety_data[(11.02, 76.9)] = 60
+    assert optimizer.get_safety_penalty((11.01, 76.9), safety_data) == pytest.approx(0.4)
+    assert not hasattr(optimizer, "_point_arrays")
+
+def test_haversine_anchor_within_matches_distance_threshold():
+    import numpy as np
+    from api.services.maps import HaversineAnchor
+    anchor = HaversineAnchor(11.0168, 76.9558)
+    rng = np.random.default_rng(3)
+    lats = 11.0168 + rng.uniform(-0.01, 0.01, 500)
+    lngs = 76.9558 + rng.uniform(-0.01, 0.01, 500)
+
+    for radius in (100, 500, 1000):
+        assert (anchor.within(lats, lngs, radius) == (anchor.distances_to(lats, lngs) <= radius)).all()
+
+def test_polyline_array_decoder_matches_reference():
+    import random
+    import polyline
+    from api.utils.polyline_decoder import decode_polyline_array
+    rng = random.Random(5)
+    for n in (1, 2, 50, 2000):
+        points = [(rng.uniform(-89, 89), rng.uniform(-179, 179)) for _ in range(n)]
+        encoded = polyline.encode(points)
+        assert decode_polyline_array(encoded).tolist() == [list(p) for p in polyline.decode(encoded)]
+
+    with pytest.raises(ValueError):
+        decode_polyline_array("_p~iF~ps|U_ulL")
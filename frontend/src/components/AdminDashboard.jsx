@@ -41,12 +41,14 @@ const AdminDashboard = () => {
       }
 
       // Add to recent events if it's an interesting systemic event
-      if (['delivery_status_update', 'delivery_assigned', 'panic_alert'].includes(latest.type)) {
+      if (['delivery_status_update', 'delivery_assigned', 'deliveries_assigned', 'panic_alert'].includes(latest.type)) {
         const newEvent = {
           id: Date.now(),
           type: latest.type === 'panic_alert' ? 'alert' : 'info',
           title: latest.type.replace(/_/g, ' ').toUpperCase(),
-          description: latest.message || `Delivery ${latest.delivery_id?.substring(0, 8)} update: ${latest.status || ''}`,
+          description: latest.message || (latest.items
+            ? `${latest.items.length} deliveries auto-assigned`
+            : `Delivery ${latest.delivery_id?.substring(0, 8)} update: ${latest.status || ''}`),
           time: new Date().toISOString()
         };
         setRecentEvents(prev => [newEvent, ...prev].slice(0, 10));
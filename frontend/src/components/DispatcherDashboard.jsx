@@ -48,6 +48,10 @@ const DispatcherDashboard = () => {
                 case 'delivery_assigned':
                     msg = `Order ${latest.delivery_id?.substring(0, 8)} assigned to ${latest.rider_name}.`;
                     break;
+                case 'deliveries_assigned':
+                    msg = `${latest.items?.length || 0} orders auto-assigned to nearest riders.`;
+                    driver = 'SYSTEM';
+                    break;
                 case 'delivery_status_update':
                     msg = `Order ${latest.delivery_id?.substring(0, 8)} status: ${latest.status.replace('_', ' ')}.`;
                     break;
@@ -23,8 +23,13 @@ const SafetyHeatmap = ({ show = true }) => {
             };
 
             const response = await api.get('/safety/heatmap', { params });
-            if (response && response.points) {
-                setHeatmapData(response.points || []);
+            if (response && response.lats) {
+                // Grid comes back column-wise: lats[i], lngs[i], intensity[i]
+                setHeatmapData(response.lats.map((lat, i) => ({
+                    lat,
+                    lng: response.lngs[i],
+                    intensity: response.intensity[i]
+                })));
             }
         } catch (error) {
             console.error("Error fetching heatmap:", error);